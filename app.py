@@ -23,12 +23,13 @@ from decimal import Decimal
 from pydantic import BaseModel
 
 # Import từ src structure
-from src.core.odoo_client import odoo_client
-from src.core.config import FASTAPI_CONFIG
+from src.core.odoo_client import odoo_client, async_odoo_client
+from src.core.config import FASTAPI_CONFIG, PRICING_STREAM_CONFIG, KAFKA_PRICING_CONFIG
 from src.models.base import APIResponse
 from src.models.pricing import Rate, ProductWeights, OfflineStrategy, PricingRequest, PricingResponse
 from src.services import gold_attribute_service
 from src.services.kafka_service import KafkaPricingConsumer
+from src.services.pricing_broadcaster import PricingBroadcaster, split_filter, parse_event_id
 
 # Import models cần thiết từ backup
 from models import *
@@ -146,7 +147,7 @@ templates = Jinja2Templates(directory="templates")
 # ================================
 
 # Global variables for real-time features
-sse_connections: Set = set()
+pricing_broadcaster = PricingBroadcaster(**PRICING_STREAM_CONFIG)  # SSE fanout từ Kafka thread
 kafka_consumer = None
 
 @app.on_event("startup")
@@ -156,21 +157,33 @@ async def startup_event():
     
     # Connect to Odoo
     try:
-        odoo_client.connect()
+        await async_odoo_client.connect()
         print("✅ Odoo connection established")
     except Exception as e:
         print(f"❌ Odoo connection failed: {e}")
         
     # Start Kafka consumer (optional)
     global kafka_consumer
+    pricing_broadcaster.start()
     try:
-        kafka_consumer = KafkaPricingConsumer()
+        kafka_consumer = KafkaPricingConsumer(**KAFKA_PRICING_CONFIG)
+        # Consumer chỉ gửi SKU id, broadcaster tự lấy giá cho SKU có người nghe
+        kafka_consumer.on_pricing_changed = pricing_broadcaster.publish_changes
+        pricing_broadcaster.snapshot_provider = kafka_consumer.get_calculator().get_all_pricing
+        pricing_broadcaster.pricing_provider = kafka_consumer.get_calculator().get_pricing_many
         kafka_consumer.start()
         print("✅ Kafka pricing consumer started")
     except Exception as e:
         print(f"⚠️ Kafka consumer not available: {e}")
         print("   Application will continue without real-time pricing")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Dừng Kafka consumer (commit offset lần cuối) rồi dừng SSE dispatcher"""
+    if kafka_consumer:
+        await asyncio.get_running_loop().run_in_executor(None, kafka_consumer.stop)
+    await pricing_broadcaster.stop()
+
 # ================================
 # MAIN ROUTES
 # ================================
@@ -183,7 +196,6 @@ async def root(request: Request):
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    global sse_connections
     try:
         calculator = kafka_consumer.get_calculator() if kafka_consumer else None
         stats = calculator.get_stats() if calculator else {}
@@ -191,8 +203,12 @@ async def health_check():
         return {
             "status": "healthy",
             "kafka_connected": kafka_consumer.running if kafka_consumer else False,
-            "sse_connections": len(sse_connections),
+            "sse_connections": len(pricing_broadcaster.subscribers),
+            "sse_broadcaster": pricing_broadcaster.get_stats(),
             "calculator_stats": stats,
+            "kafka_commit": kafka_consumer.get_commit_stats() if kafka_consumer else None,
+            "odoo_pool": odoo_client.get_pool_stats(),
+            "gold_metadata_cache": gold_attribute_service.get_metadata_cache_stats(),
             "timestamp": datetime.utcnow().isoformat(),
             "version": "2.0.0"
         }
@@ -204,6 +220,30 @@ async def health_check():
             "timestamp": datetime.utcnow().isoformat()
         }
 
+# =============================================================================
+# REAL-TIME PRICING (Bổ sung từ app_fastapi.py)
+# =============================================================================
+
+@app.get("/events/pricing")
+async def pricing_events(
+    request: Request,
+    skus: Optional[str] = Query(None, description="Danh sách SKU, phân cách bởi dấu phẩy"),
+    prefixes: Optional[str] = Query(None, description="Tiền tố SKU, phân cách bởi dấu phẩy"),
+    materials: Optional[str] = Query(None, description="Material (gold, silver), phân cách bởi dấu phẩy"),
+    last_event_id: Optional[str] = Query(None, description="Id event cuối đã nhận (thay cho header Last-Event-ID)")
+):
+    """Server-Sent Events cho real-time pricing updates
+
+    Không truyền bộ lọc nào thì nhận update của tất cả SKU.
+    Client kết nối lại với Last-Event-ID chỉ nhận các update đã lỡ.
+    """
+    return EventSourceResponse(pricing_broadcaster.stream(
+        skus=split_filter(skus),
+        prefixes=split_filter(prefixes),
+        materials=split_filter(materials),
+        last_event_id=parse_event_id(request.headers.get('last-event-id') or last_event_id)
+    ))
+
 # ================================
 # GOLD ATTRIBUTES APIs (Refactored)
 # ================================
@@ -213,35 +253,32 @@ async def get_gold_attributes_filter_options():
     """Lấy danh sách gold attributes để làm filter options"""
     try:
         # Lấy tất cả gold attributes
-        attributes = odoo_client.search_read(
+        attributes = await async_odoo_client.search_read(
             'gold.attribute.line', 
             [['active', '=', True]], 
             ['name', 'display_name', 'short_name', 'field_type', 'unit', 'group_id']
         )
         
+        # gold.attribute.line id -> product.attribute id (cache metadata)
+        product_attr_ids = await async_odoo_client.run_sync(gold_attribute_service.get_product_attribute_ids)
+        
         # Lấy available values cho mỗi attribute
         for attr in attributes:
-            attr_id = attr['id']
-            # Tìm product.attribute tương ứng
-            gold_attr = odoo_client.read('gold.attribute.line', [attr_id], ['name'])
-            if gold_attr:
-                product_attr_name = f"gold_{gold_attr[0]['name']}"
-                product_attrs = odoo_client.search('product.attribute', [['name', '=', product_attr_name]])
-                
-                if product_attrs:
-                    # Lấy các values có sẵn
-                    values = odoo_client.search_read(
-                        'product.attribute.value',
-                        [['attribute_id', '=', product_attrs[0]]],
-                        ['name']
-                    )
-                    attr['available_values'] = [v['name'] for v in values]
-                else:
-                    attr['available_values'] = []
+            product_attr_id = product_attr_ids.get(attr['id'])
+            if product_attr_id:
+                # Lấy các values có sẵn
+                values = await async_odoo_client.search_read(
+                    'product.attribute.value',
+                    [['attribute_id', '=', product_attr_id]],
+                    ['name']
+                )
+                attr['available_values'] = [v['name'] for v in values]
+            else:
+                attr['available_values'] = []
             
             # Lấy group name
             if attr.get('group_id'):
-                group = odoo_client.read('product.template.attribute.group', [attr['group_id'][0]], ['name'])
+                group = await async_odoo_client.read('product.template.attribute.group', [attr['group_id'][0]], ['name'])
                 attr['group_name'] = group[0]['name'] if group else ''
             else:
                 attr['group_name'] = ''
@@ -250,15 +287,24 @@ async def get_gold_attributes_filter_options():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/gold-attributes/cache/refresh", response_model=APIResponse)
+async def refresh_gold_attributes_cache():
+    """Nạp lại cache metadata gold attributes ngay lập tức"""
+    try:
+        stats = await async_odoo_client.run_sync(gold_attribute_service.refresh_metadata_cache)
+        return APIResponse(success=True, data=stats, message="Đã làm mới cache thuộc tính vàng")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/product-templates/{product_id}/gold-attributes", response_model=APIResponse)
 async def get_product_template_gold_attributes(product_id: int):
     """Lấy thuộc tính vàng của mã mẫu sản phẩm"""
     try:
         # Lấy gold attributes đã lưu của product template này
-        gold_attributes = gold_attribute_service.get_product_gold_attributes(product_id)
+        gold_attributes = await async_odoo_client.run_sync(gold_attribute_service.get_product_gold_attributes, product_id)
         
         # Lấy tất cả gold attributes available
-        available_attributes = odoo_client.search_read(
+        available_attributes = await async_odoo_client.search_read(
             'gold.attribute.line', 
             [['active', '=', True]], 
             ['name', 'display_name', 'short_name', 'field_type', 'required', 'editable', 
@@ -270,7 +316,7 @@ async def get_product_template_gold_attributes(product_id: int):
         group_ids = [attr['group_id'][0] for attr in available_attributes if attr.get('group_id')]
         group_dict = {}
         if group_ids:
-            groups = odoo_client.read('product.template.attribute.group', group_ids, ['name'])
+            groups = await async_odoo_client.read('product.template.attribute.group', group_ids, ['name'])
             group_dict = {g['id']: g['name'] for g in groups}
         
         # Thêm group name vào attributes
@@ -309,7 +355,7 @@ async def set_product_template_gold_attributes(product_id: int, request: Request
             raise HTTPException(status_code=400, detail="No valid attribute data provided")
         
         # Bulk set attributes
-        success = gold_attribute_service.bulk_set_product_gold_attributes(product_id, attributes_values)
+        success = await async_odoo_client.run_sync(gold_attribute_service.bulk_set_product_gold_attributes, product_id, attributes_values)
         
         if success:
             return APIResponse(
@@ -333,25 +379,21 @@ async def _filter_products_by_gold_attributes(filters: Dict[int, str]) -> List[i
     try:
         matching_product_ids = set()
         first_filter = True
+        # gold.attribute.line id -> product.attribute id (cache metadata)
+        product_attr_ids = await async_odoo_client.run_sync(gold_attribute_service.get_product_attribute_ids)
         
         for gold_attribute_id, expected_value in filters.items():
             if not expected_value or expected_value.strip() == "":
                 continue
                 
             # Lấy product.attribute tương ứng
-            gold_attr = odoo_client.read('gold.attribute.line', [gold_attribute_id], ['name'])
-            if not gold_attr:
-                continue
-                
-            product_attr_name = f"gold_{gold_attr[0]['name']}"
-            product_attrs = odoo_client.search('product.attribute', [['name', '=', product_attr_name]])
-            
-            if not product_attrs:
+            product_attr_id = product_attr_ids.get(gold_attribute_id)
+            if not product_attr_id:
                 continue
             
             # Tìm product.attribute.value với value mong muốn
-            attr_values = odoo_client.search('product.attribute.value', [
-                ['attribute_id', '=', product_attrs[0]], 
+            attr_values = await async_odoo_client.search('product.attribute.value', [
+                ['attribute_id', '=', product_attr_id], 
                 ['name', '=', expected_value]
             ])
             
@@ -359,14 +401,14 @@ async def _filter_products_by_gold_attributes(filters: Dict[int, str]) -> List[i
                 continue
             
             # Tìm product.template.attribute.line có value này
-            attr_lines = odoo_client.search('product.template.attribute.line', [
-                ['attribute_id', '=', product_attrs[0]],
+            attr_lines = await async_odoo_client.search('product.template.attribute.line', [
+                ['attribute_id', '=', product_attr_id],
                 ['value_ids', 'in', attr_values]
             ])
             
             # Lấy product template IDs
             if attr_lines:
-                lines_data = odoo_client.read('product.template.attribute.line', attr_lines, ['product_tmpl_id'])
+                lines_data = await async_odoo_client.read('product.template.attribute.line', attr_lines, ['product_tmpl_id'])
                 current_product_ids = {line['product_tmpl_id'][0] for line in lines_data}
                 
                 if first_filter:
@@ -434,8 +476,8 @@ async def get_product_templates(
         offset = (page - 1) * limit
         
         # Lấy dữ liệu
-        total = odoo_client.search_count('product.template', domain)
-        products = odoo_client.search_read(
+        total = await async_odoo_client.search_count('product.template', domain)
+        products = await async_odoo_client.search_read(
             'product.template', 
             domain, 
             ['name', 'default_code', 'list_price', 'standard_price', 'categ_id', 'uom_id',
@@ -457,13 +499,18 @@ async def get_product_templates(
         uom_dict = {}
         
         if categ_ids:
-            categories = odoo_client.read('product.category', categ_ids, ['name'])
+            categories = await async_odoo_client.read('product.category', categ_ids, ['name'])
             categ_dict = {c['id']: c['name'] for c in categories}
             
         if uom_ids:
-            uoms = odoo_client.read('uom.uom', uom_ids, ['name'])
+            uoms = await async_odoo_client.read('uom.uom', uom_ids, ['name'])
             uom_dict = {u['id']: u['name'] for u in uoms}
         
+        # Lấy gold attributes của cả trang trong một lần (số RPC không phụ thuộc page size)
+        gold_attributes_by_product = await async_odoo_client.run_sync(
+            gold_attribute_service.get_gold_attributes_for_products, [p['id'] for p in products]
+        )
+        
         # Enrich data
         for product in products:
             # Thêm tên danh mục và đơn vị tính
@@ -473,7 +520,7 @@ async def get_product_templates(
                 product['categ_name'] = ''
                 
             # Lấy gold attributes từ Odoo server
-            gold_attributes = gold_attribute_service.get_product_gold_attributes(product['id'])
+            gold_attributes = gold_attributes_by_product.get(product['id'], [])
             product['gold_attributes'] = gold_attributes
             
             # Tạo summary ngắn cho gold attributes (hiển thị trong table)
@@ -542,7 +589,7 @@ async def get_attribute_groups(
         offset = (page - 1) * limit
         
         # Lấy dữ liệu từ Odoo
-        groups = odoo_client.search_read(
+        groups = await async_odoo_client.search_read(
             'product.template.attribute.group',
             domain,
             ['name', 'description', 'sequence', 'active'],
@@ -552,7 +599,7 @@ async def get_attribute_groups(
         )
         
         # Đếm tổng số bản ghi
-        total = odoo_client.search_count('product.template.attribute.group', domain)
+        total = await async_odoo_client.search_count('product.template.attribute.group', domain)
         
         return APIResponse(success=True, data=groups, total=total)
     except Exception as e:
@@ -563,7 +610,7 @@ async def create_attribute_group(group: AttributeGroupCreate):
     """Tạo nhóm thuộc tính mới"""
     try:
         group_data = group.dict()
-        group_id = odoo_client.create('product.template.attribute.group', group_data)
+        group_id = await async_odoo_client.create('product.template.attribute.group', group_data)
         return APIResponse(success=True, data={"id": group_id}, message="Tạo nhóm thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -572,7 +619,7 @@ async def create_attribute_group(group: AttributeGroupCreate):
 async def get_attribute_group(group_id: int):
     """Lấy thông tin nhóm thuộc tính theo ID"""
     try:
-        group = odoo_client.read('product.template.attribute.group', [group_id])
+        group = await async_odoo_client.read('product.template.attribute.group', [group_id])
         if not group:
             raise HTTPException(status_code=404, detail="Không tìm thấy nhóm thuộc tính")
         return APIResponse(success=True, data=group[0])
@@ -584,7 +631,7 @@ async def update_attribute_group(group_id: int, group: AttributeGroupUpdate):
     """Cập nhật nhóm thuộc tính"""
     try:
         group_data = {k: v for k, v in group.dict().items() if v is not None}
-        odoo_client.write('product.template.attribute.group', group_id, group_data)
+        await async_odoo_client.write('product.template.attribute.group', group_id, group_data)
         return APIResponse(success=True, message="Cập nhật nhóm thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -594,14 +641,14 @@ async def delete_attribute_group(group_id: int):
     """Xóa nhóm thuộc tính"""
     try:
         # Kiểm tra xem có attribute nào đang sử dụng group này không
-        attr_count = odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
+        attr_count = await async_odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
         if attr_count > 0:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Không thể xóa nhóm thuộc tính vì còn {attr_count} thuộc tính đang sử dụng"
             )
         
-        odoo_client.unlink('product.template.attribute.group', [group_id])
+        await async_odoo_client.unlink('product.template.attribute.group', [group_id])
         return APIResponse(success=True, message="Xóa nhóm thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -636,7 +683,7 @@ async def get_attributes(
         offset = (page - 1) * limit
         
         # Lấy dữ liệu từ Odoo
-        attributes = odoo_client.search_read(
+        attributes = await async_odoo_client.search_read(
             'gold.attribute.line',
             domain,
             ['name', 'display_name', 'short_name', 'field_type', 'required', 'editable',
@@ -651,7 +698,7 @@ async def get_attributes(
         group_ids = [attr['group_id'][0] for attr in attributes if attr.get('group_id')]
         group_dict = {}
         if group_ids:
-            groups = odoo_client.read('product.template.attribute.group', group_ids, ['name'])
+            groups = await async_odoo_client.read('product.template.attribute.group', group_ids, ['name'])
             group_dict = {g['id']: g['name'] for g in groups}
         
         # Thêm tên nhóm vào kết quả
@@ -662,7 +709,7 @@ async def get_attributes(
                 attr['group_name'] = ''
         
         # Đếm tổng số bản ghi
-        total = odoo_client.search_count('gold.attribute.line', domain)
+        total = await async_odoo_client.search_count('gold.attribute.line', domain)
         
         return APIResponse(success=True, data=attributes, total=total)
     except Exception as e:
@@ -673,7 +720,8 @@ async def create_attribute(attribute: GoldAttributeCreate):
     """Tạo gold attribute mới"""
     try:
         attr_data = attribute.dict()
-        attr_id = odoo_client.create('gold.attribute.line', attr_data)
+        attr_id = await async_odoo_client.create('gold.attribute.line', attr_data)
+        gold_attribute_service.invalidate_metadata_cache()
         return APIResponse(success=True, data={"id": attr_id}, message="Tạo thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -682,13 +730,13 @@ async def create_attribute(attribute: GoldAttributeCreate):
 async def get_attribute(attribute_id: int):
     """Lấy thông tin gold attribute theo ID"""
     try:
-        attribute = odoo_client.read('gold.attribute.line', [attribute_id])
+        attribute = await async_odoo_client.read('gold.attribute.line', [attribute_id])
         if not attribute:
             raise HTTPException(status_code=404, detail="Không tìm thấy thuộc tính")
         
         # Lấy tên nhóm thuộc tính
         if attribute[0].get('group_id'):
-            group = odoo_client.read('product.template.attribute.group', [attribute[0]['group_id'][0]], ['name'])
+            group = await async_odoo_client.read('product.template.attribute.group', [attribute[0]['group_id'][0]], ['name'])
             attribute[0]['group_name'] = group[0]['name'] if group else ''
         else:
             attribute[0]['group_name'] = ''
@@ -702,7 +750,8 @@ async def update_attribute(attribute_id: int, attribute: GoldAttributeUpdate):
     """Cập nhật gold attribute"""
     try:
         attr_data = {k: v for k, v in attribute.dict().items() if v is not None}
-        odoo_client.write('gold.attribute.line', attribute_id, attr_data)
+        await async_odoo_client.write('gold.attribute.line', attribute_id, attr_data)
+        gold_attribute_service.invalidate_metadata_cache()
         return APIResponse(success=True, message="Cập nhật thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -711,7 +760,8 @@ async def update_attribute(attribute_id: int, attribute: GoldAttributeUpdate):
 async def delete_attribute(attribute_id: int):
     """Xóa gold attribute"""
     try:
-        odoo_client.unlink('gold.attribute.line', [attribute_id])
+        await async_odoo_client.unlink('gold.attribute.line', [attribute_id])
+        gold_attribute_service.invalidate_metadata_cache()
         return APIResponse(success=True, message="Xóa thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -724,7 +774,7 @@ async def delete_attribute(attribute_id: int):
 async def get_category_options():
     """Lấy danh sách danh mục sản phẩm cho dropdown"""
     try:
-        categories = odoo_client.search_read('product.category', [], ['name', 'complete_name'], order='complete_name')
+        categories = await async_odoo_client.search_read('product.category', [], ['name', 'complete_name'], order='complete_name')
         return APIResponse(success=True, data=categories)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -733,7 +783,7 @@ async def get_category_options():
 async def get_uom_options():
     """Lấy danh sách đơn vị tính cho dropdown"""
     try:
-        uoms = odoo_client.search_read('uom.uom', [], ['name', 'category_id'], order='name')
+        uoms = await async_odoo_client.search_read('uom.uom', [], ['name', 'category_id'], order='name')
         return APIResponse(success=True, data=uoms)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -770,7 +820,7 @@ async def create_product_template(product: ProductTemplateCreate):
     """Tạo mã mẫu sản phẩm mới"""
     try:
         product_data = {k: v for k, v in product.dict().items() if v is not None}
-        product_id = odoo_client.create('product.template', product_data)
+        product_id = await async_odoo_client.create('product.template', product_data)
         return APIResponse(success=True, data={"id": product_id}, message="Tạo mã mẫu sản phẩm thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -779,35 +829,37 @@ async def create_product_template(product: ProductTemplateCreate):
 async def get_product_template(product_id: int):
     """Lấy thông tin mã mẫu sản phẩm theo ID"""
     try:
-        product = odoo_client.read('product.template', [product_id], [
-            'name', 'default_code', 'categ_id', 'type', 'active', 'sale_ok', 'purchase_ok',
-            'list_price', 'standard_price', 'weight', 'volume', 'description', 
-            'description_sale', 'description_purchase', 'barcode', 'uom_id', 'uom_po_id',
-            'create_date', 'write_date'
-        ])
+        # Template, số biến thể và gold attributes độc lập nhau: gửi song song
+        async with async_odoo_client.batch() as batch:
+            product_call = batch.read('product.template', [product_id], [
+                'name', 'default_code', 'categ_id', 'type', 'active', 'sale_ok', 'purchase_ok',
+                'list_price', 'standard_price', 'weight', 'volume', 'description', 
+                'description_sale', 'description_purchase', 'barcode', 'uom_id', 'uom_po_id',
+                'create_date', 'write_date'
+            ])
+            variant_count_call = batch.search_count('product.product', [['product_tmpl_id', '=', product_id]])
+            gold_attributes_call = batch.call(gold_attribute_service.get_product_gold_attributes, product_id)
+        
+        product = product_call.result()
         if not product:
             raise HTTPException(status_code=404, detail="Không tìm thấy mã mẫu sản phẩm")
         
-        # Lấy tên danh mục và đơn vị tính
-        if product[0].get('categ_id'):
-            categ = odoo_client.read('product.category', [product[0]['categ_id'][0]], ['name'])
-            product[0]['categ_name'] = categ[0]['name'] if categ else ''
-        else:
-            product[0]['categ_name'] = ''
-            
-        if product[0].get('uom_id'):
-            uom = odoo_client.read('uom.uom', [product[0]['uom_id'][0]], ['name'])
-            product[0]['uom_name'] = uom[0]['name'] if uom else ''
-        else:
-            product[0]['uom_name'] = ''
+        # Lấy tên danh mục và đơn vị tính (cần categ_id/uom_id của template)
+        async with async_odoo_client.batch() as batch:
+            categ_call = batch.read('product.category', [product[0]['categ_id'][0]], ['name']) if product[0].get('categ_id') else None
+            uom_call = batch.read('uom.uom', [product[0]['uom_id'][0]], ['name']) if product[0].get('uom_id') else None
+        
+        categ = categ_call.result() if categ_call else None
+        product[0]['categ_name'] = categ[0]['name'] if categ else ''
+        uom = uom_call.result() if uom_call else None
+        product[0]['uom_name'] = uom[0]['name'] if uom else ''
         
         # Đếm số biến thể
-        variant_count = odoo_client.search_count('product.product', [['product_tmpl_id', '=', product_id]])
-        product[0]['variant_count'] = variant_count
+        product[0]['variant_count'] = variant_count_call.result()
         
         # Lấy gold attributes từ Odoo server
         try:
-            gold_attributes = gold_attribute_service.get_product_gold_attributes(product_id)
+            gold_attributes = gold_attributes_call.result()
             product[0]['gold_attributes'] = gold_attributes
             product[0]['is_jewelry_product'] = len(gold_attributes) > 0
         except Exception as e:
@@ -872,21 +924,21 @@ async def update_product_template(product_id: int, product: ProductTemplateUpdat
                     product_data[key] = value
         
         # Kiểm tra product có tồn tại không
-        existing_count = odoo_client.search_count('product.template', [['id', '=', product_id]])
+        existing_count = await async_odoo_client.search_count('product.template', [['id', '=', product_id]])
         if existing_count == 0:
             raise HTTPException(status_code=404, detail="Không tìm thấy mã mẫu sản phẩm")
         
         # Update basic product fields trong Odoo (nếu có)
         if product_data:
             print(f"Updating Odoo product {product_id} with data: {product_data}")
-            result = odoo_client.write('product.template', product_id, product_data)
+            result = await async_odoo_client.write('product.template', product_id, product_data)
             print(f"Odoo update result: {result}")
         
         # Update gold attributes trong Odoo server
         gold_attrs_result = None
         if gold_attributes and isinstance(gold_attributes, dict):
             print(f"Updating gold attributes for product {product_id}: {gold_attributes}")
-            gold_attrs_result = gold_attribute_service.bulk_set_product_gold_attributes(product_id, gold_attributes)
+            gold_attrs_result = await async_odoo_client.run_sync(gold_attribute_service.bulk_set_product_gold_attributes, product_id, gold_attributes)
             print(f"Gold attributes result: {gold_attrs_result}")
         
         # Tạo response message
@@ -929,11 +981,11 @@ async def delete_product_template(product_id: int):
     """Xóa mã mẫu sản phẩm"""
     try:
         # Kiểm tra xem có biến thể nào không
-        variant_count = odoo_client.search_count('product.product', [['product_tmpl_id', '=', product_id]])
+        variant_count = await async_odoo_client.search_count('product.product', [['product_tmpl_id', '=', product_id]])
         if variant_count > 0:
             raise HTTPException(status_code=400, detail=f"Không thể xóa sản phẩm vì còn {variant_count} biến thể")
         
-        odoo_client.unlink('product.template', [product_id])
+        await async_odoo_client.unlink('product.template', [product_id])
         return APIResponse(success=True, message="Xóa mã mẫu sản phẩm thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -946,7 +998,7 @@ async def delete_product_template(product_id: int):
 async def clear_product_gold_attributes_client(product_id: int):
     """Xóa tất cả gold attributes của product"""
     try:
-        success = gold_attribute_service.clear_all_product_gold_attributes(product_id)
+        success = await async_odoo_client.run_sync(gold_attribute_service.clear_all_product_gold_attributes, product_id)
         if success:
             return APIResponse(success=True, message="Đã xóa tất cả gold attributes")
         else:
@@ -962,34 +1014,45 @@ async def clear_product_gold_attributes_client(product_id: int):
 async def get_product_template_statistics():
     """Lấy thống kê về mã mẫu sản phẩm"""
     try:
-        # Tổng số mã mẫu
-        total_templates = odoo_client.search_count('product.template', [])
-        active_templates = odoo_client.search_count('product.template', [['active', '=', True]])
-        inactive_templates = total_templates - active_templates
-        
-        # Thống kê theo danh mục
-        categories = odoo_client.search_read('product.category', [], ['name'])
-        by_category = {}
-        for cat in categories:
-            count = odoo_client.search_count('product.template', [['categ_id', '=', cat['id']]])
-            if count > 0:
-                by_category[cat['name']] = count
+        # Tổng số mã mẫu theo trạng thái (một read_group)
+        active_counts = await async_odoo_client.group_count(
+            'product.template', 'active', [['active', 'in', [True, False]]]
+        )
+        active_templates = active_counts.get(True, 0)
+        inactive_templates = active_counts.get(False, 0)
+        total_templates = active_templates + inactive_templates
         
-        # Thống kê theo loại sản phẩm
+        # Thống kê theo danh mục và loại sản phẩm (một read_group)
+        category_type_groups = await async_odoo_client.read_group(
+            'product.template', [], ['categ_id'], ['categ_id', 'type'], lazy=False
+        )
+        category_counts = {}
         by_type = {}
-        for ptype in ['product', 'consu', 'service']:
-            count = odoo_client.search_count('product.template', [['type', '=', ptype]])
-            if count > 0:
-                by_type[ptype] = count
+        for group in category_type_groups:
+            count = group.get('__count', 0)
+            if group.get('categ_id'):
+                categ_id = group['categ_id'][0]
+                category_counts[categ_id] = category_counts.get(categ_id, 0) + count
+            if group.get('type'):
+                by_type[group['type']] = by_type.get(group['type'], 0) + count
+        
+        by_category = {}
+        if category_counts:
+            categories = await async_odoo_client.read('product.category', list(category_counts.keys()), ['name'])
+            for cat in categories:
+                if category_counts.get(cat['id'], 0) > 0:
+                    by_category[cat['name']] = category_counts[cat['id']]
         
-        # Giá trung bình
-        all_prices = odoo_client.search_read('product.template', [], ['list_price'])
-        prices = [p['list_price'] for p in all_prices if p['list_price'] > 0]
-        avg_price = sum(prices) / len(prices) if prices else 0
-        total_value = sum(prices)
+        # Giá trung bình: tổng và số lượng tính phía server
+        price_groups = await async_odoo_client.read_group(
+            'product.template', [['list_price', '>', 0]], ['list_price:sum'], ['type'], lazy=False
+        )
+        priced_count = sum(group.get('__count', 0) for group in price_groups)
+        total_value = sum(group.get('list_price') or 0 for group in price_groups)
+        avg_price = total_value / priced_count if priced_count else 0
         
         # Lấy thống kê gold attributes từ service
-        gold_stats = gold_attribute_service.get_gold_attribute_statistics()
+        gold_stats = await async_odoo_client.run_sync(gold_attribute_service.get_gold_attribute_statistics)
         
         stats = {
             'total_templates': total_templates,
@@ -1011,7 +1074,7 @@ async def get_product_template_statistics():
 async def get_gold_attributes_statistics():
     """Lấy thống kê về gold attributes usage"""
     try:
-        stats = gold_attribute_service.get_gold_attribute_statistics()
+        stats = await async_odoo_client.run_sync(gold_attribute_service.get_gold_attribute_statistics)
         return APIResponse(success=True, data=stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,7 +2,7 @@
 FastAPI Application - Migrated from Flask
 Odoo Product CRUD Client với Real-time Pricing
 """
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Query
 from fastapi.responses import HTMLResponse, StreamingResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -16,8 +16,8 @@ from typing import List, Optional, Dict, Set
 from decimal import Decimal
 import uvicorn
 
-from odoo_client import odoo_client
-from config import FASTAPI_CONFIG
+from odoo_client import odoo_client, async_odoo_client
+from config import FASTAPI_CONFIG, PRICING_STREAM_CONFIG
 from models import *
 from product_template_models import *
 # Xóa import không cần thiết
@@ -25,6 +25,7 @@ from product_template_models import *
 from gold_attribute_odoo_integration import gold_attribute_service
 from pricing_models import PricingSnapshot, PricingRequest, PricingResponse, OfflineStrategy
 from kafka_pricing_consumer import KafkaPricingConsumer
+from src.services.pricing_broadcaster import PricingBroadcaster, split_filter, parse_event_id
 
 # Helper functions
 async def _filter_products_by_gold_attributes(filters: Dict[int, str]) -> List[int]:
@@ -43,12 +44,12 @@ async def _filter_products_by_gold_attributes(filters: Dict[int, str]) -> List[i
                 continue
                 
             # Lấy product.attribute tương ứng
-            gold_attr = odoo_client.read('gold.attribute.line', [gold_attribute_id], ['name'])
+            gold_attr = await async_odoo_client.read('gold.attribute.line', [gold_attribute_id], ['name'])
             if not gold_attr:
                 continue
                 
             product_attr_name = f"gold_{gold_attr[0]['name']}"
-            product_attrs = odoo_client.search('product.attribute', [['name', '=', product_attr_name]])
+            product_attrs = await async_odoo_client.search('product.attribute', [['name', '=', product_attr_name]])
             
             if not product_attrs:
                 # Nếu không có product.attribute nào, nghĩa là chưa có product nào có attribute này
@@ -57,7 +58,7 @@ async def _filter_products_by_gold_attributes(filters: Dict[int, str]) -> List[i
             product_attr_id = product_attrs[0]
             
             # Tìm product.attribute.value có value match
-            attr_values = odoo_client.search('product.attribute.value', [
+            attr_values = await async_odoo_client.search('product.attribute.value', [
                 ['attribute_id', '=', product_attr_id],
                 ['name', 'ilike', expected_value]
             ])
@@ -67,7 +68,7 @@ async def _filter_products_by_gold_attributes(filters: Dict[int, str]) -> List[i
                 return []
             
             # Tìm product.template.attribute.line có value này
-            attr_lines = odoo_client.search_read(
+            attr_lines = await async_odoo_client.search_read(
                 'product.template.attribute.line',
                 [
                     ['attribute_id', '=', product_attr_id],
@@ -196,51 +197,26 @@ kafka_consumer = KafkaPricingConsumer()
 # Kafka producer cho UI input
 rate_producer = RateProducer()
 
-# SSE connections management
-sse_connections: Set[asyncio.Queue] = set()
+# SSE fanout: Kafka thread -> ingress queue -> dispatcher task trên event loop
+pricing_broadcaster = PricingBroadcaster(
+    snapshot_provider=kafka_consumer.get_calculator().get_all_pricing,
+    pricing_provider=kafka_consumer.get_calculator().get_pricing_many,
+    **PRICING_STREAM_CONFIG
+)
 
 def on_pricing_update(sku: str, snapshot: PricingSnapshot):
-    """Callback khi có pricing update từ Kafka"""
-    global sse_connections
-    
-    # Sử dụng json() method của Pydantic để handle datetime serialization
-    snapshot_json = snapshot.json()
-    snapshot_dict = json.loads(snapshot_json)
-    
-    event_data = {
-        "event": "pricing_update",
-        "data": json.dumps({
-            "type": "pricing_update",
-            "sku": sku,
-            "pricing": snapshot_dict,
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        })
-    }
-    
-    # Broadcast tới tất cả SSE connections
-    disconnected = set()
-    for queue in sse_connections:
-        try:
-            queue.put_nowait(event_data)
-        except:
-            # Queue full hoặc connection dead
-            disconnected.add(queue)
-            
-    # Cleanup dead connections
-    sse_connections -= disconnected
-    
-    print(f"Broadcasted pricing update for {sku} to {len(sse_connections)} connections")
-    sse_connections -= disconnected
-    
-    print(f"Broadcasted pricing update for {sku} to {len(sse_connections)} connections")
+    """Callback khi có pricing update từ Kafka (chạy trên Kafka consumer thread)"""
+    pricing_broadcaster.publish(sku, snapshot)
 
-# Setup Kafka callback
-kafka_consumer.on_pricing_update = on_pricing_update
+# Setup Kafka callback: consumer chỉ gửi SKU id, broadcaster tự lấy giá cho SKU có người nghe
+kafka_consumer.on_pricing_changed = pricing_broadcaster.publish_changes
 
 # Kết nối Odoo và khởi động pricing system khi khởi động
 @app.on_event("startup")
 async def startup_event():
-    odoo_client.connect()
+    await async_odoo_client.connect()
+    # Dispatcher phải chạy trên event loop trước khi Kafka bắt đầu đẩy update
+    pricing_broadcaster.start()
     # Khởi động Kafka consumer trong background thread (không phải async)
     try:
         kafka_consumer.start()
@@ -249,6 +225,12 @@ async def startup_event():
         print(f"Warning: Could not start Kafka consumer: {e}")
         print("Application will continue without real-time pricing updates")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # stop() join consumer thread (commit offset lần cuối) nên chạy ngoài event loop
+    await asyncio.get_running_loop().run_in_executor(None, kafka_consumer.stop)
+    await pricing_broadcaster.stop()
+
 # ================================
 # HTML ROUTES
 # ================================
@@ -270,48 +252,24 @@ async def home(request: Request):
 # ================================
 
 @app.get("/events/pricing")
-async def pricing_events(request: Request):
-    """Server-Sent Events cho real-time pricing updates"""
-    global sse_connections
-    
-    async def event_stream():
-        queue = asyncio.Queue()
-        sse_connections.add(queue)  # sse_connections được access từ global scope trong function cha
-        
-        try:
-            # Gửi connection established event
-            yield {
-                "event": "connected",
-                "data": json.dumps({
-                    "type": "connected", 
-                    "message": "SSE connection established",
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-            }
-            
-            while True:
-                try:
-                    # Đợi event từ queue hoặc timeout sau 30s để gửi keepalive
-                    event = await asyncio.wait_for(queue.get(), timeout=30)
-                    yield event
-                except asyncio.TimeoutError:
-                    # Gửi keepalive event
-                    yield {
-                        "event": "keepalive",
-                        "data": json.dumps({
-                            "type": "keepalive",
-                            "timestamp": datetime.utcnow().isoformat()
-                        })
-                    }
-                except Exception as e:
-                    print(f"Error in SSE stream: {e}")
-                    break
-                    
-        finally:
-            # Cleanup connection
-            sse_connections.discard(queue)
-            
-    return EventSourceResponse(event_stream())
+async def pricing_events(
+    request: Request,
+    skus: Optional[str] = Query(None, description="Danh sách SKU, phân cách bởi dấu phẩy"),
+    prefixes: Optional[str] = Query(None, description="Tiền tố SKU, phân cách bởi dấu phẩy"),
+    materials: Optional[str] = Query(None, description="Material (gold, silver), phân cách bởi dấu phẩy"),
+    last_event_id: Optional[str] = Query(None, description="Id event cuối đã nhận (thay cho header Last-Event-ID)")
+):
+    """Server-Sent Events cho real-time pricing updates
+
+    Không truyền bộ lọc nào thì nhận update của tất cả SKU.
+    Client kết nối lại với Last-Event-ID chỉ nhận các update đã lỡ.
+    """
+    return EventSourceResponse(pricing_broadcaster.stream(
+        skus=split_filter(skus),
+        prefixes=split_filter(prefixes),
+        materials=split_filter(materials),
+        last_event_id=parse_event_id(request.headers.get('last-event-id') or last_event_id)
+    ))
 
 @app.get("/api/pricing/{sku}")
 async def get_pricing(sku: str, strategy: OfflineStrategy = OfflineStrategy.FREEZE):
@@ -501,7 +459,7 @@ async def get_attribute_groups(
         
         # Lấy dữ liệu với pagination - chỉ lấy field có trong model thực tế
         offset = (page - 1) * limit
-        groups = odoo_client.search_read(
+        groups = await async_odoo_client.search_read(
             'product.template.attribute.group', 
             domain, 
             ['name', 'code', 'sequence', 'create_date', 'write_date'],
@@ -511,11 +469,11 @@ async def get_attribute_groups(
         )
         
         # Đếm tổng số bản ghi
-        total = odoo_client.search_count('product.template.attribute.group', domain)
+        total = await async_odoo_client.search_count('product.template.attribute.group', domain)
         
         # Đếm số thuộc tính trong mỗi nhóm
         for group in groups:
-            attr_count = odoo_client.search_count('gold.attribute.line', [['group_id', '=', group['id']]])
+            attr_count = await async_odoo_client.search_count('gold.attribute.line', [['group_id', '=', group['id']]])
             group['attribute_count'] = attr_count
         
         return APIResponse(success=True, data=groups, total=total)
@@ -527,7 +485,7 @@ async def create_attribute_group(group: AttributeGroupCreate):
     """Tạo nhóm thuộc tính mới"""
     try:
         group_data = {k: v for k, v in group.dict().items() if v is not None}
-        group_id = odoo_client.create('product.template.attribute.group', group_data)
+        group_id = await async_odoo_client.create('product.template.attribute.group', group_data)
         return APIResponse(success=True, data={"id": group_id}, message="Tạo nhóm thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -536,14 +494,14 @@ async def create_attribute_group(group: AttributeGroupCreate):
 async def get_attribute_group(group_id: int):
     """Lấy thông tin nhóm thuộc tính theo ID"""
     try:
-        group = odoo_client.read('product.template.attribute.group', [group_id], [
+        group = await async_odoo_client.read('product.template.attribute.group', [group_id], [
             'name', 'code', 'sequence', 'create_date', 'write_date'
         ])
         if not group:
             raise HTTPException(status_code=404, detail="Không tìm thấy nhóm thuộc tính")
         
         # Đếm số thuộc tính trong nhóm
-        attr_count = odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
+        attr_count = await async_odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
         group[0]['attribute_count'] = attr_count
         
         return APIResponse(success=True, data=group[0])
@@ -558,7 +516,7 @@ async def update_attribute_group(group_id: int, group: AttributeGroupUpdate):
         if not group_data:
             raise HTTPException(status_code=400, detail="Không có dữ liệu để cập nhật")
         
-        odoo_client.write('product.template.attribute.group', [group_id], group_data)
+        await async_odoo_client.write('product.template.attribute.group', [group_id], group_data)
         return APIResponse(success=True, message="Cập nhật nhóm thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -568,11 +526,11 @@ async def delete_attribute_group(group_id: int):
     """Xóa nhóm thuộc tính"""
     try:
         # Kiểm tra xem có thuộc tính nào đang sử dụng nhóm này không
-        attr_count = odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
+        attr_count = await async_odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
         if attr_count > 0:
             raise HTTPException(status_code=400, detail=f"Không thể xóa nhóm vì còn {attr_count} thuộc tính đang sử dụng")
         
-        odoo_client.unlink('product.template.attribute.group', [group_id])
+        await async_odoo_client.unlink('product.template.attribute.group', [group_id])
         return APIResponse(success=True, message="Xóa nhóm thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -604,7 +562,7 @@ async def get_attributes(
         
         # Lấy dữ liệu với pagination
         offset = (page - 1) * limit
-        attributes = odoo_client.search_read(
+        attributes = await async_odoo_client.search_read(
             'gold.attribute.line', 
             domain, 
             ['name', 'display_name', 'short_name', 'field_type', 'group_id', 'required', 
@@ -618,7 +576,7 @@ async def get_attributes(
         # Lấy tên nhóm cho mỗi thuộc tính
         group_ids = [attr['group_id'][0] for attr in attributes if attr.get('group_id')]
         if group_ids:
-            groups = odoo_client.read('product.template.attribute.group', group_ids, ['name'])
+            groups = await async_odoo_client.read('product.template.attribute.group', group_ids, ['name'])
             group_dict = {g['id']: g['name'] for g in groups}
             
             for attr in attributes:
@@ -628,7 +586,7 @@ async def get_attributes(
                     attr['group_name'] = ''
         
         # Đếm tổng số bản ghi
-        total = odoo_client.search_count('gold.attribute.line', domain)
+        total = await async_odoo_client.search_count('gold.attribute.line', domain)
         
         return APIResponse(success=True, data=attributes, total=total)
     except Exception as e:
@@ -639,7 +597,7 @@ async def create_attribute(attribute: AttributeCreate):
     """Tạo thuộc tính mới"""
     try:
         attribute_data = {k: v for k, v in attribute.dict().items() if v is not None}
-        attribute_id = odoo_client.create('gold.attribute.line', attribute_data)
+        attribute_id = await async_odoo_client.create('gold.attribute.line', attribute_data)
         return APIResponse(success=True, data={"id": attribute_id}, message="Tạo thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -648,7 +606,7 @@ async def create_attribute(attribute: AttributeCreate):
 async def get_attribute(attribute_id: int):
     """Lấy thông tin thuộc tính theo ID"""
     try:
-        attribute = odoo_client.read('gold.attribute.line', [attribute_id], [
+        attribute = await async_odoo_client.read('gold.attribute.line', [attribute_id], [
             'name', 'display_name', 'short_name', 'field_type', 'group_id', 'required', 
             'editable', 'active', 'default_value', 'description', 'unit',
             'validation_regex', 'selection_options', 'category', 'create_date', 'write_date'
@@ -658,7 +616,7 @@ async def get_attribute(attribute_id: int):
         
         # Lấy tên nhóm
         if attribute[0].get('group_id'):
-            group = odoo_client.read('product.template.attribute.group', [attribute[0]['group_id'][0]], ['name'])
+            group = await async_odoo_client.read('product.template.attribute.group', [attribute[0]['group_id'][0]], ['name'])
             attribute[0]['group_name'] = group[0]['name'] if group else ''
         else:
             attribute[0]['group_name'] = ''
@@ -672,7 +630,7 @@ async def get_gold_attributes_filter_options():
     """Lấy danh sách gold attributes để làm filter options"""
     try:
         # Lấy tất cả gold attributes active
-        attributes, _ = gold_attribute_service.get_gold_attributes()
+        attributes, _ = await async_odoo_client.run_sync(gold_attribute_service.get_gold_attributes)
         
         filter_options = []
         for attr in attributes:
@@ -681,11 +639,11 @@ async def get_gold_attributes_filter_options():
                 
             # Lấy danh sách values có sẵn cho attribute này
             gold_attr_name = f"gold_{attr['name']}"
-            product_attrs = odoo_client.search('product.attribute', [['name', '=', gold_attr_name]])
+            product_attrs = await async_odoo_client.search('product.attribute', [['name', '=', gold_attr_name]])
             
             available_values = []
             if product_attrs:
-                attr_values = odoo_client.search_read(
+                attr_values = await async_odoo_client.search_read(
                     'product.attribute.value',
                     [['attribute_id', '=', product_attrs[0]]],
                     ['name'],
@@ -716,7 +674,7 @@ async def update_attribute(attribute_id: int, attribute: AttributeUpdate):
         if not attribute_data:
             raise HTTPException(status_code=400, detail="Không có dữ liệu để cập nhật")
         
-        odoo_client.write('gold.attribute.line', [attribute_id], attribute_data)
+        await async_odoo_client.write('gold.attribute.line', [attribute_id], attribute_data)
         return APIResponse(success=True, message="Cập nhật thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -725,7 +683,7 @@ async def update_attribute(attribute_id: int, attribute: AttributeUpdate):
 async def delete_attribute(attribute_id: int):
     """Xóa thuộc tính"""
     try:
-        odoo_client.unlink('gold.attribute.line', [attribute_id])
+        await async_odoo_client.unlink('gold.attribute.line', [attribute_id])
         return APIResponse(success=True, message="Xóa thuộc tính thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -784,7 +742,7 @@ async def get_product_templates(
         
         # Lấy dữ liệu với pagination
         offset = (page - 1) * limit
-        products = odoo_client.search_read(
+        products = await async_odoo_client.search_read(
             'product.template', 
             domain, 
             ['name', 'default_code', 'categ_id', 'type', 'active', 'sale_ok', 'purchase_ok',
@@ -802,18 +760,29 @@ async def get_product_templates(
         
         categ_dict = {}
         if categ_ids:
-            categories = odoo_client.read('product.category', categ_ids, ['name'])
+            categories = await async_odoo_client.read('product.category', categ_ids, ['name'])
             categ_dict = {c['id']: c['name'] for c in categories}
         
         uom_dict = {}
         if uom_ids:
-            uoms = odoo_client.read('uom.uom', uom_ids, ['name'])
+            uoms = await async_odoo_client.read('uom.uom', uom_ids, ['name'])
             uom_dict = {u['id']: u['name'] for u in uoms}
         
-        # Đếm số biến thể cho mỗi sản phẩm
+        # Lấy gold attributes của cả trang trong một lần (số RPC không phụ thuộc page size)
+        product_ids = [p['id'] for p in products]
+        gold_attributes_by_product = await async_odoo_client.run_sync(
+            gold_attribute_service.get_gold_attributes_for_products, product_ids
+        )
+        
+        # Đếm số biến thể của cả trang bằng một read_group
+        variant_counts = {}
+        if product_ids:
+            variant_counts = await async_odoo_client.group_count(
+                'product.product', 'product_tmpl_id', [['product_tmpl_id', 'in', product_ids]]
+            )
+        
         for product in products:
-            variant_count = odoo_client.search_count('product.product', [['product_tmpl_id', '=', product['id']]])
-            product['variant_count'] = variant_count
+            product['variant_count'] = variant_counts.get(product['id'], 0)
             
             # Thêm tên danh mục và đơn vị tính
             if product.get('categ_id'):
@@ -822,7 +791,7 @@ async def get_product_templates(
                 product['categ_name'] = ''
                 
             # Lấy gold attributes từ Odoo server
-            gold_attributes = gold_attribute_service.get_product_gold_attributes(product['id'])
+            gold_attributes = gold_attributes_by_product.get(product['id'], [])
             product['gold_attributes'] = gold_attributes
             product['is_jewelry_product'] = len(gold_attributes) > 0
             
@@ -844,7 +813,7 @@ async def get_product_templates(
                 product['uom_name'] = ''
         
         # Đếm tổng số bản ghi
-        total = odoo_client.search_count('product.template', domain)
+        total = await async_odoo_client.search_count('product.template', domain)
         
         return APIResponse(success=True, data=products, total=total)
     except Exception as e:
@@ -855,7 +824,7 @@ async def create_product_template(product: ProductTemplateCreate):
     """Tạo mã mẫu sản phẩm mới"""
     try:
         product_data = {k: v for k, v in product.dict().items() if v is not None}
-        product_id = odoo_client.create('product.template', product_data)
+        product_id = await async_odoo_client.create('product.template', product_data)
         return APIResponse(success=True, data={"id": product_id}, message="Tạo mã mẫu sản phẩm thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -864,34 +833,45 @@ async def create_product_template(product: ProductTemplateCreate):
 async def get_product_template_statistics():
     """Lấy thống kê về mã mẫu sản phẩm"""
     try:
-        # Tổng số mã mẫu
-        total_templates = odoo_client.search_count('product.template', [])
-        active_templates = odoo_client.search_count('product.template', [['active', '=', True]])
-        inactive_templates = total_templates - active_templates
-        
-        # Thống kê theo danh mục
-        categories = odoo_client.search_read('product.category', [], ['name'])
-        by_category = {}
-        for cat in categories:
-            count = odoo_client.search_count('product.template', [['categ_id', '=', cat['id']]])
-            if count > 0:
-                by_category[cat['name']] = count
+        # Tổng số mã mẫu theo trạng thái (một read_group)
+        active_counts = await async_odoo_client.group_count(
+            'product.template', 'active', [['active', 'in', [True, False]]]
+        )
+        active_templates = active_counts.get(True, 0)
+        inactive_templates = active_counts.get(False, 0)
+        total_templates = active_templates + inactive_templates
         
-        # Thống kê theo loại sản phẩm
+        # Thống kê theo danh mục và loại sản phẩm (một read_group)
+        category_type_groups = await async_odoo_client.read_group(
+            'product.template', [], ['categ_id'], ['categ_id', 'type'], lazy=False
+        )
+        category_counts = {}
         by_type = {}
-        for ptype in ['product', 'consu', 'service']:
-            count = odoo_client.search_count('product.template', [['type', '=', ptype]])
-            if count > 0:
-                by_type[ptype] = count
+        for group in category_type_groups:
+            count = group.get('__count', 0)
+            if group.get('categ_id'):
+                categ_id = group['categ_id'][0]
+                category_counts[categ_id] = category_counts.get(categ_id, 0) + count
+            if group.get('type'):
+                by_type[group['type']] = by_type.get(group['type'], 0) + count
         
-        # Giá trung bình
-        all_prices = odoo_client.search_read('product.template', [], ['list_price'])
-        prices = [p['list_price'] for p in all_prices if p['list_price'] > 0]
-        avg_price = sum(prices) / len(prices) if prices else 0
-        total_value = sum(prices)
+        by_category = {}
+        if category_counts:
+            categories = await async_odoo_client.read('product.category', list(category_counts.keys()), ['name'])
+            for cat in categories:
+                if category_counts.get(cat['id'], 0) > 0:
+                    by_category[cat['name']] = category_counts[cat['id']]
+        
+        # Giá trung bình: tổng và số lượng tính phía server
+        price_groups = await async_odoo_client.read_group(
+            'product.template', [['list_price', '>', 0]], ['list_price:sum'], ['type'], lazy=False
+        )
+        priced_count = sum(group.get('__count', 0) for group in price_groups)
+        total_value = sum(group.get('list_price') or 0 for group in price_groups)
+        avg_price = total_value / priced_count if priced_count else 0
         
         # Lấy thống kê gold attributes từ service
-        gold_stats = gold_attribute_service.get_gold_attribute_statistics()
+        gold_stats = await async_odoo_client.run_sync(gold_attribute_service.get_gold_attribute_statistics)
         
         stats = {
             'total_templates': total_templates,
@@ -913,35 +893,37 @@ async def get_product_template_statistics():
 async def get_product_template(product_id: int):
     """Lấy thông tin mã mẫu sản phẩm theo ID"""
     try:
-        product = odoo_client.read('product.template', [product_id], [
-            'name', 'default_code', 'categ_id', 'type', 'active', 'sale_ok', 'purchase_ok',
-            'list_price', 'standard_price', 'weight', 'volume', 'description', 
-            'description_sale', 'description_purchase', 'barcode', 'uom_id', 'uom_po_id',
-            'create_date', 'write_date'
-        ])
+        # Template, số biến thể và gold attributes độc lập nhau: gửi song song
+        async with async_odoo_client.batch() as batch:
+            product_call = batch.read('product.template', [product_id], [
+                'name', 'default_code', 'categ_id', 'type', 'active', 'sale_ok', 'purchase_ok',
+                'list_price', 'standard_price', 'weight', 'volume', 'description', 
+                'description_sale', 'description_purchase', 'barcode', 'uom_id', 'uom_po_id',
+                'create_date', 'write_date'
+            ])
+            variant_count_call = batch.search_count('product.product', [['product_tmpl_id', '=', product_id]])
+            gold_attributes_call = batch.call(gold_attribute_service.get_product_gold_attributes, product_id)
+        
+        product = product_call.result()
         if not product:
             raise HTTPException(status_code=404, detail="Không tìm thấy mã mẫu sản phẩm")
         
-        # Lấy tên danh mục và đơn vị tính
-        if product[0].get('categ_id'):
-            categ = odoo_client.read('product.category', [product[0]['categ_id'][0]], ['name'])
-            product[0]['categ_name'] = categ[0]['name'] if categ else ''
-        else:
-            product[0]['categ_name'] = ''
-            
-        if product[0].get('uom_id'):
-            uom = odoo_client.read('uom.uom', [product[0]['uom_id'][0]], ['name'])
-            product[0]['uom_name'] = uom[0]['name'] if uom else ''
-        else:
-            product[0]['uom_name'] = ''
+        # Lấy tên danh mục và đơn vị tính (cần categ_id/uom_id của template)
+        async with async_odoo_client.batch() as batch:
+            categ_call = batch.read('product.category', [product[0]['categ_id'][0]], ['name']) if product[0].get('categ_id') else None
+            uom_call = batch.read('uom.uom', [product[0]['uom_id'][0]], ['name']) if product[0].get('uom_id') else None
+        
+        categ = categ_call.result() if categ_call else None
+        product[0]['categ_name'] = categ[0]['name'] if categ else ''
+        uom = uom_call.result() if uom_call else None
+        product[0]['uom_name'] = uom[0]['name'] if uom else ''
         
         # Đếm số biến thể
-        variant_count = odoo_client.search_count('product.product', [['product_tmpl_id', '=', product_id]])
-        product[0]['variant_count'] = variant_count
+        product[0]['variant_count'] = variant_count_call.result()
         
         # Lấy gold attributes từ Odoo server
         try:
-            gold_attributes = gold_attribute_service.get_product_gold_attributes(product_id)
+            gold_attributes = gold_attributes_call.result()
             product[0]['gold_attributes'] = gold_attributes
             product[0]['is_jewelry_product'] = len(gold_attributes) > 0
         except Exception as e:
@@ -1004,21 +986,21 @@ async def update_product_template(product_id: int, product: ProductTemplateUpdat
                     product_data[key] = value
         
         # Kiểm tra product có tồn tại không
-        existing_count = odoo_client.search_count('product.template', [['id', '=', product_id]])
+        existing_count = await async_odoo_client.search_count('product.template', [['id', '=', product_id]])
         if existing_count == 0:
             raise HTTPException(status_code=404, detail="Không tìm thấy mã mẫu sản phẩm")
         
         # Update basic product fields trong Odoo (nếu có)
         if product_data:
             print(f"Updating Odoo product {product_id} with data: {product_data}")
-            result = odoo_client.write('product.template', product_id, product_data)
+            result = await async_odoo_client.write('product.template', product_id, product_data)
             print(f"Odoo update result: {result}")
         
         # Update gold attributes trong Odoo server
         gold_attrs_result = None
         if gold_attributes and isinstance(gold_attributes, dict):
             print(f"Updating gold attributes for product {product_id}: {gold_attributes}")
-            gold_attrs_result = gold_attribute_service.bulk_set_product_gold_attributes(product_id, gold_attributes)
+            gold_attrs_result = await async_odoo_client.run_sync(gold_attribute_service.bulk_set_product_gold_attributes, product_id, gold_attributes)
             print(f"Gold attributes result: {gold_attrs_result}")
         
         # Tạo response message
@@ -1061,11 +1043,11 @@ async def delete_product_template(product_id: int):
     """Xóa mã mẫu sản phẩm"""
     try:
         # Kiểm tra xem có biến thể nào không
-        variant_count = odoo_client.search_count('product.product', [['product_tmpl_id', '=', product_id]])
+        variant_count = await async_odoo_client.search_count('product.product', [['product_tmpl_id', '=', product_id]])
         if variant_count > 0:
             raise HTTPException(status_code=400, detail=f"Không thể xóa sản phẩm vì còn {variant_count} biến thể")
         
-        odoo_client.unlink('product.template', [product_id])
+        await async_odoo_client.unlink('product.template', [product_id])
         return APIResponse(success=True, message="Xóa mã mẫu sản phẩm thành công!")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1078,7 +1060,7 @@ async def delete_product_template(product_id: int):
 async def get_category_options():
     """Lấy danh sách danh mục sản phẩm cho dropdown"""
     try:
-        categories = odoo_client.search_read('product.category', [], ['name', 'complete_name'], order='complete_name')
+        categories = await async_odoo_client.search_read('product.category', [], ['name', 'complete_name'], order='complete_name')
         return APIResponse(success=True, data=categories)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1087,7 +1069,7 @@ async def get_category_options():
 async def get_uom_options():
     """Lấy danh sách đơn vị tính cho dropdown"""
     try:
-        uoms = odoo_client.search_read('uom.uom', [], ['name', 'category_id'], order='name')
+        uoms = await async_odoo_client.search_read('uom.uom', [], ['name', 'category_id'], order='name')
         return APIResponse(success=True, data=uoms)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1124,10 +1106,10 @@ async def get_product_template_gold_attributes(product_id: int):
     """Lấy thuộc tính vàng của mã mẫu sản phẩm"""
     try:
         # Lấy gold attributes đã lưu của product template này
-        gold_attributes = gold_attribute_service.get_product_gold_attributes(product_id)
+        gold_attributes = await async_odoo_client.run_sync(gold_attribute_service.get_product_gold_attributes, product_id)
         
         # Lấy tất cả gold attributes available
-        available_attributes = odoo_client.search_read(
+        available_attributes = await async_odoo_client.search_read(
             'gold.attribute.line', 
             [['active', '=', True]], 
             ['name', 'display_name', 'short_name', 'field_type', 'required', 'editable', 
@@ -1139,7 +1121,7 @@ async def get_product_template_gold_attributes(product_id: int):
         group_ids = [attr['group_id'][0] for attr in available_attributes if attr.get('group_id')]
         group_dict = {}
         if group_ids:
-            groups = odoo_client.read('product.template.attribute.group', group_ids, ['name'])
+            groups = await async_odoo_client.read('product.template.attribute.group', group_ids, ['name'])
             group_dict = {g['id']: g['name'] for g in groups}
         
         # Thêm group name vào attributes
@@ -1189,7 +1171,7 @@ async def get_attribute_usage_statistics():
     """Thống kê sử dụng thuộc tính vàng"""
     try:
         # Lấy tất cả gold attributes
-        attributes = odoo_client.search_read(
+        attributes = await async_odoo_client.search_read(
             'gold.attribute.line', 
             [], 
             ['name', 'display_name', 'category']
@@ -1222,29 +1204,32 @@ async def product_template_bulk_action(bulk_action: ProductTemplateBulkAction):
         data = bulk_action.data or {}
         
         if action == 'activate':
-            odoo_client.write('product.template', template_ids, {'active': True})
+            await async_odoo_client.write('product.template', template_ids, {'active': True})
             message = f"Đã kích hoạt {len(template_ids)} mã mẫu"
             
         elif action == 'deactivate':
-            odoo_client.write('product.template', template_ids, {'active': False})
+            await async_odoo_client.write('product.template', template_ids, {'active': False})
             message = f"Đã vô hiệu hóa {len(template_ids)} mã mẫu"
             
         elif action == 'delete':
-            # Kiểm tra variants trước khi xóa
+            # Kiểm tra variants trước khi xóa (một read_group cho cả selection)
+            variant_counts = await async_odoo_client.group_count(
+                'product.product', 'product_tmpl_id', [['product_tmpl_id', 'in', template_ids]]
+            )
             for template_id in template_ids:
-                variant_count = odoo_client.search_count('product.product', [['product_tmpl_id', '=', template_id]])
+                variant_count = variant_counts.get(template_id, 0)
                 if variant_count > 0:
                     raise HTTPException(
                         status_code=400, 
                         detail=f"Không thể xóa mã mẫu ID {template_id} vì còn {variant_count} biến thể"
                     )
-            odoo_client.unlink('product.template', template_ids)
+            await async_odoo_client.unlink('product.template', template_ids)
             message = f"Đã xóa {len(template_ids)} mã mẫu"
             
         elif action == 'update_category':
             if 'categ_id' not in data:
                 raise HTTPException(status_code=400, detail="Thiếu categ_id trong data")
-            odoo_client.write('product.template', template_ids, {'categ_id': data['categ_id']})
+            await async_odoo_client.write('product.template', template_ids, {'categ_id': data['categ_id']})
             message = f"Đã cập nhật danh mục cho {len(template_ids)} mã mẫu"
             
         else:
@@ -1257,7 +1242,6 @@ async def product_template_bulk_action(bulk_action: ProductTemplateBulkAction):
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    global sse_connections
     try:
         calculator = kafka_consumer.get_calculator()
         stats = calculator.get_stats()
@@ -1265,8 +1249,11 @@ async def health_check():
         return {
             "status": "healthy",
             "kafka_connected": kafka_consumer.running,
-            "sse_connections": len(sse_connections),
+            "sse_connections": len(pricing_broadcaster.subscribers),
+            "sse_broadcaster": pricing_broadcaster.get_stats(),
             "calculator_stats": stats,
+            "kafka_commit": kafka_consumer.get_commit_stats(),
+            "odoo_pool": odoo_client.get_pool_stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -1285,7 +1272,7 @@ async def health_check():
 async def get_product_gold_attributes_client(product_id: int):
     """Lấy gold attributes từ Odoo server"""
     try:
-        gold_attributes = gold_attribute_service.get_product_gold_attributes(product_id)
+        gold_attributes = await async_odoo_client.run_sync(gold_attribute_service.get_product_gold_attributes, product_id)
         return APIResponse(success=True, data=gold_attributes)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1298,7 +1285,7 @@ async def set_product_gold_attributes_client(product_id: int, request: Request):
         body = await request.json()
         
         # Kiểm tra product có tồn tại không
-        existing_count = odoo_client.search_count('product.template', [['id', '=', product_id]])
+        existing_count = await async_odoo_client.search_count('product.template', [['id', '=', product_id]])
         if existing_count == 0:
             raise HTTPException(status_code=404, detail="Không tìm thấy mã mẫu sản phẩm")
         
@@ -1313,7 +1300,7 @@ async def set_product_gold_attributes_client(product_id: int, request: Request):
                 continue
         
         print(f"Setting gold attributes for product {product_id}: {converted_attributes}")
-        result = gold_attribute_service.bulk_set_product_gold_attributes(product_id, converted_attributes)
+        result = await async_odoo_client.run_sync(gold_attribute_service.bulk_set_product_gold_attributes, product_id, converted_attributes)
         print(f"Result: {result}")
         
         if result:
@@ -1330,7 +1317,7 @@ async def set_product_gold_attributes_client(product_id: int, request: Request):
 async def clear_product_gold_attributes_client(product_id: int):
     """Xóa tất cả gold attributes của product"""
     try:
-        success = gold_attribute_service.clear_all_product_gold_attributes(product_id)
+        success = await async_odoo_client.run_sync(gold_attribute_service.clear_all_product_gold_attributes, product_id)
         if success:
             return APIResponse(success=True, message="Đã xóa tất cả gold attributes")
         else:
@@ -1342,7 +1329,7 @@ async def clear_product_gold_attributes_client(product_id: int):
 async def get_gold_attributes_statistics():
     """Lấy thống kê về gold attributes usage"""
     try:
-        stats = gold_attribute_service.get_gold_attribute_statistics()
+        stats = await async_odoo_client.run_sync(gold_attribute_service.get_gold_attribute_statistics)
         return APIResponse(success=True, data=stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -18,6 +18,15 @@ ODOO_CONFIG = {
     'db': os.getenv('ODOO_DB', 'odoo_db'),
     'username': os.getenv('ODOO_USERNAME', 'admin'),
     'password': os.getenv('ODOO_PASSWORD', 'admin'),
+    # Số kết nối XML-RPC giữ sẵn cho mỗi worker
+    'pool_size': int(os.getenv('ODOO_POOL_SIZE', 8)),
+    'pool_timeout': float(os.getenv('ODOO_POOL_TIMEOUT', 30)),
+    # Thời gian (giây) giữ cache metadata gold.attribute.line / product.attribute
+    'metadata_cache_ttl': float(os.getenv('ODOO_METADATA_CACHE_TTL', 300)),
+    # Gộp các lời gọi đọc giống hệt nhau đang chạy đồng thời thành một RPC
+    'single_flight': os.getenv('ODOO_SINGLE_FLIGHT', 'True').lower() == 'true',
+    # Giao thức gọi Odoo: 'xmlrpc' hoặc 'jsonrpc' (dùng orjson nếu đã cài)
+    'protocol': os.getenv('ODOO_PROTOCOL', 'xmlrpc').lower(),
 }
 
 # ================================
@@ -31,6 +40,39 @@ APP_CONFIG = {
     'reload': os.getenv('APP_RELOAD', 'True').lower() == 'true',
 }
 
+# ================================
+# REAL-TIME PRICING CONFIGURATION
+# ================================
+
+PRICING_STREAM_CONFIG = {
+    # Số SKU chờ gửi tối đa cho mỗi client (buffer gộp theo SKU nên không vượt quá
+    # số SKU của catalog; 0 = không giới hạn thêm, client không bị resync vì một tick)
+    'client_buffer_size': int(os.getenv('PRICING_SSE_CLIENT_BUFFER', 0)) or None,
+    # Khi buffer đầy: 'resync' (gửi lại full snapshot) hoặc 'drop_oldest'
+    'overflow_policy': os.getenv('PRICING_SSE_OVERFLOW_POLICY', 'resync'),
+    'keepalive_sec': float(os.getenv('PRICING_SSE_KEEPALIVE', 30)),
+    # Số update gần nhất giữ lại để replay cho client kết nối lại (Last-Event-ID),
+    # batch mới nhất luôn được giữ trọn dù lớn hơn giới hạn này
+    'replay_buffer_size': int(os.getenv('PRICING_SSE_REPLAY_BUFFER', 50000)),
+}
+
+# Cấu hình Kafka consumer cho pricing
+KAFKA_PRICING_CONFIG = {
+    'bootstrap_servers': os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092'),
+    'group_id': os.getenv('KAFKA_PRICING_GROUP_ID', 'pricing-gateway'),
+    # File checkpoint để warm start (để trống để tắt)
+    'checkpoint_path': os.getenv('PRICING_CHECKPOINT_PATH', 'data/pricing_checkpoint.bin') or None,
+    'checkpoint_interval_sec': float(os.getenv('PRICING_CHECKPOINT_INTERVAL', 30)),
+    # Đọc lại topic compacted rates/weights khi khởi động để có state đầy đủ
+    'bootstrap_from_compacted': os.getenv('PRICING_BOOTSTRAP_COMPACTED', 'False').lower() == 'true',
+    'bootstrap_batch_size': int(os.getenv('PRICING_BOOTSTRAP_BATCH_SIZE', 10000)),
+    # Commit offset thủ công sau khi áp dụng: mỗi N message hoặc T ms
+    'commit_every_messages': int(os.getenv('PRICING_COMMIT_EVERY_MESSAGES', 1000)),
+    'commit_interval_ms': int(os.getenv('PRICING_COMMIT_INTERVAL_MS', 1000)),
+    # Số lần thử lại một message của batch lỗi trước khi bỏ qua (dead-letter)
+    'max_message_retries': int(os.getenv('PRICING_MAX_MESSAGE_RETRIES', 3)),
+}
+
 # ================================
 # BUSINESS LOGIC CONFIGURATION
 # ================================
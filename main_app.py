@@ -28,7 +28,8 @@ def format_datetime(dt_value, format_str='%d/%m/%Y %H:%M'):
     return str(dt_value)
 
 # Import Odoo client và config
-from odoo_client import odoo_client
+from odoo_client import odoo_client, async_odoo_client
+from src.core.single_flight import SingleFlight
 from config import get_odoo_config, GOLD_ATTRIBUTE_CATEGORIES, GOLD_FIELD_TYPES
 
 # ================================
@@ -141,6 +142,10 @@ odoo_client.url = odoo_config['url']
 odoo_client.db = odoo_config['db']
 odoo_client.username = odoo_config['username']
 odoo_client.password = odoo_config['password']
+odoo_client.pool_size = odoo_config['pool_size']
+odoo_client.pool_timeout = odoo_config['pool_timeout']
+odoo_client.protocol = odoo_config['protocol']
+odoo_client.single_flight = SingleFlight() if odoo_config['single_flight'] else None
 
 @app.on_event("startup")
 async def startup_event():
@@ -148,7 +153,7 @@ async def startup_event():
     print("🚀 Starting BTMH Gold Attribute Management...")
     
     try:
-        odoo_client.connect()
+        await async_odoo_client.connect()
         print("✅ Odoo connection established")
     except Exception as e:
         print(f"❌ Odoo connection failed: {e}")
@@ -167,11 +172,12 @@ async def health_check():
     """Health check endpoint"""
     try:
         # Test Odoo connection
-        version = odoo_client.version()
+        version = await async_odoo_client.version()
         return {
             "status": "healthy",
             "odoo_connected": True,
             "odoo_version": version,
+            "odoo_pool": odoo_client.get_pool_stats(),
             "timestamp": datetime.utcnow().isoformat(),
             "version": "3.0.0"
         }
@@ -208,7 +214,7 @@ async def get_attribute_groups(
         print(f"📊 Search domain: {domain}, offset: {offset}, limit: {limit}")
         
         # Get data
-        groups = odoo_client.search_read(
+        groups = await async_odoo_client.search_read(
             'product.template.attribute.group',
             domain,
             ['name', 'code', 'sequence', 'create_date', 'write_date'],
@@ -222,7 +228,7 @@ async def get_attribute_groups(
         # Đếm số thuộc tính trong mỗi nhóm
         for group in groups:
             try:
-                attr_count = odoo_client.search_count('gold.attribute.line', [['group_id', '=', group['id']]])
+                attr_count = await async_odoo_client.search_count('gold.attribute.line', [['group_id', '=', group['id']]])
                 group['attribute_count'] = attr_count
             except Exception as e:
                 print(f"⚠️ Error counting attributes for group {group['id']}: {e}")
@@ -233,7 +239,7 @@ async def get_attribute_groups(
             group['write_date'] = format_datetime(group.get('write_date'))
         
         # Get total count
-        total = odoo_client.search_count('product.template.attribute.group', domain)
+        total = await async_odoo_client.search_count('product.template.attribute.group', domain)
         
         print(f"📈 Total: {total}")
         
@@ -255,7 +261,7 @@ async def get_attribute_groups(
 async def get_attribute_group(group_id: int):
     """Lấy thông tin nhóm thuộc tính"""
     try:
-        group = odoo_client.read('product.template.attribute.group', [group_id], [
+        group = await async_odoo_client.read('product.template.attribute.group', [group_id], [
             'name', 'code', 'sequence', 'create_date', 'write_date'
         ])
         
@@ -265,7 +271,7 @@ async def get_attribute_group(group_id: int):
         group = group[0]
         
         # Lấy danh sách thuộc tính trong nhóm
-        attributes = odoo_client.search_read(
+        attributes = await async_odoo_client.search_read(
             'gold.attribute.line',
             [['group_id', '=', group_id]],
             ['name', 'display_name', 'field_type', 'required', 'active'],
@@ -291,18 +297,18 @@ async def create_attribute_group(group: AttributeGroupCreate):
     """Tạo nhóm thuộc tính mới"""
     try:
         # Validate unique name
-        existing = odoo_client.search('product.template.attribute.group', [['name', '=', group.name]])
+        existing = await async_odoo_client.search('product.template.attribute.group', [['name', '=', group.name]])
         if existing:
             raise HTTPException(status_code=400, detail="Tên nhóm đã tồn tại")
         
         # Create new group
         group_data = group.dict(exclude_none=True)
-        group_id = odoo_client.create('product.template.attribute.group', group_data)
+        group_id = await async_odoo_client.create('product.template.attribute.group', group_data)
         
         # Return created group
-        created_group = odoo_client.read('product.template.attribute.group', [group_id], [
+        created_group = (await async_odoo_client.read('product.template.attribute.group', [group_id], [
             'name', 'code', 'sequence', 'create_date', 'write_date'
-        ])[0]
+        ]))[0]
         
         created_group['attribute_count'] = 0
         
@@ -321,13 +327,13 @@ async def update_attribute_group(group_id: int, group: AttributeGroupUpdate):
     """Cập nhật nhóm thuộc tính"""
     try:
         # Check if group exists
-        existing = odoo_client.read('product.template.attribute.group', [group_id], ['id'])
+        existing = await async_odoo_client.read('product.template.attribute.group', [group_id], ['id'])
         if not existing:
             raise HTTPException(status_code=404, detail="Không tìm thấy nhóm thuộc tính")
         
         # Validate unique name if updating name
         if group.name:
-            duplicate = odoo_client.search('product.template.attribute.group', [
+            duplicate = await async_odoo_client.search('product.template.attribute.group', [
                 ['name', '=', group.name],
                 ['id', '!=', group_id]
             ])
@@ -337,15 +343,15 @@ async def update_attribute_group(group_id: int, group: AttributeGroupUpdate):
         # Update group
         update_data = group.dict(exclude_none=True)
         if update_data:
-            odoo_client.write('product.template.attribute.group', [group_id], update_data)
+            await async_odoo_client.write('product.template.attribute.group', [group_id], update_data)
         
         # Return updated group
-        updated_group = odoo_client.read('product.template.attribute.group', [group_id], [
+        updated_group = (await async_odoo_client.read('product.template.attribute.group', [group_id], [
             'name', 'code', 'sequence', 'create_date', 'write_date'
-        ])[0]
+        ]))[0]
         
         # Get attribute count
-        attr_count = odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
+        attr_count = await async_odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
         updated_group['attribute_count'] = attr_count
         
         # Format dates
@@ -364,17 +370,17 @@ async def delete_attribute_group(group_id: int):
     """Xóa nhóm thuộc tính"""
     try:
         # Check if group exists
-        existing = odoo_client.read('product.template.attribute.group', [group_id], ['id'])
+        existing = await async_odoo_client.read('product.template.attribute.group', [group_id], ['id'])
         if not existing:
             raise HTTPException(status_code=404, detail="Không tìm thấy nhóm thuộc tính")
         
         # Check if group has attributes
-        attr_count = odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
+        attr_count = await async_odoo_client.search_count('gold.attribute.line', [['group_id', '=', group_id]])
         if attr_count > 0:
             raise HTTPException(status_code=400, detail=f"Không thể xóa nhóm có {attr_count} thuộc tính. Vui lòng xóa các thuộc tính trước.")
         
         # Delete group
-        odoo_client.unlink('product.template.attribute.group', [group_id])
+        await async_odoo_client.unlink('product.template.attribute.group', [group_id])
         
         return APIResponse(success=True, message="Xóa nhóm thuộc tính thành công")
         
@@ -418,7 +424,7 @@ async def get_gold_attributes(
         offset = (page - 1) * limit
         
         # Get data
-        attributes = odoo_client.search_read(
+        attributes = await async_odoo_client.search_read(
             'gold.attribute.line',
             domain,
             ['name', 'display_name', 'short_name', 'field_type', 'required', 
@@ -433,7 +439,7 @@ async def get_gold_attributes(
         group_ids = [attr['group_id'][0] for attr in attributes if attr.get('group_id')]
         group_dict = {}
         if group_ids:
-            groups = odoo_client.read('product.template.attribute.group', group_ids, ['name'])
+            groups = await async_odoo_client.read('product.template.attribute.group', group_ids, ['name'])
             group_dict = {g['id']: g['name'] for g in groups}
         
         # Thêm thông tin groups và format data
@@ -459,7 +465,7 @@ async def get_gold_attributes(
             attr['write_date'] = format_datetime(attr.get('write_date'))
         
         # Get total count
-        total = odoo_client.search_count('gold.attribute.line', domain)
+        total = await async_odoo_client.search_count('gold.attribute.line', domain)
         
         return APIResponse(
             success=True,
@@ -476,7 +482,7 @@ async def get_gold_attributes(
 async def get_gold_attribute(attr_id: int):
     """Lấy thông tin thuộc tính vàng"""
     try:
-        attr = odoo_client.read('gold.attribute.line', [attr_id], [
+        attr = await async_odoo_client.read('gold.attribute.line', [attr_id], [
             'name', 'display_name', 'short_name', 'field_type', 'required', 
             'editable', 'active', 'default_value', 'description', 'unit',
             'validation_regex', 'selection_options', 'category', 'group_id',
@@ -490,7 +496,7 @@ async def get_gold_attribute(attr_id: int):
         
         # Lấy tên group
         if attr.get('group_id'):
-            group = odoo_client.read('product.template.attribute.group', [attr['group_id'][0]], ['name'])
+            group = await async_odoo_client.read('product.template.attribute.group', [attr['group_id'][0]], ['name'])
             attr['group_name'] = group[0]['name'] if group else ''
         else:
             attr['group_name'] = 'Không có nhóm'
@@ -511,13 +517,13 @@ async def create_gold_attribute(attr: GoldAttributeCreate):
     """Tạo thuộc tính vàng mới"""
     try:
         # Validate unique name
-        existing = odoo_client.search('gold.attribute.line', [['name', '=', attr.name]])
+        existing = await async_odoo_client.search('gold.attribute.line', [['name', '=', attr.name]])
         if existing:
             raise HTTPException(status_code=400, detail="Tên thuộc tính đã tồn tại")
         
         # Validate group if provided
         if attr.group_id:
-            group_exists = odoo_client.read('product.template.attribute.group', [attr.group_id], ['id'])
+            group_exists = await async_odoo_client.read('product.template.attribute.group', [attr.group_id], ['id'])
             if not group_exists:
                 raise HTTPException(status_code=400, detail="Nhóm thuộc tính không tồn tại")
         
@@ -528,19 +534,19 @@ async def create_gold_attribute(attr: GoldAttributeCreate):
         
         # Create new attribute
         attr_data = attr.dict(exclude_none=True)
-        attr_id = odoo_client.create('gold.attribute.line', attr_data)
+        attr_id = await async_odoo_client.create('gold.attribute.line', attr_data)
         
         # Return created attribute
-        created_attr = odoo_client.read('gold.attribute.line', [attr_id], [
+        created_attr = (await async_odoo_client.read('gold.attribute.line', [attr_id], [
             'name', 'display_name', 'short_name', 'field_type', 'required', 
             'editable', 'active', 'default_value', 'description', 'unit',
             'validation_regex', 'selection_options', 'category', 'group_id',
             'create_date', 'write_date'
-        ])[0]
+        ]))[0]
         
         # Lấy tên group
         if created_attr.get('group_id'):
-            group = odoo_client.read('product.template.attribute.group', [created_attr['group_id'][0]], ['name'])
+            group = await async_odoo_client.read('product.template.attribute.group', [created_attr['group_id'][0]], ['name'])
             created_attr['group_name'] = group[0]['name'] if group else ''
         else:
             created_attr['group_name'] = 'Không có nhóm'
@@ -561,13 +567,13 @@ async def update_gold_attribute(attr_id: int, attr: GoldAttributeUpdate):
     """Cập nhật thuộc tính vàng"""
     try:
         # Check if attribute exists
-        existing = odoo_client.read('gold.attribute.line', [attr_id], ['id'])
+        existing = await async_odoo_client.read('gold.attribute.line', [attr_id], ['id'])
         if not existing:
             raise HTTPException(status_code=404, detail="Không tìm thấy thuộc tính")
         
         # Validate unique name if updating name
         if attr.name:
-            duplicate = odoo_client.search('gold.attribute.line', [
+            duplicate = await async_odoo_client.search('gold.attribute.line', [
                 ['name', '=', attr.name],
                 ['id', '!=', attr_id]
             ])
@@ -576,7 +582,7 @@ async def update_gold_attribute(attr_id: int, attr: GoldAttributeUpdate):
         
         # Validate group if provided
         if attr.group_id:
-            group_exists = odoo_client.read('product.template.attribute.group', [attr.group_id], ['id'])
+            group_exists = await async_odoo_client.read('product.template.attribute.group', [attr.group_id], ['id'])
             if not group_exists:
                 raise HTTPException(status_code=400, detail="Nhóm thuộc tính không tồn tại")
         
@@ -589,19 +595,19 @@ async def update_gold_attribute(attr_id: int, attr: GoldAttributeUpdate):
         # Update attribute
         update_data = attr.dict(exclude_none=True)
         if update_data:
-            odoo_client.write('gold.attribute.line', [attr_id], update_data)
+            await async_odoo_client.write('gold.attribute.line', [attr_id], update_data)
         
         # Return updated attribute
-        updated_attr = odoo_client.read('gold.attribute.line', [attr_id], [
+        updated_attr = (await async_odoo_client.read('gold.attribute.line', [attr_id], [
             'name', 'display_name', 'short_name', 'field_type', 'required', 
             'editable', 'active', 'default_value', 'description', 'unit',
             'validation_regex', 'selection_options', 'category', 'group_id',
             'create_date', 'write_date'
-        ])[0]
+        ]))[0]
         
         # Lấy tên group
         if updated_attr.get('group_id'):
-            group = odoo_client.read('product.template.attribute.group', [updated_attr['group_id'][0]], ['name'])
+            group = await async_odoo_client.read('product.template.attribute.group', [updated_attr['group_id'][0]], ['name'])
             updated_attr['group_name'] = group[0]['name'] if group else ''
         else:
             updated_attr['group_name'] = 'Không có nhóm'
@@ -622,7 +628,7 @@ async def delete_gold_attribute(attr_id: int):
     """Xóa thuộc tính vàng"""
     try:
         # Check if attribute exists
-        existing = odoo_client.read('gold.attribute.line', [attr_id], ['id'])
+        existing = await async_odoo_client.read('gold.attribute.line', [attr_id], ['id'])
         if not existing:
             raise HTTPException(status_code=404, detail="Không tìm thấy thuộc tính")
         
@@ -630,7 +636,7 @@ async def delete_gold_attribute(attr_id: int):
         # Có thể thêm logic kiểm tra xem có product template nào đang sử dụng attribute này không
         
         # Delete attribute
-        odoo_client.unlink('gold.attribute.line', [attr_id])
+        await async_odoo_client.unlink('gold.attribute.line', [attr_id])
         
         return APIResponse(success=True, message="Xóa thuộc tính vàng thành công")
         
@@ -687,7 +693,7 @@ async def get_product_templates(
                 
                 try:
                     # Get the attribute info
-                    attr_info = odoo_client.read('gold.attribute.line', [int(attr_id)], 
+                    attr_info = await async_odoo_client.read('gold.attribute.line', [int(attr_id)], 
                                                ['field_type', 'name'])
                     if not attr_info:
                         print(f"    ❌ Attribute {attr_id} not found")
@@ -739,7 +745,7 @@ async def get_product_templates(
         offset = (page - 1) * limit
         
         # Get data
-        templates = odoo_client.search_read(
+        templates = await async_odoo_client.search_read(
             'product.template',
             domain,
             ['name', 'default_code', 'categ_id', 'type', 'sale_ok', 'purchase_ok',
@@ -753,7 +759,7 @@ async def get_product_templates(
         categ_ids = [tmpl['categ_id'][0] for tmpl in templates if tmpl.get('categ_id')]
         categ_dict = {}
         if categ_ids:
-            categories = odoo_client.read('product.category', categ_ids, ['name'])
+            categories = await async_odoo_client.read('product.category', categ_ids, ['name'])
             categ_dict = {c['id']: c['name'] for c in categories}
         
         # Thêm thông tin category và format data
@@ -768,7 +774,7 @@ async def get_product_templates(
             tmpl['write_date'] = format_datetime(tmpl.get('write_date'))
         
         # Get total count
-        total = odoo_client.search_count('product.template', domain)
+        total = await async_odoo_client.search_count('product.template', domain)
         
         return APIResponse(
             success=True,
@@ -786,7 +792,7 @@ async def get_product_template(template_id: int):
     """Lấy thông tin mã mẫu sản phẩm và thuộc tính vàng"""
     try:
         # Get product template info
-        template = odoo_client.read('product.template', [template_id], [
+        template = await async_odoo_client.read('product.template', [template_id], [
             'name', 'default_code', 'categ_id', 'type', 'sale_ok', 'purchase_ok',
             'list_price', 'standard_price', 'description', 'create_date', 'write_date'
         ])
@@ -798,14 +804,14 @@ async def get_product_template(template_id: int):
         
         # Get category name
         if template.get('categ_id'):
-            category = odoo_client.read('product.category', [template['categ_id'][0]], ['name'])
+            category = await async_odoo_client.read('product.category', [template['categ_id'][0]], ['name'])
             template['categ_name'] = category[0]['name'] if category else ''
         else:
             template['categ_name'] = ''
         
         # Get gold attributes (via product.template.attribute.line)
         # Mapping gold attributes thông qua product.attribute names bắt đầu với "gold_"
-        attr_lines = odoo_client.search_read(
+        attr_lines = await async_odoo_client.search_read(
             'product.template.attribute.line',
             [['product_tmpl_id', '=', template_id]],
             ['attribute_id', 'value_ids']
@@ -814,14 +820,14 @@ async def get_product_template(template_id: int):
         gold_attributes = {}
         for line in attr_lines:
             attr_id = line['attribute_id'][0]
-            attr_info = odoo_client.read('product.attribute', [attr_id], ['name', 'display_name'])
+            attr_info = await async_odoo_client.read('product.attribute', [attr_id], ['name', 'display_name'])
             
             if attr_info and attr_info[0]['name'].startswith('gold_'):
                 # Đây là gold attribute
                 gold_attr_name = attr_info[0]['name'][5:]  # Remove 'gold_' prefix
                 
                 # Find corresponding gold.attribute.line
-                gold_attrs = odoo_client.search_read(
+                gold_attrs = await async_odoo_client.search_read(
                     'gold.attribute.line',
                     [['name', '=', gold_attr_name]],
                     ['id', 'display_name', 'field_type', 'unit']
@@ -832,7 +838,7 @@ async def get_product_template(template_id: int):
                     
                     # Get values
                     if line['value_ids']:
-                        values = odoo_client.read('product.attribute.value', line['value_ids'], ['name'])
+                        values = await async_odoo_client.read('product.attribute.value', line['value_ids'], ['name'])
                         if len(values) == 1:
                             gold_attributes[gold_attr['id']] = values[0]['name']
                         else:
@@ -861,7 +867,7 @@ async def get_product_template(template_id: int):
 async def get_categories():
     """Lấy danh sách danh mục sản phẩm"""
     try:
-        categories = odoo_client.search_read(
+        categories = await async_odoo_client.search_read(
             'product.category',
             [],
             ['name', 'parent_id'],
@@ -890,7 +896,7 @@ async def create_product_template(template: ProductTemplateCreate):
     try:
         # Validate category if provided
         if template.categ_id:
-            category_exists = odoo_client.read('product.category', [template.categ_id], ['id'])
+            category_exists = await async_odoo_client.read('product.category', [template.categ_id], ['id'])
             if not category_exists:
                 raise HTTPException(status_code=400, detail="Danh mục sản phẩm không tồn tại")
         
@@ -899,21 +905,21 @@ async def create_product_template(template: ProductTemplateCreate):
         template_data = {k: v for k, v in template_data.items() if v is not None}
         
         # Create product template
-        template_id = odoo_client.create('product.template', template_data)
+        template_id = await async_odoo_client.create('product.template', template_data)
         
         # Process gold attributes if provided
         if template.gold_attributes:
             await _process_gold_attributes(template_id, template.gold_attributes)
         
         # Return created template
-        created_template = odoo_client.read('product.template', [template_id], [
+        created_template = (await async_odoo_client.read('product.template', [template_id], [
             'name', 'default_code', 'categ_id', 'type', 'sale_ok', 'purchase_ok',
             'list_price', 'standard_price', 'create_date', 'write_date'
-        ])[0]
+        ]))[0]
         
         # Get category name
         if created_template.get('categ_id'):
-            category = odoo_client.read('product.category', [created_template['categ_id'][0]], ['name'])
+            category = await async_odoo_client.read('product.category', [created_template['categ_id'][0]], ['name'])
             created_template['categ_name'] = category[0]['name'] if category else ''
         else:
             created_template['categ_name'] = ''
@@ -934,13 +940,13 @@ async def update_product_template(template_id: int, template: ProductTemplateUpd
     """Cập nhật mã mẫu sản phẩm"""
     try:
         # Check if template exists
-        existing = odoo_client.read('product.template', [template_id], ['id'])
+        existing = await async_odoo_client.read('product.template', [template_id], ['id'])
         if not existing:
             raise HTTPException(status_code=404, detail="Không tìm thấy mã mẫu sản phẩm")
         
         # Validate category if provided
         if template.categ_id:
-            category_exists = odoo_client.read('product.category', [template.categ_id], ['id'])
+            category_exists = await async_odoo_client.read('product.category', [template.categ_id], ['id'])
             if not category_exists:
                 raise HTTPException(status_code=400, detail="Danh mục sản phẩm không tồn tại")
         
@@ -949,21 +955,21 @@ async def update_product_template(template_id: int, template: ProductTemplateUpd
         update_data = {k: v for k, v in update_data.items() if v is not None}
         
         if update_data:
-            odoo_client.write('product.template', [template_id], update_data)
+            await async_odoo_client.write('product.template', [template_id], update_data)
         
         # Process gold attributes if provided
         if template.gold_attributes is not None:
             await _process_gold_attributes(template_id, template.gold_attributes)
         
         # Return updated template
-        updated_template = odoo_client.read('product.template', [template_id], [
+        updated_template = (await async_odoo_client.read('product.template', [template_id], [
             'name', 'default_code', 'categ_id', 'type', 'sale_ok', 'purchase_ok',
             'list_price', 'standard_price', 'create_date', 'write_date'
-        ])[0]
+        ]))[0]
         
         # Get category name
         if updated_template.get('categ_id'):
-            category = odoo_client.read('product.category', [updated_template['categ_id'][0]], ['name'])
+            category = await async_odoo_client.read('product.category', [updated_template['categ_id'][0]], ['name'])
             updated_template['categ_name'] = category[0]['name'] if category else ''
         else:
             updated_template['categ_name'] = ''
@@ -984,19 +990,19 @@ async def delete_product_template(template_id: int):
     """Xóa mã mẫu sản phẩm"""
     try:
         # Check if template exists
-        existing = odoo_client.read('product.template', [template_id], ['id'])
+        existing = await async_odoo_client.read('product.template', [template_id], ['id'])
         if not existing:
             raise HTTPException(status_code=404, detail="Không tìm thấy mã mẫu sản phẩm")
         
         # TODO: Check if template has variants or is used in other documents
         
         # Delete associated attribute lines first
-        attr_lines = odoo_client.search('product.template.attribute.line', [['product_tmpl_id', '=', template_id]])
+        attr_lines = await async_odoo_client.search('product.template.attribute.line', [['product_tmpl_id', '=', template_id]])
         if attr_lines:
-            odoo_client.unlink('product.template.attribute.line', attr_lines)
+            await async_odoo_client.unlink('product.template.attribute.line', attr_lines)
         
         # Delete template
-        odoo_client.unlink('product.template', [template_id])
+        await async_odoo_client.unlink('product.template', [template_id])
         
         return APIResponse(success=True, message="Xóa mã mẫu sản phẩm thành công")
         
@@ -1009,9 +1015,9 @@ async def _process_gold_attributes(template_id: int, gold_attributes: Dict[str,
     """Xử lý thuộc tính vàng cho product template"""
     try:
         # Remove existing attribute lines for this template
-        existing_lines = odoo_client.search('product.template.attribute.line', [['product_tmpl_id', '=', template_id]])
+        existing_lines = await async_odoo_client.search('product.template.attribute.line', [['product_tmpl_id', '=', template_id]])
         if existing_lines:
-            odoo_client.unlink('product.template.attribute.line', existing_lines)
+            await async_odoo_client.unlink('product.template.attribute.line', existing_lines)
         
         # Process each gold attribute
         for attr_id_str, value in gold_attributes.items():
@@ -1021,7 +1027,7 @@ async def _process_gold_attributes(template_id: int, gold_attributes: Dict[str,
             attr_id = int(attr_id_str)
             
             # Get gold attribute info
-            gold_attr = odoo_client.read('gold.attribute.line', [attr_id], ['name', 'field_type'])
+            gold_attr = await async_odoo_client.read('gold.attribute.line', [attr_id], ['name', 'field_type'])
             if not gold_attr:
                 continue
                 
@@ -1029,11 +1035,11 @@ async def _process_gold_attributes(template_id: int, gold_attributes: Dict[str,
             product_attr_name = f"gold_{gold_attr['name']}"
             
             # Get or create corresponding product.attribute
-            product_attrs = odoo_client.search('product.attribute', [['name', '=', product_attr_name]])
+            product_attrs = await async_odoo_client.search('product.attribute', [['name', '=', product_attr_name]])
             
             if not product_attrs:
                 # Create product.attribute
-                product_attr_id = odoo_client.create('product.attribute', {
+                product_attr_id = await async_odoo_client.create('product.attribute', {
                     'name': product_attr_name,
                     'sequence': 10,
                     'create_variant': 'no_variant'
@@ -1044,14 +1050,14 @@ async def _process_gold_attributes(template_id: int, gold_attributes: Dict[str,
             # Create or get attribute value
             value_str = str(value) if gold_attr['field_type'] != 'boolean' else ('True' if value else 'False')
             
-            attr_values = odoo_client.search('product.attribute.value', [
+            attr_values = await async_odoo_client.search('product.attribute.value', [
                 ['attribute_id', '=', product_attr_id],
                 ['name', '=', value_str]
             ])
             
             if not attr_values:
                 # Create attribute value
-                attr_value_id = odoo_client.create('product.attribute.value', {
+                attr_value_id = await async_odoo_client.create('product.attribute.value', {
                     'name': value_str,
                     'attribute_id': product_attr_id,
                     'sequence': 10
@@ -1060,7 +1066,7 @@ async def _process_gold_attributes(template_id: int, gold_attributes: Dict[str,
                 attr_value_id = attr_values[0]
             
             # Create product.template.attribute.line
-            odoo_client.create('product.template.attribute.line', {
+            await async_odoo_client.create('product.template.attribute.line', {
                 'product_tmpl_id': template_id,
                 'attribute_id': product_attr_id,
                 'value_ids': [(6, 0, [attr_value_id])]
@@ -1088,7 +1094,7 @@ async def get_product_template_attributes():
     """Lấy danh sách thuộc tính và giá trị có trong product templates"""
     try:
         # Get all active gold attributes
-        attributes = odoo_client.search_read('gold.attribute.line', 
+        attributes = await async_odoo_client.search_read('gold.attribute.line', 
             [['active', '=', True]], 
             ['id', 'name', 'field_type', 'selection_options'])
         
@@ -4,18 +4,35 @@ Kết nối và tương tác với Odoo server thông qua XML-RPC API
 """
 import xmlrpc.client
 import ssl
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Union
+from src.core.batch import OdooBatch
+from src.core.transport import JsonRpcProxy, JsonRpcProxyPool, JsonRpcTransport, ServerProxyPool
+from src.core.async_odoo_client import AsyncOdooClient
+from src.core.single_flight import READ_METHODS, SingleFlight, make_key
 
 class OdooClient:
     """Client để kết nối với Odoo server"""
     
-    def __init__(self, url=None, db=None, username=None, password=None):
+    def __init__(self, url=None, db=None, username=None, password=None,
+                 pool_size: int = 8, pool_timeout: float = 30, single_flight: bool = True,
+                 protocol: str = 'xmlrpc'):
         # Default config - có thể override từ config.py
         self.url = url or "http://localhost:8069"
         self.db = db or "odoo_db"
         self.username = username or "admin"
         self.password = password or "admin"
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        # 'xmlrpc' (/xmlrpc/2/*) hoặc 'jsonrpc' (/jsonrpc, parse nhanh hơn với kết quả lớn)
+        self.protocol = protocol
+        # Gộp các lời gọi đọc giống hệt nhau đang chạy đồng thời thành một RPC
+        self.single_flight = SingleFlight() if single_flight else None
+        self._batch_executor = None
+        # connect() chạy tuần tự, tránh nhiều thread cùng tạo pool mới
+        self._connect_lock = threading.RLock()
         
         self.uid = None
         self.common = None
@@ -37,6 +54,10 @@ class OdooClient:
     
     def _create_server_proxy(self, endpoint):
         """Tạo ServerProxy với SSL context phù hợp"""
+        if self.protocol == 'jsonrpc':
+            ssl_context = self.ssl_context if self.url.startswith('https://') else None
+            return JsonRpcProxy(JsonRpcTransport(f'{self.url}/jsonrpc', ssl_context=ssl_context), endpoint)
+        
         url = f'{self.url}/xmlrpc/2/{endpoint}'
         
         if self.url.startswith('https://'):
@@ -46,8 +67,30 @@ class OdooClient:
             # HTTP connection
             return xmlrpc.client.ServerProxy(url)
     
+    def _create_server_proxy_pool(self, endpoint):
+        """Tạo pool ServerProxy keep-alive, an toàn khi dùng từ nhiều thread"""
+        ssl_context = self.ssl_context if self.url.startswith('https://') else None
+        if self.protocol == 'jsonrpc':
+            return JsonRpcProxyPool(f'{self.url}/jsonrpc', size=self.pool_size, timeout=self.pool_timeout,
+                                    ssl_context=ssl_context, service=endpoint)
+        url = f'{self.url}/xmlrpc/2/{endpoint}'
+        return ServerProxyPool(url, size=self.pool_size, timeout=self.pool_timeout,
+                               ssl_context=ssl_context)
+    
+    def _ensure_connected(self):
+        """Kết nối nếu chưa có (chỉ một thread thực hiện)"""
+        if self.connected:
+            return
+        with self._connect_lock:
+            if not self.connected:
+                self.connect()
+    
     def connect(self):
         """Kết nối tới Odoo server"""
+        with self._connect_lock:
+            return self._connect()
+    
+    def _connect(self):
         try:
             print(f"🔌 Connecting to Odoo: {self.url}")
             print(f"📊 Database: {self.db}")
@@ -68,8 +111,11 @@ class OdooClient:
             if not self.uid:
                 raise Exception("Authentication failed - Check username/password")
             
-            # Connect to object endpoint
-            self.models = self._create_server_proxy('object')
+            # Connect to object endpoint (pool keep-alive). Thay pool trước rồi mới
+            # đóng pool cũ: kết nối đang được thread khác mượn chỉ bị đóng khi trả về
+            old_models, self.models = self.models, self._create_server_proxy_pool('object')
+            if old_models:
+                old_models.close()
             
             self.connected = True
             print(f"✅ Authenticated as user ID: {self.uid}")
@@ -103,6 +149,23 @@ class OdooClient:
                 
             raise e
     
+    def _execute_kw(self, model_name: str, method: str, args: List, kwargs: Dict = None):
+        """Gọi execute_kw qua pool, lời gọi đọc trùng nhau đang chạy chỉ gửi một RPC"""
+        def call():
+            if kwargs is None:
+                return self.models.execute_kw(self.db, self.uid, self.password, model_name, method, args)
+            return self.models.execute_kw(self.db, self.uid, self.password, model_name, method, args, kwargs)
+        
+        if self.single_flight is None or method not in READ_METHODS:
+            return call()
+        return self.single_flight.do(make_key(model_name, method, args, kwargs), call)
+    
+    def batch(self) -> OdooBatch:
+        """Gom các lời gọi độc lập và chạy song song trên connection pool (xem OdooBatch)"""
+        if self._batch_executor is None:
+            self._batch_executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='odoo-batch')
+        return OdooBatch(self, self._batch_executor)
+    
     def version(self):
         """Lấy thông tin version của Odoo"""
         if not self.common:
@@ -111,8 +174,7 @@ class OdooClient:
     
     def check_access_rights(self, model_name: str, operation: str = 'read') -> bool:
         """Kiểm tra quyền truy cập model"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         try:
             return self.models.execute_kw(
@@ -126,8 +188,7 @@ class OdooClient:
     def search(self, model_name: str, domain: List = None, offset: int = 0, 
                limit: Optional[int] = None, order: str = 'id', count: bool = False) -> Union[List[int], int]:
         """Tìm kiếm records"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         if domain is None:
             domain = []
@@ -138,30 +199,20 @@ class OdooClient:
         if count:
             kwargs['count'] = True
             
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model_name, 'search',
-            [domain], kwargs
-        )
+        return self._execute_kw(model_name, 'search', [domain], kwargs)
     
     def search_count(self, model_name: str, domain: List = None) -> int:
         """Đếm số records"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         if domain is None:
             domain = []
             
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model_name, 'search_count',
-            [domain]
-        )
+        return self._execute_kw(model_name, 'search_count', [domain])
     
     def read(self, model_name: str, ids: List[int], fields: List[str] = None) -> List[Dict]:
         """Đọc dữ liệu records"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         if not ids:
             return []
@@ -170,17 +221,12 @@ class OdooClient:
         if fields:
             kwargs['fields'] = fields
             
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model_name, 'read',
-            [ids], kwargs
-        )
+        return self._execute_kw(model_name, 'read', [ids], kwargs)
     
     def search_read(self, model_name: str, domain: List = None, fields: List[str] = None,
                     offset: int = 0, limit: Optional[int] = None, order: str = 'id') -> List[Dict]:
         """Tìm kiếm và đọc dữ liệu trong một lần call"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         if domain is None:
             domain = []
@@ -191,16 +237,60 @@ class OdooClient:
         if limit is not None:
             kwargs['limit'] = limit
             
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model_name, 'search_read',
-            [domain], kwargs
-        )
+        return self._execute_kw(model_name, 'search_read', [domain], kwargs)
+    
+    def iter_search_read(self, model_name: str, domain: List = None, fields: List[str] = None,
+                         batch_size: int = 500) -> Iterator[Dict]:
+        """Duyệt toàn bộ kết quả search_read theo từng trang batch_size records
+
+        Phân trang theo id (keyset): mỗi trang thêm điều kiện id > id cuối của trang
+        trước và sắp xếp theo id, nên bộ nhớ chỉ giữ một trang và trang sâu không
+        chậm dần như khi dùng offset lớn.
+        """
+        last_id = 0
+        while True:
+            page = self.search_read(model_name, list(domain or []) + [['id', '>', last_id]], fields,
+                                    limit=batch_size, order='id asc')
+            yield from page
+            if len(page) < batch_size:
+                return
+            last_id = page[-1]['id']
+    
+    def read_group(self, model_name: str, domain: List = None, fields: List[str] = None,
+                   groupby: List[str] = None, offset: int = 0, limit: Optional[int] = None,
+                   orderby: Optional[str] = None, lazy: bool = True) -> List[Dict]:
+        """Gom nhóm và tổng hợp records phía server (count, sum, avg...)"""
+        self._ensure_connected()
+            
+        if domain is None:
+            domain = []
+            
+        kwargs = {'offset': offset, 'lazy': lazy}
+        if limit is not None:
+            kwargs['limit'] = limit
+        if orderby:
+            kwargs['orderby'] = orderby
+            
+        return self._execute_kw(model_name, 'read_group', [domain, fields or [], groupby or []], kwargs)
+    
+    def group_count(self, model_name: str, groupby: str, domain: List = None) -> Dict[Any, int]:
+        """Đếm records theo từng giá trị của field groupby trong một lần gọi
+        Returns:
+            {giá trị: số lượng}, với many2one thì key là ID
+        """
+        groups = self.read_group(model_name, domain, [groupby], [groupby])
+        counts = {}
+        for group in groups:
+            key = group.get(groupby)
+            if isinstance(key, (list, tuple)) and key:
+                key = key[0]
+            # Odoo <= 16 dùng '<field>_count', Odoo 17+ dùng '__count'
+            counts[key] = group['__count'] if '__count' in group else group.get(f'{groupby}_count', 0)
+        return counts
     
     def create(self, model_name: str, values: Dict) -> int:
         """Tạo record mới"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         return self.models.execute_kw(
             self.db, self.uid, self.password,
@@ -210,8 +300,7 @@ class OdooClient:
     
     def write(self, model_name: str, ids: List[int], values: Dict) -> bool:
         """Cập nhật records"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         return self.models.execute_kw(
             self.db, self.uid, self.password,
@@ -221,8 +310,7 @@ class OdooClient:
     
     def unlink(self, model_name: str, ids: List[int]) -> bool:
         """Xóa records"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         return self.models.execute_kw(
             self.db, self.uid, self.password,
@@ -232,8 +320,7 @@ class OdooClient:
     
     def call_method(self, model_name: str, method_name: str, args: List = None, kwargs: Dict = None):
         """Gọi method custom của model"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         if args is None:
             args = []
@@ -248,24 +335,27 @@ class OdooClient:
     
     def get_fields(self, model_name: str, attributes: List[str] = None) -> Dict:
         """Lấy thông tin fields của model"""
-        if not self.connected:
-            self.connect()
+        self._ensure_connected()
             
         kwargs = {}
         if attributes:
             kwargs['attributes'] = attributes
             
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model_name, 'fields_get',
-            [], kwargs
-        )
+        return self._execute_kw(model_name, 'fields_get', [], kwargs)
     
     def execute_sql(self, query: str, params: tuple = None):
         """Execute raw SQL query (chỉ dùng khi cần thiết)"""
         # Note: XML-RPC không hỗ trợ trực tiếp SQL queries
         # Cần implement server-side method nếu cần
         raise NotImplementedError("Raw SQL execution not supported via XML-RPC")
+    
+    def get_pool_stats(self) -> Dict:
+        """Thống kê connection pool (occupancy, wait time, reuse ratio)"""
+        stats = self.models.get_stats() if self.models else {'size': self.pool_size, 'created': 0, 'in_use': 0}
+        if self.single_flight is not None:
+            stats['single_flight'] = self.single_flight.get_stats()
+        return stats
 
 # Global instance
-odoo_client = OdooClient()
\ No newline at end of file
+odoo_client = OdooClient()
+async_odoo_client = AsyncOdooClient(odoo_client)
\ No newline at end of file
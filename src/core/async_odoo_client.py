@@ -0,0 +1,136 @@
+"""
+Async Odoo Client
+Bọc OdooClient (sync) để dùng trong các endpoint async của FastAPI mà không block event loop
+"""
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from .batch import AsyncOdooBatch
+from .single_flight import AsyncSingleFlight, make_key
+
+
+class AsyncOdooClient:
+    """Client async với cùng interface như OdooClient
+
+    Mỗi lời gọi XML-RPC được chạy trên một thread pool riêng có kích thước bằng
+    connection pool của client, nên event loop (SSE, Kafka fanout...) không bị
+    đứng trong lúc chờ Odoo trả lời.
+    """
+
+    def __init__(self, client, max_workers: Optional[int] = None):
+        self.client = client
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Coroutine đọc trùng tham số chờ chung một lần chạy thay vì chiếm thêm thread
+        self._single_flight = AsyncSingleFlight()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Lazy initialization của thread pool"""
+        if self._executor is None:
+            workers = self.max_workers or getattr(self.client, 'pool_size', None) or 8
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='odoo-rpc')
+        return self._executor
+
+    async def run_sync(self, func: Callable, *args, **kwargs) -> Any:
+        """Chạy một hàm sync (gọi Odoo) trên thread pool và await kết quả"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def _run_read(self, method_name: str, *args, **kwargs) -> Any:
+        """Chạy một lời gọi đọc của client, gộp các lời gọi giống hệt nhau đang chờ"""
+        func = getattr(self.client, method_name)
+        if getattr(self.client, 'single_flight', None) is None:
+            return await self.run_sync(func, *args, **kwargs)
+        key = make_key(None, method_name, args, kwargs)
+        return await self._single_flight.do(key, lambda: self.run_sync(func, *args, **kwargs))
+
+    def batch(self) -> AsyncOdooBatch:
+        """Gom các lời gọi độc lập và chạy song song (xem AsyncOdooBatch)"""
+        return AsyncOdooBatch(self)
+
+    async def connect(self):
+        """Kết nối tới Odoo server"""
+        return await self.run_sync(self.client.connect)
+
+    async def search_read(self, *args, **kwargs):
+        """Tìm kiếm và đọc records"""
+        return await self._run_read('search_read', *args, **kwargs)
+
+    async def iter_search_read(self, model: str, domain=None, fields=None,
+                               batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Bản async của OdooClient.iter_search_read (keyset pagination theo id)
+
+        Mỗi trang là một lời gọi trên thread pool, dùng với `async for`. Lấy trang
+        qua iter_search_read của client sync nên lỗi RPC cũng được raise.
+        """
+        records = self.client.iter_search_read(model, domain, fields, batch_size=batch_size)
+        while True:
+            page = await self.run_sync(lambda: list(itertools.islice(records, batch_size)))
+            for record in page:
+                yield record
+            if len(page) < batch_size:
+                return
+
+    async def read(self, *args, **kwargs):
+        """Đọc records theo IDs"""
+        return await self._run_read('read', *args, **kwargs)
+
+    async def search(self, *args, **kwargs):
+        """Tìm kiếm records và trả về list IDs"""
+        return await self._run_read('search', *args, **kwargs)
+
+    async def search_count(self, *args, **kwargs):
+        """Đếm số lượng records"""
+        return await self._run_read('search_count', *args, **kwargs)
+
+    async def read_group(self, *args, **kwargs):
+        """Gom nhóm và tổng hợp records phía server"""
+        return await self._run_read('read_group', *args, **kwargs)
+
+    async def group_count(self, *args, **kwargs):
+        """Đếm records theo từng giá trị của field groupby"""
+        return await self._run_read('group_count', *args, **kwargs)
+
+    async def create(self, *args, **kwargs):
+        """Tạo record mới"""
+        return await self.run_sync(self.client.create, *args, **kwargs)
+
+    async def write(self, *args, **kwargs):
+        """Cập nhật record(s)"""
+        return await self.run_sync(self.client.write, *args, **kwargs)
+
+    async def unlink(self, *args, **kwargs):
+        """Xóa record(s)"""
+        return await self.run_sync(self.client.unlink, *args, **kwargs)
+
+    async def fields_get(self, *args, **kwargs):
+        """Lấy thông tin fields của model"""
+        return await self._run_read('get_fields', *args, **kwargs)
+
+    # Giữ tên cũ để code đang gọi get_fields() chuyển sang dễ dàng
+    get_fields = fields_get
+
+    async def version(self):
+        """Lấy thông tin version của Odoo"""
+        return await self.run_sync(self.client.version)
+
+    async def check_access_rights(self, *args, **kwargs):
+        """Kiểm tra quyền truy cập model"""
+        return await self.run_sync(self.client.check_access_rights, *args, **kwargs)
+
+    def get_pool_stats(self):
+        """Thống kê connection pool của client bên dưới"""
+        stats = self.client.get_pool_stats()
+        if 'single_flight' in stats:
+            stats['async_single_flight'] = self._single_flight.get_stats()
+        return stats
+
+    def shutdown(self):
+        """Dừng thread pool (gọi khi tắt ứng dụng)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
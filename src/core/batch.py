@@ -0,0 +1,93 @@
+"""
+Odoo batch - Gom các lời gọi độc lập và chạy song song trên connection pool
+Latency của endpoint là max() thay vì sum() của các RPC.
+
+    with odoo_client.batch() as batch:
+        template = batch.read('product.template', [product_id], fields)
+        variant_count = batch.search_count('product.product', domain)
+    template.result(), variant_count.result()
+"""
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, List
+
+
+class OdooBatch:
+    """Batch cho OdooClient (sync): mỗi lời gọi trả về concurrent.futures.Future
+
+    Lời gọi được gửi ngay khi thêm vào batch, thoát khỏi `with` sẽ chờ tất cả xong.
+    Lỗi của từng lời gọi nằm trong Future tương ứng (future.result() sẽ raise).
+    """
+
+    def __init__(self, client, executor: ThreadPoolExecutor):
+        self.client = client
+        self.executor = executor
+        self.futures: List[Future] = []
+
+    def call(self, func: Callable, *args, **kwargs) -> Future:
+        """Thêm một hàm bất kỳ (vd: method của service) vào batch"""
+        future = self.executor.submit(func, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def __getattr__(self, name: str) -> Callable[..., Future]:
+        # batch.search_read(...), batch.read(...)... như trên client
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = getattr(self.client, name)
+        return lambda *args, **kwargs: self.call(method, *args, **kwargs)
+
+    def wait(self):
+        """Chờ tất cả lời gọi trong batch hoàn thành"""
+        wait(self.futures)
+
+    def __enter__(self) -> 'OdooBatch':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # Khối with lỗi: hủy các lời gọi chưa chạy
+            for future in self.futures:
+                future.cancel()
+        self.wait()
+        return False
+
+
+class AsyncOdooBatch:
+    """Batch cho AsyncOdooClient: mỗi lời gọi trả về asyncio.Task
+
+    `async with` chờ tất cả task xong, lỗi của từng lời gọi nằm trong task tương ứng.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.tasks: List[asyncio.Task] = []
+
+    def _add(self, awaitable) -> asyncio.Task:
+        task = asyncio.ensure_future(awaitable)
+        self.tasks.append(task)
+        return task
+
+    def call(self, func: Callable, *args, **kwargs) -> asyncio.Task:
+        """Thêm một hàm sync bất kỳ (chạy trên thread pool của client) vào batch"""
+        return self._add(self.client.run_sync(func, *args, **kwargs))
+
+    def __getattr__(self, name: str) -> Callable[..., asyncio.Task]:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = getattr(self.client, name)
+        return lambda *args, **kwargs: self._add(method(*args, **kwargs))
+
+    async def wait(self) -> List[Any]:
+        """Chờ tất cả lời gọi, trả về kết quả (hoặc exception) theo thứ tự thêm vào"""
+        return await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> 'AsyncOdooBatch':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for task in self.tasks:
+                task.cancel()
+        await self.wait()
+        return False
@@ -1,5 +1,30 @@
+import http.client
+import threading
 import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from .batch import OdooBatch
 from .config import ODOO_CONFIG
+from .transport import JsonRpcProxy, JsonRpcProxyPool, JsonRpcTransport, ServerProxyPool
+from .async_odoo_client import AsyncOdooClient
+from .single_flight import READ_METHODS, SingleFlight, make_key
+
+def _group_key(value):
+    """Chuẩn hóa key của group read_group: many2one [id, name] -> id"""
+    if isinstance(value, (list, tuple)) and value:
+        return value[0]
+    return value
+
+def _group_count(group, groupby):
+    """Số records trong group (Odoo <= 16 dùng '<field>_count', Odoo 17+ dùng '__count')"""
+    if '__count' in group:
+        return group['__count']
+    return group.get(f'{groupby}_count', 0)
+
+def _is_transport_error(error):
+    """Lỗi kết nối/HTTP (nên kết nối lại), khác với Fault do Odoo trả về"""
+    if isinstance(error, xmlrpc.client.Fault):
+        return False
+    return isinstance(error, (OSError, http.client.HTTPException, xmlrpc.client.ProtocolError))
 
 class OdooClient:
     def __init__(self):
@@ -7,16 +32,63 @@ class OdooClient:
         self.db = ODOO_CONFIG['db']
         self.username = ODOO_CONFIG['username']
         self.password = ODOO_CONFIG['password']
+        self.pool_size = ODOO_CONFIG.get('pool_size', 8)
+        self.pool_timeout = ODOO_CONFIG.get('pool_timeout', 30)
+        # 'xmlrpc' (/xmlrpc/2/*) hoặc 'jsonrpc' (/jsonrpc, parse nhanh hơn với kết quả lớn)
+        self.protocol = ODOO_CONFIG.get('protocol', 'xmlrpc')
         self.uid = None
         self.models = None
+        # Gộp các lời gọi đọc giống hệt nhau đang chạy đồng thời thành một RPC
+        self.single_flight = SingleFlight() if ODOO_CONFIG.get('single_flight', True) else None
+        self._batch_executor = None
+        # connect() chạy tuần tự, tránh nhiều thread cùng tạo pool mới
+        self._connect_lock = threading.RLock()
         
+    def _create_common_proxy(self):
+        """Proxy tới service 'common' (version, authenticate) theo protocol cấu hình"""
+        if self.protocol == 'jsonrpc':
+            return JsonRpcProxy(JsonRpcTransport(f'{self.url}/jsonrpc'), 'common')
+        return xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
+    
+    def _create_models_pool(self):
+        """Pool keep-alive (thread-safe) tới service 'object' theo protocol cấu hình"""
+        if self.protocol == 'jsonrpc':
+            return JsonRpcProxyPool(f'{self.url}/jsonrpc', size=self.pool_size, timeout=self.pool_timeout)
+        return ServerProxyPool(f'{self.url}/xmlrpc/2/object', size=self.pool_size, timeout=self.pool_timeout)
+        
+    def _ensure_connected(self):
+        """Kết nối nếu chưa có (chỉ một thread thực hiện)"""
+        if self.models and self.uid:
+            return True
+        with self._connect_lock:
+            if self.models and self.uid:
+                return True
+            return self.connect()
+    
+    def _recover(self, error, models):
+        """Sau một RPC lỗi: chỉ kết nối lại khi là lỗi transport, True nếu nên gọi lại
+
+        `models` là pool dùng cho lời gọi lỗi; nếu thread khác đã thay pool thì
+        không kết nối lại nữa.
+        """
+        if not _is_transport_error(error):
+            return False
+        with self._connect_lock:
+            if self.models is not None and self.models is not models:
+                return True
+            return self.connect()
+    
     def connect(self):
         """Kết nối và xác thực với Odoo server"""
+        with self._connect_lock:
+            return self._connect()
+    
+    def _connect(self):
         try:
             print(f"Đang kết nối tới {self.url}...")
             
             # Kết nối đến common endpoint
-            common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
+            common = self._create_common_proxy()
             
             # Test kết nối trước
             version = common.version()
@@ -26,8 +98,12 @@ class OdooClient:
             self.uid = common.authenticate(self.db, self.username, self.password, {})
             
             if self.uid:
-                # Kết nối đến object endpoint
-                self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
+                # Kết nối đến object endpoint qua pool keep-alive (thread-safe).
+                # Thay pool trước rồi mới đóng pool cũ: kết nối đang được thread khác
+                # mượn chỉ bị đóng khi được trả về
+                old_models, self.models = self.models, self._create_models_pool()
+                if old_models:
+                    old_models.close()
                 print(f"Xác thực thành công! User ID: {self.uid}")
                 return True
             else:
@@ -46,13 +122,30 @@ class OdooClient:
             print("4. Kiểm tra kết nối internet")
             return False
     
+    def _execute_kw(self, model, method, args, kwargs=None):
+        """Gọi execute_kw qua pool, lời gọi đọc trùng nhau đang chạy chỉ gửi một RPC"""
+        def call():
+            if kwargs is None:
+                return self.models.execute_kw(self.db, self.uid, self.password, model, method, args)
+            return self.models.execute_kw(self.db, self.uid, self.password, model, method, args, kwargs)
+        
+        if self.single_flight is None or method not in READ_METHODS:
+            return call()
+        return self.single_flight.do(make_key(model, method, args, kwargs), call)
+    
+    def batch(self) -> OdooBatch:
+        """Gom các lời gọi độc lập và chạy song song trên connection pool (xem OdooBatch)"""
+        if self._batch_executor is None:
+            self._batch_executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='odoo-batch')
+        return OdooBatch(self, self._batch_executor)
+    
     def search_read(self, model, domain=[], fields=[], limit=None, offset=0, order=None):
         """Tìm kiếm và đọc records"""
+        models = self.models
         try:
-            if not self.models or not self.uid:
-                if not self.connect():
-                    return []
-                
+            if not self._ensure_connected():
+                return []
+            
             kwargs = {
                 'fields': fields if fields else []
             }
@@ -69,64 +162,119 @@ class OdooClient:
             if order:
                 kwargs['order'] = order
             
-            records = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                model, 'search_read',
-                [domain], kwargs
-            )
+            records = self._execute_kw(model, 'search_read', [domain], kwargs)
             return records
             
         except Exception as e:
             print(f"Lỗi search_read: {e}")
-            # Thử kết nối lại
-            if self.connect():
+            # Chỉ kết nối lại khi lỗi transport (Fault của Odoo thì không)
+            if self._recover(e, models):
                 try:
-                    records = self.models.execute_kw(
-                        self.db, self.uid, self.password,
-                        model, 'search_read',
-                        [domain], kwargs
-                    )
+                    records = self._execute_kw(model, 'search_read', [domain], kwargs)
                     return records
                 except Exception as e2:
                     print(f"Lỗi search_read sau khi kết nối lại: {e2}")
             return []
     
+    def iter_search_read(self, model, domain=None, fields=None, batch_size=500):
+        """Duyệt toàn bộ kết quả search_read theo từng trang batch_size records
+
+        Phân trang theo id (keyset): mỗi trang thêm điều kiện id > id cuối của trang
+        trước và sắp xếp theo id, nên bộ nhớ chỉ giữ một trang và trang sâu không
+        chậm dần như khi dùng offset lớn.
+        Khác search_read, lỗi RPC được raise thay vì dừng giữa chừng như đã hết dữ liệu.
+        """
+        last_id = 0
+        while True:
+            page = self._search_read_page(model, list(domain or []) + [['id', '>', last_id]], fields or [],
+                                          batch_size)
+            yield from page
+            if len(page) < batch_size:
+                return
+            last_id = page[-1]['id']
+    
+    def _search_read_page(self, model, domain, fields, limit):
+        """Một trang của iter_search_read, raise khi lỗi (search_read trả về [])"""
+        if not self._ensure_connected():
+            raise ConnectionError(f"Không kết nối được tới Odoo {self.url}")
+        kwargs = {'fields': fields, 'limit': limit, 'order': 'id asc'}
+        models = self.models
+        try:
+            return self._execute_kw(model, 'search_read', [domain], kwargs)
+        except Exception as e:
+            # Chỉ thử lại một lần sau khi kết nối lại do lỗi transport
+            if not self._recover(e, models):
+                raise
+            return self._execute_kw(model, 'search_read', [domain], kwargs)
+    
     def search_count(self, model, domain):
         """Đếm số lượng records"""
+        models = self.models
         try:
-            if not self.models or not self.uid:
-                if not self.connect():
-                    return 0
-                
-            count = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                model, 'search_count',
-                [domain]
-            )
+            if not self._ensure_connected():
+                return 0
+            
+            count = self._execute_kw(model, 'search_count', [domain])
             return count
             
         except Exception as e:
             print(f"Lỗi search_count: {e}")
-            # Thử kết nối lại
-            if self.connect():
+            # Chỉ kết nối lại khi lỗi transport (Fault của Odoo thì không)
+            if self._recover(e, models):
                 try:
-                    count = self.models.execute_kw(
-                        self.db, self.uid, self.password,
-                        model, 'search_count',
-                        [domain]
-                    )
+                    count = self._execute_kw(model, 'search_count', [domain])
                     return count
                 except Exception as e2:
                     print(f"Lỗi search_count sau khi kết nối lại: {e2}")
             return 0
     
+    def read_group(self, model, domain, fields, groupby, offset=0, limit=None, orderby=None, lazy=True):
+        """Gom nhóm và tổng hợp records phía server (count, sum, avg...)"""
+        models = self.models
+        try:
+            if not self._ensure_connected():
+                return []
+            
+            kwargs = {'lazy': lazy}
+            if offset and offset > 0:
+                kwargs['offset'] = offset
+            if limit is not None:
+                kwargs['limit'] = limit
+            if orderby:
+                kwargs['orderby'] = orderby
+            
+            groups = self._execute_kw(model, 'read_group', [domain, fields, groupby], kwargs)
+            return groups
+            
+        except Exception as e:
+            print(f"Lỗi read_group: {e}")
+            # Chỉ kết nối lại khi lỗi transport (Fault của Odoo thì không)
+            if self._recover(e, models):
+                try:
+                    groups = self._execute_kw(model, 'read_group', [domain, fields, groupby], kwargs)
+                    return groups
+                except Exception as e2:
+                    print(f"Lỗi read_group sau khi kết nối lại: {e2}")
+            return []
+    
+    def group_count(self, model, groupby, domain=[]):
+        """Đếm records theo từng giá trị của field groupby trong một lần gọi
+        Returns:
+            {giá trị: số lượng}, với many2one thì key là ID
+        """
+        groups = self.read_group(model, domain, [groupby], [groupby])
+        return {
+            _group_key(group.get(groupby)): _group_count(group, groupby)
+            for group in groups
+        }
+    
     def search(self, model, domain, offset=0, limit=None, order=None):
         """Tìm kiếm records và trả về list IDs"""
+        models = self.models
         try:
-            if not self.models or not self.uid:
-                if not self.connect():
-                    return []
-                
+            if not self._ensure_connected():
+                return []
+            
             kwargs = {}
             
             # Thêm offset nếu được chỉ định
@@ -141,23 +289,15 @@ class OdooClient:
             if order:
                 kwargs['order'] = order
             
-            ids = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                model, 'search',
-                [domain], kwargs
-            )
+            ids = self._execute_kw(model, 'search', [domain], kwargs)
             return ids
             
         except Exception as e:
             print(f"Lỗi search: {e}")
-            # Thử kết nối lại
-            if self.connect():
+            # Chỉ kết nối lại khi lỗi transport (Fault của Odoo thì không)
+            if self._recover(e, models):
                 try:
-                    ids = self.models.execute_kw(
-                        self.db, self.uid, self.password,
-                        model, 'search',
-                        [domain], kwargs
-                    )
+                    ids = self._execute_kw(model, 'search', [domain], kwargs)
                     return ids
                 except Exception as e2:
                     print(f"Lỗi search sau khi kết nối lại: {e2}")
@@ -165,28 +305,20 @@ class OdooClient:
     
     def read(self, model, record_ids, fields=None):
         """Đọc records theo IDs"""
+        models = self.models
         try:
-            if not self.models or not self.uid:
-                if not self.connect():
-                    return []
-                
-            records = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                model, 'read',
-                [record_ids], {'fields': fields if fields else []}
-            )
+            if not self._ensure_connected():
+                return []
+            
+            records = self._execute_kw(model, 'read', [record_ids], {'fields': fields if fields else []})
             return records
             
         except Exception as e:
             print(f"Lỗi read: {e}")
-            # Thử kết nối lại
-            if self.connect():
+            # Chỉ kết nối lại khi lỗi transport (Fault của Odoo thì không)
+            if self._recover(e, models):
                 try:
-                    records = self.models.execute_kw(
-                        self.db, self.uid, self.password,
-                        model, 'read',
-                        [record_ids], {'fields': fields if fields else []}
-                    )
+                    records = self._execute_kw(model, 'read', [record_ids], {'fields': fields if fields else []})
                     return records
                 except Exception as e2:
                     print(f"Lỗi read sau khi kết nối lại: {e2}")
@@ -195,8 +327,7 @@ class OdooClient:
     def create(self, model, values):
         """Tạo record mới"""
         try:
-            if not self.models:
-                self.connect()
+            self._ensure_connected()
                 
             record_id = self.models.execute_kw(
                 self.db, self.uid, self.password,
@@ -212,8 +343,7 @@ class OdooClient:
     def write(self, model, record_ids, values):
         """Cập nhật record(s)"""
         try:
-            if not self.models:
-                self.connect()
+            self._ensure_connected()
             
             # Đảm bảo record_ids là list
             if not isinstance(record_ids, list):
@@ -233,8 +363,7 @@ class OdooClient:
     def unlink(self, model, record_ids):
         """Xóa record(s)"""
         try:
-            if not self.models:
-                self.connect()
+            self._ensure_connected()
             
             # Đảm bảo record_ids là list
             if not isinstance(record_ids, list):
@@ -254,19 +383,22 @@ class OdooClient:
     def get_fields(self, model):
         """Lấy thông tin fields của model"""
         try:
-            if not self.models:
-                self.connect()
+            self._ensure_connected()
                 
-            fields = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                model, 'fields_get',
-                [], {'attributes': ['string', 'help', 'type', 'required']}
-            )
+            fields = self._execute_kw(model, 'fields_get', [], {'attributes': ['string', 'help', 'type', 'required']})
             return fields
             
         except Exception as e:
             print(f"Lỗi get_fields: {e}")
             return {}
+    
+    def get_pool_stats(self):
+        """Thống kê connection pool (occupancy, wait time, reuse ratio)"""
+        stats = self.models.get_stats() if self.models else {'size': self.pool_size, 'created': 0, 'in_use': 0}
+        if self.single_flight is not None:
+            stats['single_flight'] = self.single_flight.get_stats()
+        return stats
 
 # Instance toàn cục
 odoo_client = OdooClient()
+async_odoo_client = AsyncOdooClient(odoo_client)
@@ -0,0 +1,143 @@
+"""
+Single-flight cho các lời gọi đọc Odoo
+Các lời gọi giống hệt nhau (model, method, args, kwargs) đang chạy đồng thời chỉ
+gửi một RPC, các caller còn lại chờ và nhận bản sao riêng của cùng kết quả.
+"""
+import asyncio
+import copy
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Các method chỉ đọc, an toàn để gộp
+READ_METHODS = frozenset({
+    'search', 'search_read', 'search_count', 'read', 'read_group', 'fields_get', 'name_get',
+})
+
+
+def make_key(model: str, method: str, args=None, kwargs=None) -> str:
+    """Key ổn định cho một lời gọi (domain/fields là list nên không hash trực tiếp được)"""
+    return json.dumps([model, method, args or [], kwargs or {}], sort_keys=True, default=str)
+
+
+class _Call:
+    __slots__ = ('event', 'copies', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.copies = []
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Gộp các lời gọi trùng key giữa nhiều thread"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Chạy func nếu chưa có lời gọi cùng key, ngược lại chờ kết quả của lời gọi đó
+
+        Mỗi caller chờ nhận một bản deepcopy riêng, tạo sẵn trước khi leader trả kết
+        quả gốc về, nên việc sửa kết quả không ảnh hưởng lẫn nhau.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.copies.pop()
+
+        try:
+            result = func()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+            raise
+        # Gỡ key trước để số caller chờ không đổi nữa, rồi copy cho từng caller
+        with self._lock:
+            self._calls.pop(key, None)
+        try:
+            call.copies = [copy.deepcopy(result) for _ in range(call.waiters)]
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.event.set()
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': in_flight}
+
+
+class _AsyncCall:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self):
+        self.task = None
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Gộp các coroutine trùng key trên cùng event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _AsyncCall] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func() nếu chưa có lời gọi cùng key, ngược lại await lời gọi đang chạy
+
+        Lời gọi dùng chung chạy trong task riêng nên caller bị hủy không hủy nó.
+        Bản copy cho các caller chờ được tạo ngay khi có kết quả, trước khi leader
+        nhận kết quả gốc.
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self.shared += 1
+            call.waiters += 1
+            _, copies = await asyncio.shield(call.task)
+            return copies.pop()
+
+        self.calls += 1
+        call = self._calls[key] = _AsyncCall()
+
+        async def _run():
+            try:
+                result = await func()
+            finally:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            return result, [copy.deepcopy(result) for _ in range(call.waiters)]
+
+        def _done(finished: asyncio.Future):
+            if not finished.cancelled():
+                # Đánh dấu exception đã được xử lý nếu không còn ai chờ
+                finished.exception()
+
+        call.task = asyncio.ensure_future(_run())
+        call.task.add_done_callback(_done)
+        result, _ = await asyncio.shield(call.task)
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._calls)}
@@ -0,0 +1,319 @@
+"""
+XML-RPC / JSON-RPC transport có connection pool và keep-alive
+Mỗi ServerProxy giữ một kết nối HTTP/1.1 riêng, pool cho phép nhiều request handler
+dùng song song mà không chia sẻ một proxy (xmlrpc.client không thread-safe)
+"""
+import http.client
+import itertools
+import json
+import queue
+import threading
+import time
+import urllib.parse
+import xmlrpc.client
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson là optional
+    orjson = None
+
+
+class PoolTimeoutError(Exception):
+    """Hết thời gian chờ lấy connection từ pool"""
+
+
+class _ConnectionStatsMixin:
+    """Đếm số lần mở socket mới và số lần request đi trên socket keep-alive còn mở"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections_opened = 0
+        self.connections_reused = 0
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        # Transport giữ lại HTTPConnection nhưng http.client tự mở socket mới nếu socket
+        # cũ đã đóng (server đóng keep-alive, lỗi, Connection: close), nên đếm theo socket
+        if connection.sock is None:
+            self.connections_opened += 1
+        else:
+            self.connections_reused += 1
+        return connection
+
+
+class KeepAliveTransport(_ConnectionStatsMixin, xmlrpc.client.Transport):
+    """HTTP transport giữ kết nối giữa các lần gọi execute_kw"""
+
+
+class KeepAliveSafeTransport(_ConnectionStatsMixin, xmlrpc.client.SafeTransport):
+    """HTTPS transport giữ kết nối (tránh handshake TLS cho mỗi lần gọi)"""
+
+
+class ServerProxyPool:
+    """Pool các ServerProxy tới cùng một endpoint
+
+    Proxy được tạo lazy tới tối đa `size`, mỗi thread mượn một proxy trong lúc gọi
+    và trả lại ngay sau đó. Có thể dùng như một ServerProxy thông thường cho
+    `execute_kw(...)`.
+    """
+
+    def __init__(self, url: str, size: int = 4, timeout: float = 30.0, ssl_context=None):
+        self.url = url
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+
+        self._idle: "queue.LifoQueue[xmlrpc.client.ServerProxy]" = queue.LifoQueue()
+        self._transports = []
+        self._proxy_transports: Dict[int, Any] = {}  # id(proxy) -> transport của proxy
+        self._lock = threading.Lock()
+        self._closed = False
+        self._created = 0
+        self._in_use = 0
+
+        # Thống kê phục vụ việc sizing pool
+        self._acquire_count = 0
+        self._wait_count = 0
+        self._total_wait_sec = 0.0
+        self._max_wait_sec = 0.0
+
+    def _create_proxy(self) -> xmlrpc.client.ServerProxy:
+        """Tạo ServerProxy mới với transport keep-alive"""
+        if self.url.startswith('https://'):
+            transport = KeepAliveSafeTransport(context=self.ssl_context)
+        else:
+            transport = KeepAliveTransport()
+        return self._register(xmlrpc.client.ServerProxy(self.url, transport=transport), transport)
+
+    def _register(self, proxy, transport):
+        """Ghi nhận transport của proxy (để thống kê và đóng kết nối)"""
+        self._transports.append(transport)
+        self._proxy_transports[id(proxy)] = transport
+        return proxy
+
+    @contextmanager
+    def acquire(self):
+        """Mượn một proxy từ pool, chờ nếu tất cả đang bận"""
+        proxy = None
+        with self._lock:
+            self._acquire_count += 1
+            try:
+                proxy = self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.size:
+                    self._created += 1
+                    proxy = self._create_proxy()
+
+        if proxy is None:
+            started = time.perf_counter()
+            try:
+                proxy = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolTimeoutError(
+                    f"Không lấy được kết nối Odoo sau {self.timeout}s (pool size={self.size})"
+                )
+            waited = time.perf_counter() - started
+            with self._lock:
+                self._wait_count += 1
+                self._total_wait_sec += waited
+                self._max_wait_sec = max(self._max_wait_sec, waited)
+
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield proxy
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                if self._closed:
+                    # Pool đã bị thay thế trong lúc proxy đang được dùng
+                    self._proxy_transports[id(proxy)].close()
+                else:
+                    self._idle.put(proxy)
+
+    def execute_kw(self, *args):
+        """Gọi execute_kw trên một proxy mượn từ pool"""
+        with self.acquire() as proxy:
+            return proxy.execute_kw(*args)
+
+    def __getattr__(self, name):
+        # Cho phép gọi các method khác (vd: common.version()) như ServerProxy
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def _call(*args):
+            with self.acquire() as proxy:
+                return getattr(proxy, name)(*args)
+        return _call
+
+    def close(self):
+        """Đóng pool: kết nối rảnh đóng ngay, kết nối đang được mượn đóng khi trả về
+
+        Không đóng transport đang có request dở của thread khác.
+        """
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    proxy = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._proxy_transports[id(proxy)].close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Thống kê pool: occupancy, thời gian chờ, tỷ lệ tái sử dụng kết nối"""
+        with self._lock:
+            opened = sum(t.connections_opened for t in self._transports)
+            reused = sum(t.connections_reused for t in self._transports)
+            requests = opened + reused
+            return {
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'acquire_count': self._acquire_count,
+                'wait_count': self._wait_count,
+                'avg_wait_ms': (self._total_wait_sec / self._wait_count * 1000) if self._wait_count else 0.0,
+                'max_wait_ms': self._max_wait_sec * 1000,
+                'connections_opened': opened,
+                'connections_reused': reused,
+                'reuse_ratio': (reused / requests) if requests else 0.0,
+            }
+
+
+# ================================
+# JSON-RPC (/jsonrpc)
+# ================================
+
+def _json_dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JsonRpcFault(xmlrpc.client.Fault):
+    """Lỗi Odoo trả về qua JSON-RPC
+
+    Kế thừa xmlrpc.client.Fault để code đang bắt Fault xử lý như với XML-RPC.
+    """
+
+    def __init__(self, error: Dict[str, Any]):
+        data = error.get('data') or {}
+        message = data.get('message') or error.get('message') or 'Odoo JSON-RPC error'
+        super().__init__(error.get('code', 0), message)
+        self.error = error
+        self.exception_name = data.get('name')
+        self.debug = data.get('debug')
+
+
+class JsonRpcTransport:
+    """Một kết nối HTTP/1.1 keep-alive gửi request JSON-RPC tới endpoint /jsonrpc"""
+
+    # Lỗi có thể do server đã đóng kết nối keep-alive: thử lại một lần như xmlrpc.client
+    _RETRY_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                     ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+    def __init__(self, url: str, ssl_context=None):
+        parts = urllib.parse.urlsplit(url)
+        self.url = url
+        self.host = parts.netloc
+        self.path = parts.path or '/jsonrpc'
+        self.https = parts.scheme == 'https'
+        self.ssl_context = ssl_context
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self._ids = itertools.count(1)
+        self.connections_opened = 0
+        self.connections_reused = 0
+
+    def _get_connection(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            if self.https:
+                self._connection = http.client.HTTPSConnection(self.host, context=self.ssl_context)
+            else:
+                self._connection = http.client.HTTPConnection(self.host)
+        # http.client tự mở lại socket đã đóng, chỉ tính là tái sử dụng khi socket còn mở
+        if self._connection.sock is None:
+            self.connections_opened += 1
+        else:
+            self.connections_reused += 1
+        return self._connection
+
+    def _post(self, body: bytes) -> bytes:
+        for attempt in (0, 1):
+            # Chỉ thử lại khi lỗi xảy ra trên socket keep-alive cũ (server có thể đã đóng nó)
+            reused = self._connection is not None and self._connection.sock is not None
+            connection = self._get_connection()
+            try:
+                connection.request('POST', self.path, body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                data = response.read()
+            except self._RETRY_ERRORS:
+                self.close()
+                if attempt or not reused:
+                    raise
+                continue
+            except Exception:
+                self.close()
+                raise
+            if response.status != 200:
+                self.close()
+                raise xmlrpc.client.ProtocolError(self.url, response.status, response.reason,
+                                                  dict(response.getheaders()))
+            if response.getheader('Connection', '').lower() == 'close':
+                self.close()
+            return data
+
+    def call(self, service: str, method: str, args: List[Any]) -> Any:
+        """Gọi <service>.<method>(*args), trả về result hoặc raise JsonRpcFault"""
+        body = _json_dumps({
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': {'service': service, 'method': method, 'args': args},
+            'id': next(self._ids),
+        })
+        payload = _json_loads(self._post(body))
+        if payload.get('error'):
+            raise JsonRpcFault(payload['error'])
+        return payload.get('result')
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class JsonRpcProxy:
+    """Proxy JSON-RPC có cùng cách gọi với xmlrpc.client.ServerProxy (vd: execute_kw(...))"""
+
+    def __init__(self, transport: JsonRpcTransport, service: str = 'object'):
+        self._transport = transport
+        self._service = service
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def _call(*args):
+            return self._transport.call(self._service, name, list(args))
+        return _call
+
+
+class JsonRpcProxyPool(ServerProxyPool):
+    """Pool các JsonRpcProxy tới /jsonrpc, cùng interface và thống kê với ServerProxyPool"""
+
+    def __init__(self, url: str, size: int = 4, timeout: float = 30.0, ssl_context=None,
+                 service: str = 'object'):
+        super().__init__(url, size=size, timeout=timeout, ssl_context=ssl_context)
+        self.service = service
+
+    def _create_proxy(self) -> JsonRpcProxy:
+        transport = JsonRpcTransport(self.url, ssl_context=self.ssl_context)
+        return self._register(JsonRpcProxy(transport, self.service), transport)
@@ -2,10 +2,13 @@
 Data models cho real-time pricing system
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from datetime import datetime
+from typing import Optional, Dict, Any, NamedTuple, Union
+from datetime import datetime, timezone
 from enum import Enum
 
+# Công thức tính giá cơ bản mặc định (xem services/pricing_formula.py)
+DEFAULT_PRICING_FORMULA = "rate * weight_gram + labor_cost"
+
 class MaterialType(str, Enum):
     GOLD = "gold"
     SILVER = "silver"
@@ -36,9 +39,9 @@ class ProductWeights(BaseModel):
     stone_weight: Optional[float] = Field(0, description="Trọng lượng đá (gram)")
     labor_cost: float = Field(0, description="Chi phí gia công (VND)")
     markup_percent: float = Field(0, description="Lãi suất (%)")
-    formula: str = Field("rate * weight_gram + labor_cost", description="Công thức tính giá")
+    formula: str = Field(DEFAULT_PRICING_FORMULA, description="Công thức tính giá")
     weights_version: int = Field(..., description="Version để handle out-of-order")
-    timestamp: datetime
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
     
     class Config:
         json_encoders = {
@@ -93,16 +96,6 @@ class RateUpdate(BaseModel):
     rate_version: int
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
-class ProductWeights(BaseModel):
-    """Trọng số sản phẩm"""
-    sku: str
-    material: MaterialType
-    weight_gram: float
-    stone_weight: float = Field(default=0, description="Trọng lượng đá (gram)")
-    labor_cost: float = Field(default=0, description="Chi phí gia công (VND)")
-    markup_percent: float = Field(default=0, description="% đánh giá thêm")
-    weights_version: int = Field(..., description="Version để handle out-of-order")
-    
 class WeightsUpdate(BaseModel):
     """Update trọng số từ Kafka"""
     sku: str
@@ -111,25 +104,85 @@ class WeightsUpdate(BaseModel):
     stone_weight: Optional[float] = 0
     labor_cost: float = 0
     markup_percent: float = 0
+    formula: str = DEFAULT_PRICING_FORMULA
     weights_version: int
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
-class PricingSnapshot(BaseModel):
-    """Snapshot giá sản phẩm tại thời điểm cụ thể"""
+# ================================
+# INGEST RECORDS (không qua Pydantic)
+# ================================
+# Dùng trên đường consume Kafka, cùng tên field với Rate / ProductWeights nên
+# PricingCalculator dùng được cả hai. Pydantic chỉ dùng ở API boundary.
+
+_MATERIAL_BY_VALUE = {m.value: m for m in MaterialType}
+
+def material_type(value: str) -> MaterialType:
+    """MaterialType từ giá trị chuỗi (tra dict, nhanh hơn gọi MaterialType(value))"""
+    try:
+        return _MATERIAL_BY_VALUE[value]
+    except (KeyError, TypeError):
+        raise ValueError(f"{value!r} is not a valid MaterialType")
+
+def parse_timestamp(value: Union[str, int, float, datetime, None]) -> datetime:
+    """Parse timestamp ISO 8601 (có thể kết thúc bằng Z) hoặc epoch seconds"""
+    if value is None:
+        return datetime.utcnow()
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc)
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def formula_text(value: Any) -> str:
+    """Công thức tính giá từ payload (mặc định nếu không có), raise nếu không phải chuỗi"""
+    if not value:
+        return DEFAULT_PRICING_FORMULA
+    if not isinstance(value, str):
+        raise ValueError(f"formula phải là chuỗi, nhận {type(value).__name__}")
+    return value
+
+class RateRecord(NamedTuple):
+    """Tỷ giá từ topic rates"""
+    material: MaterialType
+    rate: float
+    rate_version: int
+    timestamp: datetime
+    currency: str = "VND"
+
+    @classmethod
+    def from_message(cls, material: str, data: dict) -> 'RateRecord':
+        """Tạo record từ payload đã decode (raise nếu thiếu field hoặc sai kiểu)"""
+        return cls(
+            material_type(material),
+            float(data['rate']),
+            int(data['rate_version']),
+            parse_timestamp(data['timestamp']),
+            data.get('currency') or "VND",
+        )
+
+class WeightsRecord(NamedTuple):
+    """Trọng số sản phẩm từ topic weights"""
     sku: str
-    material_price: float
-    labor_cost: float
-    stone_cost: float = 0
-    total_cost: float
-    final_price: float
-    markup_percent: float
+    material: MaterialType
     weight_gram: float
-    stone_weight: float = 0
-    rate_version: int
     weights_version: int
-    timestamp: datetime
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat() + "Z"
-        }
+    stone_weight: float = 0.0
+    labor_cost: float = 0.0
+    markup_percent: float = 0.0
+    formula: str = DEFAULT_PRICING_FORMULA
+    timestamp: Optional[datetime] = None
+
+    @classmethod
+    def from_message(cls, sku: str, data: dict) -> 'WeightsRecord':
+        """Tạo record từ payload đã decode (raise nếu thiếu field hoặc sai kiểu)"""
+        return cls(
+            sku,
+            material_type(data['material']),
+            float(data['weight_gram']),
+            int(data['weights_version']),
+            float(data.get('stone_weight') or 0),
+            float(data.get('labor_cost') or 0),
+            float(data.get('markup_percent') or 0),
+            formula_text(data.get('formula')),
+            parse_timestamp(data.get('timestamp')),
+        )
@@ -3,55 +3,184 @@ Odoo Gold Attribute Integration Service
 Tích hợp hoàn toàn với module gold_attribute_line trên Odoo server
 Thay thế cho client-side storage
 """
+import threading
+import time
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from ..core.config import ODOO_CONFIG
 from ..core.odoo_client import odoo_client
 
+
+class GoldAttributeMetadata:
+    """Metadata đã nạp: gold attributes và product.attribute 'gold_<name>' tương ứng"""
+    
+    def __init__(self, gold_attrs: List[Dict], product_attr_ids: Dict[str, int]):
+        self.gold_attrs = gold_attrs
+        # 'gold_<name>' -> gold attribute
+        self.gold_by_attr_name = {f"gold_{attr['name']}": attr for attr in gold_attrs}
+        # 'gold_<name>' -> product.attribute id (chỉ những cái đã được tạo trên Odoo)
+        self.product_attr_ids = product_attr_ids
+        # gold.attribute.line id -> product.attribute id
+        self.product_attr_by_gold_id = {
+            attr['id']: product_attr_ids[name]
+            for name, attr in self.gold_by_attr_name.items()
+            if name in product_attr_ids
+        }
+        self.loaded_at = time.monotonic()
+
+
+class GoldAttributeMetadataCache:
+    """Cache read-through cho metadata gold.attribute.line / product.attribute
+
+    Dùng chung cho mọi instance của OdooGoldAttributeService. Hết hạn sau ttl_sec,
+    bị xóa khi service tạo/sửa/xóa gold attribute và có thể refresh thủ công.
+    Lần nạp rỗng (odoo_client nuốt lỗi RPC và trả về []) chỉ được giữ empty_ttl_sec.
+    """
+    
+    GOLD_ATTR_FIELDS = ['name', 'display_name', 'short_name', 'field_type', 'unit', 'category']
+    
+    def __init__(self, ttl_sec: float = 300, empty_ttl_sec: float = 5):
+        self.ttl_sec = ttl_sec
+        self.empty_ttl_sec = empty_ttl_sec
+        self._metadata: Optional[GoldAttributeMetadata] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+    def _ttl(self, metadata: GoldAttributeMetadata) -> float:
+        # Không phân biệt được "chưa có dữ liệu" với RPC lỗi nên không cache lâu kết quả rỗng
+        if not metadata.gold_attrs or not metadata.product_attr_ids:
+            return self.empty_ttl_sec
+        return self.ttl_sec
+        
+    def _is_fresh(self, metadata: Optional[GoldAttributeMetadata]) -> bool:
+        return metadata is not None and time.monotonic() - metadata.loaded_at < self._ttl(metadata)
+        
+    def get(self, odoo) -> GoldAttributeMetadata:
+        """Lấy metadata, nạp lại từ Odoo (2 RPC) nếu chưa có hoặc đã hết hạn"""
+        metadata = self._metadata
+        if self._is_fresh(metadata):
+            self.hits += 1
+            return metadata
+        with self._lock:
+            # Thread khác có thể vừa nạp xong trong lúc chờ lock
+            metadata = self._metadata
+            if self._is_fresh(metadata):
+                self.hits += 1
+                return metadata
+            self.misses += 1
+            metadata = self._metadata = self._load(odoo)
+            return metadata
+            
+    def _load(self, odoo) -> GoldAttributeMetadata:
+        gold_attrs = odoo.search_read('gold.attribute.line', [], self.GOLD_ATTR_FIELDS)
+        attr_names = [f"gold_{attr['name']}" for attr in gold_attrs]
+        product_attr_ids = {}
+        if attr_names:
+            product_attrs = odoo.search_read('product.attribute', [['name', 'in', attr_names]], ['name'])
+            for attr in product_attrs:
+                # Giữ bản đầu tiên như search() nếu có nhiều product.attribute trùng tên
+                product_attr_ids.setdefault(attr['name'], attr['id'])
+        return GoldAttributeMetadata(gold_attrs, product_attr_ids)
+        
+    def invalidate(self):
+        """Xóa cache, lần đọc tiếp theo sẽ nạp lại từ Odoo"""
+        self._metadata = None
+        
+    def get_stats(self) -> Dict:
+        metadata = self._metadata
+        return {
+            'ttl_sec': self._ttl(metadata) if metadata else self.ttl_sec,
+            'loaded': metadata is not None,
+            'age_sec': time.monotonic() - metadata.loaded_at if metadata else None,
+            'gold_attributes': len(metadata.gold_attrs) if metadata else 0,
+            'product_attributes': len(metadata.product_attr_ids) if metadata else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+# Cache dùng chung cho toàn process
+gold_metadata_cache = GoldAttributeMetadataCache(ODOO_CONFIG.get('metadata_cache_ttl', 300))
+
+
 class OdooGoldAttributeService:
     """Service để tương tác với gold_attribute_line module trên Odoo"""
     
     def __init__(self):
         self.odoo = odoo_client
-        # Cache để tối ưu performance
-        self._gold_attr_cache = {}
-        self._product_attr_cache = {}
+        # Cache metadata gold attributes (dùng chung giữa các instance)
+        self._gold_attr_cache = gold_metadata_cache
     
-    def _get_or_create_product_attribute(self, gold_attribute_id: int) -> Optional[int]:
-        """Lấy hoặc tạo product.attribute tương ứng với gold.attribute.line"""
-        try:
-            # Check cache first
-            if gold_attribute_id in self._product_attr_cache:
-                return self._product_attr_cache[gold_attribute_id]
-            
-            # Lấy thông tin gold attribute
+    def _get_metadata(self) -> GoldAttributeMetadata:
+        return self._gold_attr_cache.get(self.odoo)
+    
+    def invalidate_metadata_cache(self):
+        """Xóa cache metadata (gọi sau khi thay đổi gold.attribute.line ngoài service)"""
+        self._gold_attr_cache.invalidate()
+    
+    def refresh_metadata_cache(self) -> Dict:
+        """Nạp lại cache metadata ngay lập tức"""
+        self._gold_attr_cache.invalidate()
+        self._get_metadata()
+        return self._gold_attr_cache.get_stats()
+    
+    def get_metadata_cache_stats(self) -> Dict:
+        """Thống kê cache metadata"""
+        return self._gold_attr_cache.get_stats()
+    
+    def get_product_attribute_ids(self) -> Dict[int, int]:
+        """Mapping gold.attribute.line id -> product.attribute id (đọc từ cache)"""
+        return self._get_metadata().product_attr_by_gold_id
+    
+    def _find_product_attribute(self, gold_attribute_id: int) -> Tuple[Optional[Dict], Optional[int]]:
+        """Tìm gold attribute và product.attribute tương ứng: cache trước, hỏi lại Odoo nếu cache thiếu
+        
+        Cache có thể cũ (attribute vừa được tạo ở process khác) nên cache thiếu không có
+        nghĩa là không tồn tại. Trả về (gold attribute hoặc None, product.attribute id hoặc None).
+        """
+        metadata = self._get_metadata()
+        gold_attr = next((attr for attr in metadata.gold_attrs if attr['id'] == gold_attribute_id), None)
+        product_attr_id = metadata.product_attr_by_gold_id.get(gold_attribute_id)
+        if product_attr_id:
+            return gold_attr, product_attr_id
+        
+        if gold_attr is None:
             gold_attr = self.odoo.read('gold.attribute.line', [gold_attribute_id], [
                 'name', 'display_name', 'field_type'
             ])
-            
             if not gold_attr:
-                return None
-                
+                return None, None
             gold_attr = gold_attr[0]
-            attr_name = f"gold_{gold_attr['name']}"
-            
-            # Tìm product.attribute có sẵn
-            existing_attr = self.odoo.search('product.attribute', [
-                ['name', '=', attr_name]
-            ])
+        
+        existing_attr = self.odoo.search('product.attribute', [
+            ['name', '=', f"gold_{gold_attr['name']}"]
+        ])
+        if not existing_attr:
+            return gold_attr, None
+        # Cache đã cũ, nạp lại ở lần đọc sau
+        self._gold_attr_cache.invalidate()
+        return gold_attr, existing_attr[0]
+    
+    def _get_or_create_product_attribute(self, gold_attribute_id: int) -> Optional[int]:
+        """Lấy hoặc tạo product.attribute tương ứng với gold.attribute.line"""
+        try:
+            gold_attr, product_attr_id = self._find_product_attribute(gold_attribute_id)
+            if product_attr_id:
+                return product_attr_id
+            if gold_attr is None:
+                return None
             
-            if existing_attr:
-                product_attr_id = existing_attr[0]
-            else:
-                # Tạo mới nếu chưa có
-                product_attr_id = self.odoo.create('product.attribute', {
-                    'name': attr_name,
-                    'display_name': gold_attr['display_name'] or gold_attr['name'],
-                    'sequence': 10,
-                    'create_variant': 'no_variant'  # Không tạo variant cho gold attributes
-                })
+            # Tạo mới nếu chưa có
+            product_attr_id = self.odoo.create('product.attribute', {
+                'name': f"gold_{gold_attr['name']}",
+                'display_name': gold_attr['display_name'] or gold_attr['name'],
+                'sequence': 10,
+                'create_variant': 'no_variant'  # Không tạo variant cho gold attributes
+            })
             
-            # Cache result
-            self._product_attr_cache[gold_attribute_id] = product_attr_id
+            # Mapping đã thay đổi, nạp lại ở lần đọc sau
+            self._gold_attr_cache.invalidate()
             return product_attr_id
             
         except Exception as e:
@@ -61,12 +190,7 @@ class OdooGoldAttributeService:
     def _get_gold_attributes_mapping(self) -> Dict[str, int]:
         """Lấy mapping từ product.attribute name về gold.attribute.line id"""
         try:
-            gold_attrs = self.odoo.search_read('gold.attribute.line', [], ['name'])
-            mapping = {}
-            for attr in gold_attrs:
-                product_attr_name = f"gold_{attr['name']}"
-                mapping[product_attr_name] = attr['id']
-            return mapping
+            return {name: attr['id'] for name, attr in self._get_metadata().gold_by_attr_name.items()}
         except Exception as e:
             print(f"Error getting gold attributes mapping: {e}")
             return {}
@@ -200,15 +324,24 @@ class OdooGoldAttributeService:
     
     def create_gold_attribute(self, attribute_data: Dict) -> int:
         """Tạo thuộc tính vàng mới"""
-        return self.odoo.create('gold.attribute.line', attribute_data)
+        try:
+            return self.odoo.create('gold.attribute.line', attribute_data)
+        finally:
+            self._gold_attr_cache.invalidate()
     
     def update_gold_attribute(self, attribute_id: int, attribute_data: Dict) -> bool:
         """Cập nhật thuộc tính vàng"""
-        return self.odoo.write('gold.attribute.line', [attribute_id], attribute_data)
+        try:
+            return self.odoo.write('gold.attribute.line', [attribute_id], attribute_data)
+        finally:
+            self._gold_attr_cache.invalidate()
     
     def delete_gold_attribute(self, attribute_id: int) -> bool:
         """Xóa thuộc tính vàng"""
-        return self.odoo.unlink('gold.attribute.line', [attribute_id])
+        try:
+            return self.odoo.unlink('gold.attribute.line', [attribute_id])
+        finally:
+            self._gold_attr_cache.invalidate()
     
     # ================================
     # PRODUCT TEMPLATE - GOLD ATTRIBUTE VALUES 
@@ -218,98 +351,86 @@ class OdooGoldAttributeService:
         """Lấy tất cả gold attributes của một product template
         Sử dụng product.template.attribute.line và product.template.attribute.value có sẵn
         """
+        return self.get_gold_attributes_for_products([product_template_id]).get(product_template_id, [])
+    
+    def get_gold_attributes_for_products(self, product_template_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Lấy gold attributes cho nhiều product templates cùng lúc
+        Số lượng RPC cố định (tối đa 2, metadata lấy từ cache) bất kể số sản phẩm và số attributes
+        Returns:
+            {product_template_id: [gold attribute values]}, sản phẩm không có attribute trả về []
+        """
+        result = {product_id: [] for product_id in product_template_ids}
+        if not product_template_ids:
+            return result
+        
         try:
-            # Lấy mapping gold attributes
-            gold_mapping = self._get_gold_attributes_mapping()
-            if not gold_mapping:
-                return []
-            
-            # Lấy tất cả product.attribute có tên bắt đầu với "gold_"
-            gold_product_attrs = self.odoo.search('product.attribute', [
-                ['name', 'in', list(gold_mapping.keys())]
-            ])
+            # Gold attributes và product.attribute tương ứng lấy từ cache metadata
+            metadata = self._get_metadata()
+            gold_by_attr_name = metadata.gold_by_attr_name
+            if not metadata.product_attr_ids:
+                return result
+            product_attr_dict = {attr_id: name for name, attr_id in metadata.product_attr_ids.items()}
             
-            if not gold_product_attrs:
-                return []
-            
-            # Tìm các attribute lines của product này
+            # Tìm attribute lines của tất cả sản phẩm trong một lần gọi
             attr_lines = self.odoo.search_read(
                 'product.template.attribute.line',
                 [
-                    ['product_tmpl_id', '=', product_template_id],
-                    ['attribute_id', 'in', gold_product_attrs]
+                    ['product_tmpl_id', 'in', list(product_template_ids)],
+                    ['attribute_id', 'in', list(product_attr_dict.keys())]
                 ],
-                ['attribute_id', 'value_ids']
+                ['product_tmpl_id', 'attribute_id', 'value_ids']
             )
             
             if not attr_lines:
-                return []
-            
-            result = []
+                return result
             
-            # Lấy thông tin product.attribute
-            product_attrs = self.odoo.read('product.attribute', gold_product_attrs, [
-                'name', 'display_name'
-            ])
-            product_attr_dict = {attr['id']: attr for attr in product_attrs}
+            # Đọc tất cả values được chọn trong một lần gọi
+            value_ids = sorted({vid for line in attr_lines for vid in line.get('value_ids') or []})
+            value_dict = {}
+            if value_ids:
+                values = self.odoo.read('product.attribute.value', value_ids, ['name', 'html_color'])
+                value_dict = {value['id']: value for value in values}
             
+            # Gom nhóm theo product template
             for line in attr_lines:
-                attribute_id = line['attribute_id'][0]
-                product_attr = product_attr_dict.get(attribute_id)
-                
-                if not product_attr:
-                    continue
+                product_attrs_result = result.setdefault(line['product_tmpl_id'][0], [])
                 
-                # Lấy gold attribute ID từ mapping
-                gold_attr_id = gold_mapping.get(product_attr['name'])
-                if not gold_attr_id:
+                product_attr_name = product_attr_dict.get(line['attribute_id'][0])
+                if not product_attr_name:
                     continue
                 
-                # Lấy thông tin chi tiết gold attribute
-                gold_attr = self.odoo.read('gold.attribute.line', [gold_attr_id], [
-                    'name', 'display_name', 'short_name', 'field_type', 'unit', 'category'
-                ])
-                
+                gold_attr = gold_by_attr_name.get(product_attr_name)
                 if not gold_attr:
                     continue
-                    
-                gold_attr = gold_attr[0]
                 
-                # Lấy values được chọn
                 if line.get('value_ids'):
-                    values = self.odoo.read('product.attribute.value', line['value_ids'], [
-                        'name', 'html_color'
-                    ])
-                    
-                    for value in values:
-                        result.append({
-                            'attribute_id': gold_attr_id,
-                            'attribute_name': gold_attr.get('display_name') or gold_attr.get('name', ''),
-                            'attribute_short_name': gold_attr.get('short_name', ''),
-                            'field_type': gold_attr.get('field_type', 'char'),
-                            'unit': gold_attr.get('unit', ''),
-                            'category': gold_attr.get('category', ''),
-                            'value': value['name'],
-                            'display_value': f"{value['name']} {gold_attr.get('unit', '')}".strip()
-                        })
+                    for value_id in line['value_ids']:
+                        value = value_dict.get(value_id)
+                        if value:
+                            product_attrs_result.append(self._format_gold_attribute_value(gold_attr, value['name']))
                 else:
                     # Trường hợp không có value (có thể là custom value)
-                    result.append({
-                        'attribute_id': gold_attr_id,
-                        'attribute_name': gold_attr.get('display_name') or gold_attr.get('name', ''),
-                        'attribute_short_name': gold_attr.get('short_name', ''),
-                        'field_type': gold_attr.get('field_type', 'char'),
-                        'unit': gold_attr.get('unit', ''),
-                        'category': gold_attr.get('category', ''),
-                        'value': '',
-                        'display_value': ''
-                    })
+                    product_attrs_result.append(self._format_gold_attribute_value(gold_attr, ''))
             
             return result
             
         except Exception as e:
-            print(f"Error getting product gold attributes: {e}")
-            return []
+            print(f"Error getting gold attributes for products: {e}")
+            return {product_id: [] for product_id in product_template_ids}
+    
+    def _format_gold_attribute_value(self, gold_attr: Dict, value: str) -> Dict:
+        """Tạo dict kết quả cho một giá trị gold attribute của sản phẩm"""
+        unit = gold_attr.get('unit') or ''
+        return {
+            'attribute_id': gold_attr['id'],
+            'attribute_name': gold_attr.get('display_name') or gold_attr.get('name', ''),
+            'attribute_short_name': gold_attr.get('short_name', ''),
+            'field_type': gold_attr.get('field_type', 'char'),
+            'unit': gold_attr.get('unit', ''),
+            'category': gold_attr.get('category', ''),
+            'value': value,
+            'display_value': f"{value} {unit}".strip() if value else ''
+        }
     
     def set_product_gold_attribute_value(self, product_template_id: int, 
                                        gold_attribute_id: int, value: Any) -> bool:
@@ -382,22 +503,17 @@ class OdooGoldAttributeService:
                                           gold_attribute_id: int) -> bool:
         """Xóa giá trị gold attribute của product template"""
         try:
-            # Tìm gold attribute để lấy tên
-            gold_attr = self.odoo.read('gold.attribute.line', [gold_attribute_id], ['name'])
-            if not gold_attr:
+            # Tìm product.attribute tương ứng (hỏi lại Odoo nếu cache không có)
+            gold_attr, product_attr_id = self._find_product_attribute(gold_attribute_id)
+            if gold_attr is None:
                 return False
-                
-            attr_name = f"gold_{gold_attr[0]['name']}"
-            
-            # Tìm product.attribute tương ứng
-            product_attr = self.odoo.search('product.attribute', [['name', '=', attr_name]])
-            if not product_attr:
-                return True  # Already deleted
+            if not product_attr_id:
+                return True  # Chưa từng có product.attribute nên không có gì để xóa
             
             # Xóa product.template.attribute.line
             existing_lines = self.odoo.search('product.template.attribute.line', [
                 ['product_tmpl_id', '=', product_template_id],
-                ['attribute_id', '=', product_attr[0]]
+                ['attribute_id', '=', product_attr_id]
             ])
             
             if existing_lines:
@@ -412,16 +528,8 @@ class OdooGoldAttributeService:
     def clear_all_product_gold_attributes(self, product_template_id: int) -> bool:
         """Xóa tất cả gold attribute values của product template"""
         try:
-            # Lấy tất cả gold attributes
-            gold_attrs = self.odoo.search_read('gold.attribute.line', [], ['name'])
-            
-            # Tìm tất cả product.template.attribute.line có liên quan đến gold attributes
-            gold_attr_names = [f"gold_{attr['name']}" for attr in gold_attrs]
-            
-            if not gold_attr_names:
-                return True
-                
-            product_attrs = self.odoo.search('product.attribute', [['name', 'in', gold_attr_names]])
+            # Các product.attribute tương ứng với gold attributes (từ cache metadata)
+            product_attrs = list(self._get_metadata().product_attr_ids.values())
             if not product_attrs:
                 return True
                 
@@ -445,65 +553,65 @@ class OdooGoldAttributeService:
     # ================================
     
     def get_gold_attribute_statistics(self) -> Dict:
-        """Lấy thống kê về gold attributes"""
+        """Lấy thống kê về gold attributes
+        Dùng read_group phía server nên số RPC cố định bất kể số nhóm/thuộc tính/sản phẩm
+        """
         stats = {}
         
         # Thống kê nhóm thuộc tính
         total_groups = self.odoo.search_count('product.template.attribute.group', [])
         stats['total_groups'] = total_groups
         
-        # Thống kê thuộc tính
-        total_attributes = self.odoo.search_count('gold.attribute.line', [])
-        active_attributes = self.odoo.search_count('gold.attribute.line', [['active', '=', True]])
-        stats['total_attributes'] = total_attributes
-        stats['active_attributes'] = active_attributes
-        stats['inactive_attributes'] = total_attributes - active_attributes
+        # Thống kê thuộc tính: một read_group cho active, field_type, category và nhóm
+        attr_groups = self.odoo.read_group(
+            'gold.attribute.line',
+            [['active', 'in', [True, False]]],
+            ['field_type'],
+            ['active', 'field_type', 'category', 'group_id'],
+            lazy=False
+        )
         
-        # Thống kê theo field_type
-        field_types = ['char', 'float', 'integer', 'boolean', 'date', 'selection']
+        active_attributes = 0
+        inactive_attributes = 0
         by_type = {}
-        for field_type in field_types:
-            count = self.odoo.search_count('gold.attribute.line', [['field_type', '=', field_type]])
-            if count > 0:
-                by_type[field_type] = count
-        stats['by_field_type'] = by_type
-        
-        # Thống kê theo category
-        categories = ['technical', 'display', 'document']
         by_category = {}
-        for category in categories:
-            count = self.odoo.search_count('gold.attribute.line', [['category', '=', category]])
-            if count > 0:
-                by_category[category] = count
-        stats['by_category'] = by_category
-        
-        # Thống kê theo nhóm
-        groups = self.odoo.search_read('product.template.attribute.group', [], ['name'])
         by_group = {}
-        for group in groups:
-            count = self.odoo.search_count('gold.attribute.line', [['group_id', '=', group['id']]])
-            if count > 0:
-                by_group[group['name']] = count
+        for group in attr_groups:
+            count = group.get('__count', 0)
+            if not group.get('active'):
+                inactive_attributes += count
+                continue
+            
+            active_attributes += count
+            if group.get('field_type'):
+                by_type[group['field_type']] = by_type.get(group['field_type'], 0) + count
+            if group.get('category'):
+                by_category[group['category']] = by_category.get(group['category'], 0) + count
+            if group.get('group_id'):
+                group_name = group['group_id'][1]
+                by_group[group_name] = by_group.get(group_name, 0) + count
+        
+        stats['total_attributes'] = active_attributes + inactive_attributes
+        stats['active_attributes'] = active_attributes
+        stats['inactive_attributes'] = inactive_attributes
+        stats['by_field_type'] = by_type
+        stats['by_category'] = by_category
         stats['by_group'] = by_group
         
         # Thống kê sản phẩm có gold attributes
-        # Đếm số product có attribute lines liên quan đến gold attributes
-        gold_attrs = self.odoo.search_read('gold.attribute.line', [], ['name'])
-        gold_attr_names = [f"gold_{attr['name']}" for attr in gold_attrs]
+        # Gom attribute lines theo product template: số group = số sản phẩm, tổng count = số values
+        product_attrs = list(self._get_metadata().product_attr_ids.values())
         
         products_with_gold = 0
-        if gold_attr_names:
-            product_attrs = self.odoo.search('product.attribute', [['name', 'in', gold_attr_names]])
-            if product_attrs:
-                # Đếm product templates có attribute lines với gold attributes
-                product_lines = self.odoo.search_read(
-                    'product.template.attribute.line',
-                    [['attribute_id', 'in', product_attrs]],
-                    ['product_tmpl_id']
-                )
-                # Lấy unique product template IDs
-                unique_product_ids = set(line['product_tmpl_id'][0] for line in product_lines)
-                products_with_gold = len(unique_product_ids)
+        total_values = 0
+        if product_attrs:
+            line_counts = self.odoo.group_count(
+                'product.template.attribute.line',
+                'product_tmpl_id',
+                [['attribute_id', 'in', product_attrs]]
+            )
+            products_with_gold = len(line_counts)
+            total_values = sum(line_counts.values())
         
         total_products = self.odoo.search_count('product.template', [])
         stats['products_with_gold_attributes'] = products_with_gold
@@ -511,13 +619,6 @@ class OdooGoldAttributeService:
         stats['total_products'] = total_products
         
         # Thống kê tổng số gold attribute values (số attribute lines)
-        total_values = 0
-        if gold_attr_names:
-            product_attrs = self.odoo.search('product.attribute', [['name', 'in', gold_attr_names]])
-            if product_attrs:
-                total_values = self.odoo.search_count('product.template.attribute.line', [
-                    ['attribute_id', 'in', product_attrs]
-                ])
         stats['total_attribute_values'] = total_values
         
         return stats
@@ -0,0 +1,83 @@
+"""
+Kafka Codec - Giải mã payload của các topic pricing
+Decoder được chọn theo header 'content-type' của message (mặc định JSON).
+Dùng orjson / msgpack nếu đã cài, JSON chuẩn là fallback.
+"""
+import json
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson là optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack là optional
+    msgpack = None
+
+CONTENT_TYPE_HEADER = 'content-type'
+CONTENT_TYPE_JSON = 'application/json'
+CONTENT_TYPE_MSGPACK = 'application/msgpack'
+
+
+class DecodeError(ValueError):
+    """Không giải mã được payload của message"""
+
+
+def _decode_json(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _decode_msgpack(raw: bytes) -> Any:
+    if msgpack is None:
+        raise DecodeError("Message msgpack nhưng chưa cài package msgpack")
+    return msgpack.unpackb(raw, raw=False)
+
+
+# content-type -> decoder
+DECODERS: Dict[str, Callable[[bytes], Any]] = {
+    CONTENT_TYPE_JSON: _decode_json,
+    CONTENT_TYPE_MSGPACK: _decode_msgpack,
+    'application/x-msgpack': _decode_msgpack,
+}
+
+
+def register_decoder(content_type: str, decoder: Callable[[bytes], Any]):
+    """Đăng ký decoder cho một content-type"""
+    DECODERS[content_type.lower()] = decoder
+
+
+def get_content_type(headers: Optional[Iterable[Tuple[str, bytes]]]) -> str:
+    """Lấy content-type từ header của Kafka message"""
+    for key, value in headers or ():
+        if key.lower() == CONTENT_TYPE_HEADER and value:
+            return value.decode('utf-8').split(';')[0].strip().lower()
+    return CONTENT_TYPE_JSON
+
+
+def decode_value(raw: Optional[bytes], headers: Optional[Iterable[Tuple[str, bytes]]] = None) -> Any:
+    """Giải mã value của message, None với tombstone
+
+    Raises:
+        DecodeError: content-type không hỗ trợ hoặc payload lỗi
+    """
+    if raw is None:
+        return None
+    content_type = get_content_type(headers)
+    decoder = DECODERS.get(content_type)
+    if decoder is None:
+        raise DecodeError(f"Không hỗ trợ content-type '{content_type}'")
+    try:
+        return decoder(raw)
+    except DecodeError:
+        raise
+    except Exception as e:
+        raise DecodeError(f"Payload {content_type} không hợp lệ: {e}")
+
+
+def decode_message(message) -> Any:
+    """Giải mã value của một ConsumerRecord (theo header của chính message đó)"""
+    return decode_value(message.value, getattr(message, 'headers', None))
@@ -4,18 +4,72 @@ Kafka Consumer Service - Consume pricing data và update calculator
 import json
 import asyncio
 import threading
+import time
 from datetime import datetime
-from typing import Dict, Callable, Optional
-from kafka import KafkaConsumer
-from ..models.pricing import Rate, ProductWeights, PricingSnapshot, MaterialType
+from collections import deque
+from typing import Dict, Callable, List, Optional, Tuple
+from kafka import KafkaConsumer, ConsumerRebalanceListener, TopicPartition
+from kafka.structs import OffsetAndMetadata
+from ..models.pricing import PricingSnapshot, RateRecord, WeightsRecord
 from .pricing_service import PricingCalculator
+from .pricing_checkpoint import PricingCheckpoint
+from .kafka_codec import decode_message
+
+PRICING_TOPICS = ('rates', 'weights', 'pricing.snapshot')
+# Các topic log-compacted chứa state đầy đủ, dùng cho bootstrap
+BOOTSTRAP_TOPICS = ('rates', 'weights')
+# (sku, material, snapshot) - snapshot None nghĩa là bên nhận tự lấy giá từ calculator
+PricingChange = Tuple[str, Optional[str], Optional[PricingSnapshot]]
+
+
+def _key_deserializer(m: Optional[bytes]):
+    return m.decode('utf-8') if m else None
+
+
+def _keep_latest(records: Dict[str, dict], key: str, value: dict, version_field: str):
+    """Giữ lại value có version cao nhất cho mỗi key"""
+    if not isinstance(value, dict):
+        raise ValueError(f"payload phải là object JSON, nhận {type(value).__name__}")
+    current = records.get(key)
+    if current is None or value.get(version_field, 0) > current.get(version_field, 0):
+        records[key] = value
+
+
+class _CheckpointRebalanceListener(ConsumerRebalanceListener):
+    """Seek tới offset trong checkpoint khi được assign partition (chỉ lần assign đầu tiên)"""
+
+    def __init__(self, pricing_consumer: 'KafkaPricingConsumer'):
+        self.pricing_consumer = pricing_consumer
+
+    def on_partitions_revoked(self, revoked):
+        # Commit đồng bộ phần đã xử lý trước khi partition chuyển sang consumer khác
+        self.pricing_consumer._commit_offsets(sync=True)
+
+    def on_partitions_assigned(self, assigned):
+        restored = self.pricing_consumer.restored_offsets
+        if not restored:
+            return
+        for tp in assigned:
+            # Offset checkpoint chỉ dùng một lần, rebalance sau đó đọc tiếp từ offset đã commit
+            offset = restored.pop((tp.topic, tp.partition), None)
+            if offset is not None:
+                self.pricing_consumer.consumer.seek(tp, offset)
+                print(f"Resume {tp.topic}[{tp.partition}] from checkpoint offset {offset}")
+
 
 class KafkaPricingConsumer:
     """Kafka consumer cho pricing system"""
     
     def __init__(self, 
                  bootstrap_servers: str = "localhost:9092",
-                 group_id: str = "pricing-gateway"):
+                 group_id: str = "pricing-gateway",
+                 checkpoint_path: Optional[str] = None,
+                 checkpoint_interval_sec: float = 30,
+                 bootstrap_from_compacted: bool = False,
+                 bootstrap_batch_size: int = 10000,
+                 commit_every_messages: int = 1000,
+                 commit_interval_ms: int = 1000,
+                 max_message_retries: int = 3):
         self.bootstrap_servers = bootstrap_servers
         self.group_id = group_id
         self.calculator = PricingCalculator()
@@ -23,8 +77,43 @@ class KafkaPricingConsumer:
         self.running = False
         self.thread = None
         
+        # Offset tiếp theo cần đọc của mỗi partition đã xử lý: (topic, partition) -> offset
+        self.offsets: Dict[Tuple[str, int], int] = {}
+        
+        # Checkpoint state để warm start sau khi restart
+        self.checkpoint = PricingCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.checkpoint_interval_sec = checkpoint_interval_sec
+        self.restored_offsets: Optional[Dict[Tuple[str, int], int]] = None
+        self._last_checkpoint = time.monotonic()
+        
+        # Bootstrap state từ topic compacted trước khi consume live
+        self.bootstrap_from_compacted = bootstrap_from_compacted
+        self.bootstrap_batch_size = bootstrap_batch_size
+        
+        # Commit offset thủ công sau khi đã áp dụng vào calculator (at-least-once),
+        # commit_async theo lô mỗi N message hoặc T ms
+        self.commit_every_messages = commit_every_messages
+        self.commit_interval_ms = commit_interval_ms
+        self.committed_offsets: Dict[Tuple[str, int], int] = {}
+        self._uncommitted_messages = 0
+        self._last_commit = time.monotonic()
+        self._last_commit_success: Optional[float] = None
+        self._commit_count = 0
+        self._commit_failures = 0
+        
+        # Batch lỗi được xử lý lại từng message; message vẫn lỗi sau max_message_retries
+        # lần bị bỏ qua (dead-letter) để không chặn cả partition
+        self.max_message_retries = max(1, int(max_message_retries))
+        self.dead_letters: deque = deque(maxlen=100)  # (topic, partition, offset, key, lỗi) gần nhất
+        self._dead_letter_count = 0
+        
         # Callbacks cho updates
         self.on_pricing_update: Optional[Callable[[str, PricingSnapshot], None]] = None
+        # Callback nhận cả batch update của một lần poll (ưu tiên hơn on_pricing_update)
+        self.on_pricing_batch: Optional[Callable[[List[Tuple[str, PricingSnapshot]]], None]] = None
+        # Callback chỉ nhận (sku, material, snapshot hoặc None) của batch, không materialize
+        # snapshot cho SKU tính từ bảng giá (ưu tiên hơn hai callback trên)
+        self.on_pricing_changed: Optional[Callable[[List[PricingChange]], None]] = None
         
     def start(self):
         """Bắt đầu consume Kafka"""
@@ -37,135 +126,414 @@ class KafkaPricingConsumer:
         print("Kafka pricing consumer started")
         
     def stop(self):
-        """Dừng consumer"""
+        """Dừng consumer (consumer thread tự commit lần cuối rồi đóng kết nối)"""
         self.running = False
-        if self.consumer:
-            self.consumer.close()
         if self.thread:
             self.thread.join(timeout=5)
+        if self.consumer:
+            self.consumer.close()
+            self.consumer = None
         print("Kafka pricing consumer stopped")
         
+    def _restore_checkpoint(self):
+        """Nạp checkpoint (nếu có) trước khi bắt đầu consume"""
+        if not self.checkpoint:
+            return
+        self.restored_offsets = self.checkpoint.restore(self.calculator)
+        if self.restored_offsets:
+            self.offsets.update(self.restored_offsets)
+            
+    def _maybe_checkpoint(self, force: bool = False):
+        """Ghi checkpoint định kỳ (chạy trên consumer thread nên state nhất quán)"""
+        if not self.checkpoint or not self.offsets:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_checkpoint < self.checkpoint_interval_sec:
+            return
+        self._last_checkpoint = now
+        self.checkpoint.save(self.calculator, self.offsets)
+        
+    def _bootstrap(self):
+        """Đọc topic rates/weights (compacted) từ đầu tới high-water mark và nạp state hàng loạt
+
+        Không tính giá từng message, không gọi callback; reprice một lần ở cuối,
+        sau đó consumer live tiếp tục từ đúng vị trí bootstrap dừng lại.
+        """
+        started = time.perf_counter()
+        consumer = KafkaConsumer(
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=None,
+            enable_auto_commit=False,
+            key_deserializer=_key_deserializer,
+            max_poll_records=self.bootstrap_batch_size,
+            fetch_max_bytes=64 * 1024 * 1024,
+            max_partition_fetch_bytes=16 * 1024 * 1024
+        )
+        try:
+            partitions = [
+                TopicPartition(topic, partition)
+                for topic in BOOTSTRAP_TOPICS
+                for partition in sorted(consumer.partitions_for_topic(topic) or ())
+            ]
+            if not partitions:
+                print("No compacted pricing topics to bootstrap from")
+                return
+            consumer.assign(partitions)
+            consumer.seek_to_beginning(*partitions)
+            end_offsets = consumer.end_offsets(partitions)
+            remaining = {tp for tp in partitions if consumer.position(tp) < end_offsets[tp]}
+            
+            # Chỉ giữ bản có version cao nhất của mỗi key
+            latest = {'rates': {}, 'weights': {}}
+            version_field = {'rates': 'rate_version', 'weights': 'weights_version'}
+            message_count = 0
+            while remaining and self.running:
+                for tp, messages in consumer.poll(timeout_ms=1000).items():
+                    records = latest[tp.topic]
+                    field = version_field[tp.topic]
+                    for message in messages:
+                        message_count += 1
+                        if message.value is None:
+                            # Tombstone: key đã bị xóa
+                            records.pop(message.key, None)
+                            continue
+                        try:
+                            _keep_latest(records, message.key, decode_message(message), field)
+                        except Exception as e:
+                            print(f"Skip undecodable message {tp.topic}[{tp.partition}]@{message.offset}: {e}")
+                    if consumer.position(tp) >= end_offsets[tp]:
+                        remaining.discard(tp)
+                        
+            rates = []
+            for material, data in latest['rates'].items():
+                try:
+                    rates.append(self._parse_rate(material, data))
+                except Exception as e:
+                    print(f"Skip invalid rate for {material} during bootstrap: {e}")
+            weights = []
+            for sku, data in latest['weights'].items():
+                try:
+                    weights.append(self._parse_weights(sku, data))
+                except Exception as e:
+                    print(f"Skip invalid weights for {sku} during bootstrap: {e}")
+            self.calculator.load_state(rates, weights)
+            
+            # Consumer live đọc tiếp từ chỗ bootstrap dừng lại
+            positions = {(tp.topic, tp.partition): consumer.position(tp) for tp in partitions}
+            self.restored_offsets = {**(self.restored_offsets or {}), **positions}
+            self.offsets.update(positions)
+            print(f"Bootstrapped pricing state from {message_count} messages "
+                  f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            print(f"Error bootstrapping pricing state: {e}")
+        finally:
+            consumer.close()
+            
     def _consume_loop(self):
         """Main consume loop"""
         try:
+            self._restore_checkpoint()
+            if self.bootstrap_from_compacted:
+                self._bootstrap()
             self.consumer = KafkaConsumer(
-                'rates', 'weights', 'pricing.snapshot',
                 bootstrap_servers=self.bootstrap_servers,
                 group_id=self.group_id,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                key_deserializer=lambda m: m.decode('utf-8') if m else None,
+                key_deserializer=_key_deserializer,  # value giữ nguyên bytes, decode theo header
                 auto_offset_reset='latest',  # Chỉ consume message mới
-                enable_auto_commit=True,
+                enable_auto_commit=False,  # Commit thủ công sau khi áp dụng (xem _maybe_commit)
                 consumer_timeout_ms=1000
             )
+            self.consumer.subscribe(PRICING_TOPICS, listener=_CheckpointRebalanceListener(self))
             
             print(f"Connected to Kafka: {self.bootstrap_servers}")
             
             while self.running:
                 try:
                     msg_pack = self.consumer.poll(timeout_ms=1000)
-                    for topic_partition, messages in msg_pack.items():
-                        for message in messages:
-                            self._process_message(message)
+                    if msg_pack:
+                        batch = [m for messages in msg_pack.values() for m in messages]
+                        try:
+                            self._process_batch(batch)
+                        except Exception as e:
+                            print(f"Error processing batch of {len(batch)} messages: {e}, retrying one by one")
+                            try:
+                                self._process_individually(batch)
+                            except Exception:
+                                # Không để lần poll sau (và commit) vượt qua batch chưa xử lý xong
+                                self._rewind(batch)
+                                raise
+                        self._uncommitted_messages += len(batch)
+                    self._maybe_commit()
+                    self._maybe_checkpoint()
                 except Exception as e:
                     print(f"Error in consume loop: {e}")
                     if self.running:
-                        import time
                         time.sleep(1)
                         
         except Exception as e:
-            print(f"Failed to connect to Kafka: {e}")
+            print(f"Failed to start Kafka consumer: {e}")
+            self.running = False
+        finally:
+            # Commit và checkpoint lần cuối khi dừng
+            self._commit_offsets(sync=True)
+            self._maybe_checkpoint(force=True)
+            if self.consumer:
+                self.consumer.close()
+                self.consumer = None
             
-    def _process_message(self, message):
-        """Xử lý message từ Kafka"""
+    def _process_individually(self, messages: list):
+        """Xử lý lại batch lỗi từng message một để cô lập message hỏng
+
+        Mỗi message được thử tối đa max_message_retries lần, sau đó bị dead-letter
+        và offset đi tiếp, nên một payload hỏng không làm kẹt partition.
+        """
+        for message in messages:
+            if self.offsets.get((message.topic, message.partition), -1) > message.offset:
+                continue  # Đã áp dụng trước khi batch lỗi
+            for attempt in range(1, self.max_message_retries + 1):
+                try:
+                    self._process_batch([message])
+                    break
+                except Exception as e:
+                    if attempt == self.max_message_retries:
+                        self._dead_letter(message, e)
+                    else:
+                        time.sleep(0.1 * attempt)
+                        
+    def _dead_letter(self, message, error: Exception):
+        """Bỏ qua message không xử lý được (ghi log, giữ lại để xem qua get_commit_stats)"""
+        self._dead_letter_count += 1
+        self.dead_letters.append((message.topic, message.partition, message.offset, message.key, str(error)))
+        self.offsets[(message.topic, message.partition)] = message.offset + 1
+        print(f"Dead-letter {message.topic}[{message.partition}]@{message.offset} key={message.key}: {error}")
+        
+    def _rewind(self, messages: list):
+        """Seek các partition của batch lỗi về offset đã áp dụng gần nhất để xử lý lại"""
+        first_offsets: Dict[Tuple[str, int], int] = {}
+        for message in messages:
+            first_offsets.setdefault((message.topic, message.partition), message.offset)
+        for (topic, partition), first_offset in first_offsets.items():
+            offset = self.offsets.get((topic, partition), first_offset)
+            self.consumer.seek(TopicPartition(topic, partition), offset)
+            print(f"Rewind {topic}[{partition}] to offset {offset} after batch error")
+            
+    def _maybe_commit(self):
+        """Commit bất đồng bộ khi đủ commit_every_messages message hoặc commit_interval_ms"""
+        if not self._uncommitted_messages:
+            return
+        elapsed_ms = (time.monotonic() - self._last_commit) * 1000
+        if self._uncommitted_messages >= self.commit_every_messages or elapsed_ms >= self.commit_interval_ms:
+            self._commit_offsets()
+            
+    def _commit_offsets(self, sync: bool = False):
+        """Commit offset đã xử lý của các partition đang được assign
+
+        Chỉ commit những gì đã áp dụng vào calculator (self.offsets được cập nhật
+        sau khi xử lý xong batch), nên restart chỉ có thể xử lý lại, không mất message.
+        """
+        if not self.consumer:
+            return
+        assigned = self.consumer.assignment()
+        offsets = {
+            TopicPartition(topic, partition): OffsetAndMetadata(offset, '')
+            for (topic, partition), offset in self.offsets.items()
+            if TopicPartition(topic, partition) in assigned
+            and self.committed_offsets.get((topic, partition)) != offset
+        }
+        self._uncommitted_messages = 0
+        self._last_commit = time.monotonic()
+        if not offsets:
+            return
         try:
-            topic = message.topic
-            key = message.key
-            value = message.value
-            
-            if topic == 'rates':
-                self._handle_rate_update(key, value)
-            elif topic == 'weights':
-                self._handle_weights_update(key, value)
-            elif topic == 'pricing.snapshot':
-                self._handle_pricing_snapshot(key, value)
-                
+            if sync:
+                self.consumer.commit(offsets)
+                self._on_commit(offsets, None)
+            else:
+                # Callback được gọi trong poll() trên chính consumer thread
+                self.consumer.commit_async(offsets, callback=self._on_commit)
         except Exception as e:
-            print(f"Error processing message from {message.topic}: {e}")
+            self._on_commit(offsets, e)
             
-    def _handle_rate_update(self, material: str, data: dict):
-        """Xử lý update tỷ giá"""
-        try:
-            rate = Rate(
-                material=MaterialType(material),
-                rate=data['rate'],
-                rate_version=data['rate_version'],
-                timestamp=datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-            )
+    def _on_commit(self, offsets, response):
+        """Callback của commit: response là Exception nếu commit lỗi"""
+        if isinstance(response, Exception):
+            self._commit_failures += 1
+            print(f"Error committing Kafka offsets: {response}")
+            return
+        self._commit_count += 1
+        self._last_commit_success = time.time()
+        for tp, meta in offsets.items():
+            key = (tp.topic, tp.partition)
+            if meta.offset > self.committed_offsets.get(key, -1):
+                self.committed_offsets[key] = meta.offset
+                
+    def get_commit_stats(self) -> dict:
+        """Thống kê commit: commit lag = số message đã xử lý nhưng chưa được commit"""
+        lag = {}
+        never_committed = 0
+        for (topic, partition), offset in self.offsets.items():
+            committed = self.committed_offsets.get((topic, partition))
+            if committed is None:
+                never_committed += 1
+            else:
+                lag[f"{topic}[{partition}]"] = offset - committed
+        return {
+            'commit_lag': sum(lag.values()),
+            'commit_lag_by_partition': lag,
+            'never_committed_partitions': never_committed,
+            'commits': self._commit_count,
+            'commit_failures': self._commit_failures,
+            'dead_lettered': self._dead_letter_count,
+            'recent_dead_letters': [
+                {'topic': topic, 'partition': partition, 'offset': offset, 'key': key, 'error': error}
+                for topic, partition, offset, key, error in self.dead_letters
+            ],
+            'last_commit_at': datetime.utcfromtimestamp(self._last_commit_success).isoformat()
+            if self._last_commit_success else None,
+            'last_commit_age_sec': time.time() - self._last_commit_success
+            if self._last_commit_success else None,
+        }
             
-            updated = self.calculator.update_rate(rate)
-            if updated:
-                # Notify về tất cả sản phẩm bị ảnh hưởng
-                self._notify_affected_products(material)
+    def _process_batch(self, messages: list):
+        """Xử lý cả batch của một lần poll
+
+        Gộp về version mới nhất cho mỗi material / SKU, áp dụng tất cả rồi tính lại
+        giá các SKU bị ảnh hưởng một lần và gửi một notification batch.
+        """
+        latest_rates: Dict[str, dict] = {}
+        latest_snapshots: Dict[str, dict] = {}
+        weights_messages = []
+        batch_offsets: Dict[Tuple[str, int], int] = {}
+        
+        for message in messages:
+            batch_offsets[(message.topic, message.partition)] = message.offset + 1
+            if message.value is None or message.key is None:
+                continue
+            if message.topic == 'weights':
+                # Decode/parse weights và bỏ bản cũ (xem _collect_weights)
+                weights_messages.append(message)
+                continue
+            try:
+                value = decode_message(message)
+                if message.topic == 'rates':
+                    _keep_latest(latest_rates, message.key, value, 'rate_version')
+                elif message.topic == 'pricing.snapshot':
+                    _keep_latest(latest_snapshots, message.key, value, 'snapshot_version')
+            except Exception as e:
+                # Payload hỏng hoặc không phải object JSON: bỏ message, không bỏ cả batch
+                print(f"Skip invalid message {message.topic}[{message.partition}]@{message.offset}: {e}")
                 
-        except Exception as e:
-            print(f"Error handling rate update for {material}: {e}")
+        rates = []
+        for material, data in latest_rates.items():
+            try:
+                rates.append(self._parse_rate(material, data))
+            except Exception as e:
+                print(f"Error handling rate update for {material}: {e}")
+        weights = list(self._collect_weights(weights_messages).values())
+                
+        affected = self._apply_updates(rates, weights)
+        snapshots: Dict[str, PricingSnapshot] = {}
+        for sku, data in latest_snapshots.items():
+            snapshot = self._apply_pricing_snapshot(sku, data)
+            if snapshot:
+                snapshots[sku] = snapshot
+                
+        self.offsets.update(batch_offsets)
+        
+        if affected or snapshots:
+            updated = sum(len(skus) for skus in affected.values()) + len(snapshots)
+            print(f"Processed batch of {len(messages)} messages, {updated} prices updated")
+            self._notify_batch(affected, snapshots)
             
-    def _handle_weights_update(self, sku: str, data: dict):
-        """Xử lý update trọng số sản phẩm"""
-        try:
-            weights = ProductWeights(
-                sku=sku,
-                material=MaterialType(data['material']),
-                weight_gram=data['weight_gram'],
-                stone_weight=data.get('stone_weight', 0),
-                labor_cost=data.get('labor_cost', 0),
-                markup_percent=data.get('markup_percent', 0),
-                weights_version=data['weights_version'],
-                timestamp=datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-            )
+    def _apply_updates(self, rates: List[RateRecord], weights: List[WeightsRecord]) -> Dict[str, List[str]]:
+        """Áp dụng rates/weights vào calculator, trả về material -> SKU có giá mới (chưa materialize snapshot)"""
+        if not rates and not weights:
+            return {}
+        return self.calculator.apply_updates_by_material(rates, weights)
+        
+    def _collect_weights(self, messages: list) -> Dict[str, WeightsRecord]:
+        """Decode + parse các message weights, giữ bản mới nhất của mỗi SKU
+
+        Bỏ luôn các bản không mới hơn version đang có trong calculator.
+        """
+        latest: Dict[str, dict] = {}
+        for message in messages:
+            try:
+                _keep_latest(latest, message.key, decode_message(message), 'weights_version')
+            except Exception as e:
+                print(f"Skip invalid message {message.topic}[{message.partition}]@{message.offset}: {e}")
             
-            updated = self.calculator.update_weights(weights)
-            if updated:
-                # Notify về sản phẩm này
-                snapshot = self.calculator.get_pricing(sku)
-                if snapshot and self.on_pricing_update:
-                    self.on_pricing_update(sku, snapshot)
-                    
-        except Exception as e:
-            print(f"Error handling weights update for {sku}: {e}")
+        current_weights = self.calculator.weights
+        records: Dict[str, WeightsRecord] = {}
+        for sku, data in latest.items():
+            try:
+                record = self._parse_weights(sku, data)
+            except Exception as e:
+                print(f"Error handling weights update for {sku}: {e}")
+                continue
+            current = current_weights.get(sku)
+            if current is None or record.weights_version > current.weights_version:
+                records[sku] = record
+        return records
+        
+    def _notify_batch(self, affected: Dict[str, List[str]], snapshots: Optional[Dict[str, PricingSnapshot]] = None):
+        """Gửi notification cho cả batch
+
+        affected là material -> SKU được tính lại từ bảng giá, snapshots là snapshot
+        nhận trực tiếp từ topic pricing.snapshot. Với on_pricing_changed, snapshot của
+        affected để bên nhận tự materialize (chỉ cho SKU thực sự có người nghe).
+        """
+        snapshots = snapshots or {}
+        if self.on_pricing_changed:
+            changes: List[PricingChange] = []
+            for material, skus in affected.items():
+                changes.extend((sku, material, None) for sku in skus if sku not in snapshots)
+            changes.extend(
+                (sku, getattr(snapshot.material, 'value', snapshot.material), snapshot)
+                for sku, snapshot in snapshots.items()
+            )
+            self.on_pricing_changed(changes)
+            return
+        if not self.on_pricing_batch and not self.on_pricing_update:
+            return
+
+        updates = self.calculator.get_pricing_many(
+            sku for skus in affected.values() for sku in skus if sku not in snapshots
+        )
+        updates.update(snapshots)
+        if self.on_pricing_batch:
+            self.on_pricing_batch(list(updates.items()))
+        elif self.on_pricing_update:
+            for sku, snapshot in updates.items():
+                self.on_pricing_update(sku, snapshot)
+                
+    def _parse_rate(self, material: str, data: dict) -> RateRecord:
+        """Tạo RateRecord từ message của topic rates (không qua Pydantic)"""
+        return RateRecord.from_message(material, data)
+        
+    def _parse_weights(self, sku: str, data: dict) -> WeightsRecord:
+        """Tạo WeightsRecord từ message của topic weights (không qua Pydantic)"""
+        return WeightsRecord.from_message(sku, data)
             
-    def _handle_pricing_snapshot(self, sku: str, data: dict):
-        """Xử lý pricing snapshot từ aggregator khác"""
+    def _apply_pricing_snapshot(self, sku: str, data: dict) -> Optional[PricingSnapshot]:
+        """Ghi pricing snapshot từ aggregator khác vào cache, None nếu cũ hơn hoặc lỗi"""
         try:
             snapshot = PricingSnapshot(**data)
             
-            # Kiểm tra version để tránh cũ hơn
-            current = self.calculator.get_pricing(sku)
-            if current and snapshot.snapshot_version <= current.snapshot_version:
-                return
-                
-            # Update cache trực tiếp
-            self.calculator.pricing_cache[sku] = snapshot
-            
-            # Notify
-            if self.on_pricing_update:
-                self.on_pricing_update(sku, snapshot)
+            with self.calculator.lock:
+                # Kiểm tra version để tránh cũ hơn
+                current = self.calculator.get_pricing(sku)
+                if current and snapshot.snapshot_version <= current.snapshot_version:
+                    return None
+                    
+                # Update cache trực tiếp
+                self.calculator.pricing_cache[sku] = snapshot
+            return snapshot
                 
         except Exception as e:
             print(f"Error handling pricing snapshot for {sku}: {e}")
+            return None
             
-    def _notify_affected_products(self, material: str):
-        """Notify về tất cả sản phẩm bị ảnh hưởng bởi thay đổi tỷ giá"""
-        if not self.on_pricing_update:
-            return
-            
-        for sku, weights in self.calculator.weights.items():
-            if weights.material.value == material:
-                snapshot = self.calculator.get_pricing(sku)
-                if snapshot:
-                    self.on_pricing_update(sku, snapshot)
-                    
     def get_calculator(self) -> PricingCalculator:
         """Lấy calculator instance"""
         return self.calculator
@@ -194,6 +562,8 @@ class KafkaPricingConsumer:
             "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        # Simulate message processing
-        self._handle_rate_update("gold", test_rate)
-        self._handle_weights_update("PRODUCT_001", test_weights)
+        # Simulate message processing (cùng đường xử lý với một batch từ Kafka)
+        affected = self._apply_updates([self._parse_rate("gold", test_rate)],
+                                       [self._parse_weights("PRODUCT_001", test_weights)])
+        if affected:
+            self._notify_batch(affected)
@@ -0,0 +1,579 @@
+"""
+Pricing Broadcaster - Đẩy pricing update từ Kafka thread tới các SSE client
+Kafka consumer chạy trên thread riêng nên không được đụng trực tiếp vào
+asyncio.Queue của event loop. Update được đưa vào một ingress queue thread-safe,
+một dispatcher task trên event loop lấy ra và phát tới các subscriber.
+Mỗi update chỉ được serialize một lần thành SSE frame (bytes) dùng chung cho
+mọi subscriber, EventSourceResponse gửi bytes nguyên trạng không encode lại.
+Mỗi subscriber có buffer gộp theo SKU (chỉ giữ giá mới nhất chưa gửi), nên client
+chậm chỉ tốn bộ nhớ theo số SKU chứ không theo tần suất tick.
+Client có thể chỉ đăng ký một số SKU / tiền tố SKU / material, update được
+định tuyến qua index nên chỉ tốn công cho những subscriber quan tâm.
+Mỗi update có event id tăng dần và được giữ trong ring buffer (một entry cho mỗi
+batch, batch mới nhất luôn được giữ trọn), client kết nối lại với Last-Event-ID
+chỉ nhận phần đã lỡ (hoặc full snapshot nếu đã quá xa).
+Kafka thread có thể chỉ gửi SKU id (publish_changes), snapshot được materialize
+qua pricing_provider cho những SKU có subscriber quan tâm, không tốn công khi
+không ai nghe.
+"""
+import asyncio
+import json
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from ..models.pricing import PricingSnapshot
+
+# Separator mặc định của sse_starlette.EventSourceResponse
+SSE_SEPARATOR = "\r\n"
+
+
+def encode_sse_event(event: str, data: str, event_id: Optional[int] = None) -> bytes:
+    """Đóng gói một SSE event thành bytes (data phải là JSON một dòng)"""
+    id_line = f"id: {event_id}{SSE_SEPARATOR}" if event_id is not None else ""
+    return f"{id_line}event: {event}{SSE_SEPARATOR}data: {data}{SSE_SEPARATOR}{SSE_SEPARATOR}".encode('utf-8')
+
+
+def parse_event_id(value: Optional[str]) -> Optional[int]:
+    """Parse Last-Event-ID, trả về -1 nếu client gửi id không hợp lệ (cần resync)"""
+    if value is None or not value.strip():
+        return None
+    try:
+        return int(value.strip())
+    except ValueError:
+        return -1
+
+
+def split_filter(value: Optional[str]) -> List[str]:
+    """Tách query param dạng 'a,b,c' thành list (bỏ giá trị rỗng)"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+# Chính sách khi buffer của một client đầy
+OVERFLOW_RESYNC = 'resync'  # Bỏ toàn bộ buffer, gửi lại full snapshot cho client
+OVERFLOW_DROP_OLDEST = 'drop_oldest'  # Bỏ SKU chờ lâu nhất
+
+
+class ConflatingBuffer:
+    """Buffer của một SSE client, gộp update theo SKU
+
+    Update mới của một SKU đang chờ gửi sẽ ghi đè frame cũ (giữ nguyên vị trí),
+    số SKU chờ gửi bị giới hạn bởi max_size (None = tối đa bằng số SKU của catalog).
+    """
+
+    def __init__(self, max_size: Optional[int] = None, overflow_policy: str = OVERFLOW_RESYNC,
+                 skus: Optional[List[str]] = None, prefixes: Optional[List[str]] = None,
+                 materials: Optional[List[str]] = None):
+        if overflow_policy not in (OVERFLOW_RESYNC, OVERFLOW_DROP_OLDEST):
+            raise ValueError(f"Overflow policy không hợp lệ: {overflow_policy}")
+        # Bộ lọc đăng ký (rỗng hết = nhận tất cả)
+        self.skus = frozenset(skus or ())
+        self.prefixes = frozenset(prefixes or ())
+        self.materials = frozenset(materials or ())
+        self.max_size = max_size
+        self.overflow_policy = overflow_policy
+        self.pending: Dict[str, bytes] = {}  # sku -> SSE frame mới nhất chưa gửi
+        self.resync_required = False
+        self._ready = asyncio.Event()
+
+        self.conflated = 0  # Số frame bị ghi đè bởi giá mới hơn
+        self.dropped = 0  # Số frame bị bỏ do buffer đầy
+        self.resyncs = 0
+
+    @property
+    def is_filtered(self) -> bool:
+        return bool(self.skus or self.prefixes or self.materials)
+
+    def matches(self, sku: str, material: Optional[str]) -> bool:
+        """Kiểm tra client có quan tâm tới SKU này không"""
+        if not self.is_filtered:
+            return True
+        return (
+            sku in self.skus
+            or material in self.materials
+            or any(sku.startswith(prefix) for prefix in self.prefixes)
+        )
+
+    def put(self, sku: str, frame: bytes):
+        """Thêm frame của một SKU (chạy trên event loop thread)"""
+        if self.resync_required:
+            # Client sẽ nhận full snapshot, không cần giữ delta
+            return
+
+        if sku in self.pending:
+            self.conflated += 1
+        elif self.max_size is not None and len(self.pending) >= self.max_size:
+            if self.overflow_policy == OVERFLOW_RESYNC:
+                self.request_resync()
+                return
+            del self.pending[next(iter(self.pending))]
+            self.dropped += 1
+
+        self.pending[sku] = frame
+        self._ready.set()
+
+    def request_resync(self):
+        """Yêu cầu gửi full snapshot thay cho các delta đang chờ"""
+        self.dropped += len(self.pending)
+        self.pending.clear()
+        self.resync_required = True
+        self.resyncs += 1
+        self._ready.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Chờ có dữ liệu, trả về False nếu hết timeout"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def drain(self) -> Tuple[bool, List[bytes]]:
+        """Lấy toàn bộ frame đang chờ và cờ resync"""
+        resync, self.resync_required = self.resync_required, False
+        frames = list(self.pending.values())
+        self.pending.clear()
+        self._ready.clear()
+        return resync, frames
+
+
+class PricingBroadcaster:
+    """Cầu nối thread-safe giữa KafkaPricingConsumer và các SSE connection"""
+
+    def __init__(self, max_pending: int = 100000, keepalive_sec: float = 30, yield_every: int = 500,
+                 client_buffer_size: Optional[int] = None, overflow_policy: str = OVERFLOW_RESYNC,
+                 replay_buffer_size: int = 50000,
+                 snapshot_provider: Optional[Callable[[], Dict[str, PricingSnapshot]]] = None,
+                 pricing_provider: Optional[Callable[[List[str]], Dict[str, PricingSnapshot]]] = None):
+        self.max_pending = max_pending  # Giới hạn ingress queue khi event loop chưa kịp xử lý
+        self.keepalive_sec = keepalive_sec
+        self.yield_every = yield_every  # Nhường event loop sau mỗi N update để không chặn request khác
+        # Số SKU chờ gửi tối đa cho mỗi client, None = không giới hạn thêm (tối đa bằng catalog)
+        self.client_buffer_size = client_buffer_size
+        self.overflow_policy = overflow_policy
+        # Hàm lấy toàn bộ giá hiện tại, dùng khi client cần resync
+        self.snapshot_provider = snapshot_provider
+        # Hàm lấy giá hiện tại của một danh sách SKU, dùng cho update chỉ có SKU id
+        self.pricing_provider = pricing_provider
+        # Snapshot resync gần nhất: (event_id, task tạo snapshot), dùng chung cho mọi client
+        self._resync_snapshot: Optional[Tuple[int, asyncio.Future]] = None
+        self._snapshot_builds = 0
+
+        # Chỉ được truy cập từ event loop thread
+        self.subscribers: Set[ConflatingBuffer] = set()
+        # Event id tăng dần, khởi tạo theo thời gian để id sau restart không trùng id cũ
+        self._event_seq = int(time.time() * 1000) * 1000
+        # Ring buffer các batch gần nhất: (event_id đầu tiên, list (sku, material, snapshot hoặc None)),
+        # id liên tiếp trong batch và giữa các batch. Giữ tối đa replay_buffer_size update
+        # nhưng không bao giờ bỏ batch mới nhất (một tick cả catalog vẫn replay được)
+        self.replay_buffer_size = replay_buffer_size
+        self._replay: deque = deque()
+        self._replay_count = 0
+        # Index định tuyến: client không lọc / theo SKU / theo tiền tố / theo material
+        self._unfiltered: Set[ConflatingBuffer] = set()
+        self._by_sku: Dict[str, Set[ConflatingBuffer]] = {}
+        self._by_prefix: Dict[str, Set[ConflatingBuffer]] = {}
+        self._prefix_lengths: Dict[int, int] = {}  # độ dài tiền tố -> số tiền tố đang đăng ký
+        self._by_material: Dict[str, Set[ConflatingBuffer]] = {}
+
+        # Ingress queue: Kafka thread ghi, dispatcher task đọc
+        self._pending: deque = deque()
+        self._lock = threading.Lock()
+        self._wakeup_scheduled = False
+        # Ingress queue bị tràn (đã bỏ update): mọi subscriber phải resync
+        self._overflowed = False
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._published = 0
+        self._dispatched = 0
+        self._dropped = 0
+        self._overflows = 0
+
+    def start(self):
+        """Khởi động dispatcher task (gọi trong startup event của app)"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._dispatch_loop())
+        with self._lock:
+            if self._pending:
+                self._wakeup_scheduled = True
+                self._wakeup.set()
+
+    async def stop(self):
+        """Dừng dispatcher task"""
+        task, self._task = self._task, None
+        self._loop = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def publish(self, sku: str, snapshot: PricingSnapshot):
+        """Nhận pricing update, gọi được từ bất kỳ thread nào (Kafka consumer thread)"""
+        self._enqueue([(sku, getattr(snapshot.material, 'value', snapshot.material), snapshot)])
+
+    def publish_batch(self, updates: List[Tuple[str, PricingSnapshot]]):
+        """Nhận cả batch pricing update (một lần lock, một lần đánh thức dispatcher)"""
+        self._enqueue([
+            (sku, getattr(snapshot.material, 'value', snapshot.material), snapshot)
+            for sku, snapshot in updates
+        ])
+
+    def publish_changes(self, changes: List[Tuple[str, Optional[str], Optional[PricingSnapshot]]]):
+        """Nhận batch (sku, material, snapshot), snapshot None sẽ lấy qua pricing_provider
+
+        Snapshot chỉ được materialize khi SKU có subscriber quan tâm (hoặc khi replay).
+        """
+        self._enqueue(changes)
+
+    def _enqueue(self, updates: List[Tuple[str, Optional[str], Optional[PricingSnapshot]]]):
+        """Đưa update vào ingress queue, gọi được từ bất kỳ thread nào"""
+        if not updates:
+            return
+        with self._lock:
+            overflow = len(self._pending) + len(updates) - self.max_pending
+            if overflow > 0:
+                for _ in range(min(overflow, len(self._pending))):
+                    self._pending.popleft()
+                self._dropped += overflow
+                self._overflowed = True
+                updates = updates[-self.max_pending:]
+            self._pending.extend(updates)
+            self._published += len(updates)
+
+            # Chỉ đánh thức dispatcher một lần cho cả loạt update
+            if self._loop is None or self._wakeup_scheduled:
+                return
+            self._wakeup_scheduled = True
+            loop = self._loop
+
+        try:
+            loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # Event loop đã đóng (app đang shutdown)
+            pass
+
+    async def _dispatch_loop(self):
+        """Lấy update từ ingress queue và phát tới subscribers"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            with self._lock:
+                batch, self._pending = self._pending, deque()
+                self._wakeup_scheduled = False
+                overflowed, self._overflowed = self._overflowed, False
+
+            if overflowed:
+                self._resync_all()
+
+            updates = list(batch)
+            first_id = self._record(updates) if updates else 0
+            for start in range(0, len(updates), self.yield_every):
+                try:
+                    await self._broadcast(updates[start:start + self.yield_every], first_id + start)
+                except Exception as e:
+                    print(f"Error broadcasting pricing updates: {e}")
+                # Nhường event loop giữa các phần của batch
+                await asyncio.sleep(0)
+
+            if batch:
+                print(f"Broadcasted {len(batch)} pricing updates to {len(self.subscribers)} connections")
+
+    def _resync_all(self):
+        """Ingress queue đã bỏ update: không client nào còn đủ delta, tất cả phải resync
+
+        Replay buffer cũng bị hụt nên được xóa và bỏ qua một event id (đại diện cho các
+        update đã mất), client kết nối lại với id cũ sẽ resync.
+        """
+        self._overflows += 1
+        print(f"Pricing ingress queue overflowed (max_pending={self.max_pending}), "
+              f"resyncing {len(self.subscribers)} connections")
+        self._replay.clear()
+        self._replay_count = 0
+        self._event_seq += 1
+        for buffer in self.subscribers:
+            buffer.request_resync()
+
+    def _build_event(self, sku: str, snapshot: PricingSnapshot, event_id: int) -> bytes:
+        """Serialize một pricing update thành SSE frame (một lần cho mọi subscriber)"""
+        # json() của Pydantic đã handle datetime, ghép thẳng vào payload thay vì loads/dumps lại
+        data = (
+            '{"type": "pricing_update", "sku": ' + json.dumps(sku)
+            + ', "pricing": ' + snapshot.json()
+            + ', "timestamp": "' + datetime.utcnow().isoformat() + 'Z"}'
+        )
+        return encode_sse_event("pricing_update", data, event_id)
+
+    def _route_filtered(self, sku: str, material: Optional[str]) -> Optional[Set[ConflatingBuffer]]:
+        """Tìm các subscriber có lọc quan tâm tới SKU qua index, None nếu không có
+
+        Client không lọc nhận mọi update nên không đi qua đây; chỉ tạo set khi có match.
+        """
+        targets = None
+        candidates = [self._by_sku.get(sku), self._by_material.get(material)]
+        candidates.extend(self._by_prefix.get(sku[:length]) for length in self._prefix_lengths)
+        for interested in candidates:
+            if interested:
+                targets = targets | interested if targets else set(interested)
+        return targets
+
+    async def _materialize(self, skus: List[str]) -> Dict[str, PricingSnapshot]:
+        """Lấy snapshot hiện tại của các SKU qua pricing_provider (chạy ngoài event loop)"""
+        if not skus or self.pricing_provider is None:
+            return {}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.pricing_provider, skus)
+
+    def _record(self, updates: List[Tuple[str, Optional[str], Optional[PricingSnapshot]]]) -> int:
+        """Cấp event id cho cả batch và ghi vào replay buffer, trả về id đầu tiên
+
+        Luôn ghi (kể cả khi chưa có ai nghe) vì chỉ giữ tham chiếu tới list của batch.
+        """
+        first_id = self._event_seq + 1
+        self._event_seq += len(updates)
+        self._replay.append((first_id, updates))
+        self._replay_count += len(updates)
+        while self._replay_count > self.replay_buffer_size and len(self._replay) > 1:
+            _, evicted = self._replay.popleft()
+            self._replay_count -= len(evicted)
+        return first_id
+
+    async def _broadcast(self, updates: List[Tuple[str, Optional[str], Optional[PricingSnapshot]]],
+                         first_id: int):
+        """Phát một phần batch (event id bắt đầu từ first_id) tới các subscriber quan tâm
+
+        Định tuyến theo SKU id trước, chỉ SKU có subscriber mới được materialize.
+        Tập client không lọc chỉ lấy một lần cho cả phần batch, index lọc chỉ được
+        tra khi có client lọc.
+        """
+        unfiltered = tuple(self._unfiltered)
+        has_filtered = len(self.subscribers) > len(unfiltered)
+        routed = []
+        for event_id, (sku, material, snapshot) in enumerate(updates, first_id):
+            filtered = self._route_filtered(sku, material) if has_filtered else None
+            if unfiltered or filtered:
+                routed.append((event_id, sku, snapshot, filtered))
+        if not routed:
+            return
+
+        # Client kết nối trong lúc chờ đã replay được các event này từ ring buffer
+        snapshots = await self._materialize([sku for _, sku, snapshot, _ in routed if snapshot is None])
+        for event_id, sku, snapshot, filtered in routed:
+            snapshot = snapshot or snapshots.get(sku)
+            if snapshot is None:
+                continue
+            event = self._build_event(sku, snapshot, event_id)  # bytes bất biến, dùng chung cho mọi buffer
+            for buffer in unfiltered:
+                buffer.put(sku, event)
+            if filtered:
+                for buffer in filtered:
+                    buffer.put(sku, event)
+            self._dispatched += 1
+
+    def subscribe(self, skus: Optional[List[str]] = None, prefixes: Optional[List[str]] = None,
+                  materials: Optional[List[str]] = None) -> ConflatingBuffer:
+        """Đăng ký một SSE connection mới (có thể kèm bộ lọc SKU / tiền tố / material)"""
+        buffer = ConflatingBuffer(self.client_buffer_size, self.overflow_policy, skus, prefixes, materials)
+        self.subscribers.add(buffer)
+
+        if not buffer.is_filtered:
+            self._unfiltered.add(buffer)
+        for sku in buffer.skus:
+            self._by_sku.setdefault(sku, set()).add(buffer)
+        for material in buffer.materials:
+            self._by_material.setdefault(material, set()).add(buffer)
+        for prefix in buffer.prefixes:
+            if prefix not in self._by_prefix:
+                self._prefix_lengths[len(prefix)] = self._prefix_lengths.get(len(prefix), 0) + 1
+            self._by_prefix.setdefault(prefix, set()).add(buffer)
+        return buffer
+
+    def _unindex(self, index: Dict[str, Set[ConflatingBuffer]], key: str, buffer: ConflatingBuffer) -> bool:
+        """Gỡ buffer khỏi một index, trả về True nếu key không còn subscriber"""
+        interested = index.get(key)
+        if interested is None:
+            return False
+        interested.discard(buffer)
+        if not interested:
+            del index[key]
+            return True
+        return False
+
+    def unsubscribe(self, buffer: ConflatingBuffer):
+        """Hủy đăng ký SSE connection"""
+        if buffer not in self.subscribers:
+            return
+        self.subscribers.discard(buffer)
+        self._unfiltered.discard(buffer)
+        for sku in buffer.skus:
+            self._unindex(self._by_sku, sku, buffer)
+        for material in buffer.materials:
+            self._unindex(self._by_material, material, buffer)
+        for prefix in buffer.prefixes:
+            if self._unindex(self._by_prefix, prefix, buffer):
+                self._prefix_lengths[len(prefix)] -= 1
+                if not self._prefix_lengths[len(prefix)]:
+                    del self._prefix_lengths[len(prefix)]
+
+    async def _replay_since(self, buffer: ConflatingBuffer, last_event_id: int):
+        """Đưa các update client đã lỡ vào buffer, resync nếu id nằm ngoài replay buffer
+
+        Buffer đã subscribe trước nên update mới trong lúc materialize vẫn vào buffer;
+        SKU đã có frame mới hơn thì không ghi đè bằng frame replay.
+        """
+        if last_event_id == self._event_seq:
+            return
+        oldest = self._replay[0][0] if self._replay else self._event_seq + 1
+        if last_event_id > self._event_seq or last_event_id < oldest - 1:
+            # Id từ lần chạy trước hoặc đã bị đẩy khỏi ring buffer
+            buffer.request_resync()
+            return
+
+        # Id liên tiếp nên vị trí bắt đầu trong batch tính trực tiếp, chỉ giữ bản mới nhất của mỗi SKU
+        missed: Dict[str, tuple] = {}
+        for first_id, updates in self._replay:
+            start = last_event_id - first_id + 1
+            if start >= len(updates):
+                continue
+            start = max(start, 0)
+            for event_id, (sku, material, snapshot) in enumerate(itertools.islice(updates, start, None),
+                                                                 first_id + start):
+                if buffer.matches(sku, material):
+                    missed.pop(sku, None)
+                    missed[sku] = (event_id, snapshot)
+        snapshots = await self._materialize([sku for sku, (_, snapshot) in missed.items() if snapshot is None])
+        for sku, (event_id, snapshot) in missed.items():
+            snapshot = snapshot or snapshots.get(sku)
+            if snapshot is not None and sku not in buffer.pending:
+                buffer.put(sku, self._build_event(sku, snapshot, event_id))
+
+    async def _load_resync_snapshot(self, event_id: int) -> Tuple[List[Tuple[str, Optional[str], str]], bytes]:
+        """Đọc toàn bộ giá hiện tại một lần và serialize sẵn
+
+        Trả về (sku, material, JSON của snapshot) cho client có lọc và event 'initial'
+        đầy đủ cho client không lọc.
+        """
+        self._snapshot_builds += 1
+        loop = asyncio.get_running_loop()
+        # Materialize snapshot có thể tốn thời gian với catalog lớn, chạy ngoài event loop
+        # (calculator tự lock nên Kafka thread không sửa state giữa chừng)
+        all_pricing = await loop.run_in_executor(None, self.snapshot_provider)
+        entries = [
+            (sku, getattr(snapshot.material, 'value', snapshot.material), snapshot.json())
+            for sku, snapshot in all_pricing.items()
+        ]
+        return entries, self._encode_initial_event(entries, event_id)
+
+    def _encode_initial_event(self, entries: List[Tuple[str, Optional[str], str]], event_id: int) -> bytes:
+        pricing = ', '.join(json.dumps(sku) + ': ' + data for sku, _, data in entries)
+        data = (
+            '{"type": "initial", "pricing": {' + pricing
+            + '}, "timestamp": "' + datetime.utcnow().isoformat() + 'Z"}'
+        )
+        return encode_sse_event("initial", data, event_id)
+
+    async def _build_initial_event(self, buffer: ConflatingBuffer, event_id: int) -> Optional[bytes]:
+        """Tạo event 'initial' chứa toàn bộ giá hiện tại mà client quan tâm (dùng khi resync)
+
+        Snapshot chỉ được tạo một lần cho mỗi event id, các client resync cùng lúc
+        dùng chung; client không lọc nhận nguyên bytes đã encode.
+        """
+        if self.snapshot_provider is None:
+            return None
+        cached = self._resync_snapshot
+        if cached is None or cached[0] != event_id:
+            cached = self._resync_snapshot = (event_id, asyncio.ensure_future(self._load_resync_snapshot(event_id)))
+        try:
+            entries, initial = await asyncio.shield(cached[1])
+        except Exception as e:
+            if self._resync_snapshot is cached:
+                self._resync_snapshot = None
+            print(f"Error building pricing snapshot for resync: {e}")
+            return None
+        if not buffer.is_filtered:
+            return initial
+        return self._encode_initial_event(
+            [entry for entry in entries if buffer.matches(entry[0], entry[1])], event_id
+        )
+
+    async def stream(self, skus: Optional[List[str]] = None, prefixes: Optional[List[str]] = None,
+                     materials: Optional[List[str]] = None, last_event_id: Optional[int] = None):
+        """Async generator cho EventSourceResponse
+
+        last_event_id: id của event cuối cùng client đã nhận (header Last-Event-ID)
+        """
+        buffer = self.subscribe(skus, prefixes, materials)
+        try:
+            # Subscribe trước rồi mới replay nên không lỡ update nào giữa hai bước
+            if last_event_id is not None:
+                await self._replay_since(buffer, last_event_id)
+
+            # Gửi connection established event
+            yield {
+                "event": "connected",
+                "data": json.dumps({
+                    "type": "connected",
+                    "message": "SSE connection established",
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+            }
+
+            while True:
+                # Đợi buffer có dữ liệu hoặc timeout để gửi keepalive
+                if await buffer.wait(self.keepalive_sec):
+                    snapshot_event_id = self._event_seq
+                    resync, frames = buffer.drain()
+                    if resync:
+                        initial = await self._build_initial_event(buffer, snapshot_event_id)
+                        if initial:
+                            yield initial
+                    if frames:
+                        # Gộp các frame thành một lần ghi socket
+                        yield b''.join(frames)
+                else:
+                    yield {
+                        "event": "keepalive",
+                        "data": json.dumps({
+                            "type": "keepalive",
+                            "timestamp": datetime.utcnow().isoformat()
+                        })
+                    }
+        finally:
+            # Cleanup connection
+            self.unsubscribe(buffer)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Thống kê broadcaster"""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "connections": len(self.subscribers),
+            "filtered_connections": len(self.subscribers) - len(self._unfiltered),
+            "running": self._task is not None,
+            "pending": pending,
+            "published": self._published,
+            "dispatched": self._dispatched,
+            "dropped": self._dropped,
+            "ingress_overflows": self._overflows,
+            "resync_snapshot_builds": self._snapshot_builds,
+            "last_event_id": self._event_seq,
+            "replay_buffered": self._replay_count,
+            "replay_batches": len(self._replay),
+            "client_buffered": sum(len(b.pending) for b in self.subscribers),
+            "client_conflated": sum(b.conflated for b in self.subscribers),
+            "client_dropped": sum(b.dropped for b in self.subscribers),
+            "client_resyncs": sum(b.resyncs for b in self.subscribers),
+        }
@@ -0,0 +1,105 @@
+"""
+Pricing Checkpoint - Lưu/nạp state của PricingCalculator ra file nhị phân
+Checkpoint gồm rates, weights và Kafka offset đã xử lý, ghi atomic (file tạm +
+os.replace) để khi restart gateway có giá ngay mà không chờ publish lại weights.
+"""
+import os
+import pickle
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from ..models.pricing import RateRecord, WeightsRecord, material_type
+from .pricing_service import PricingCalculator
+
+# Tăng khi thay đổi cấu trúc dữ liệu trong file
+CHECKPOINT_FORMAT_VERSION = 1
+
+# (topic, partition) -> offset của message tiếp theo cần đọc
+Offsets = Dict[Tuple[str, int], int]
+
+
+class PricingCheckpoint:
+    """Đọc/ghi checkpoint của pricing state"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.last_saved_at: Optional[float] = None
+        self.last_save_ms: Optional[float] = None
+
+    def save(self, calculator: PricingCalculator, offsets: Offsets) -> bool:
+        """Ghi checkpoint (gọi từ thread đang cập nhật calculator để state nhất quán)"""
+        started = time.perf_counter()
+        try:
+            state = calculator.export_state()
+            payload = {
+                'format_version': CHECKPOINT_FORMAT_VERSION,
+                'created_at': time.time(),
+                'rates': state['rates'],
+                'weights': state['weights'],
+                'offsets': dict(offsets),
+            }
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            # Thay file cũ một cách atomic, không bao giờ để lại checkpoint ghi dở
+            os.replace(tmp_path, self.path)
+
+            self.last_saved_at = time.time()
+            self.last_save_ms = (time.perf_counter() - started) * 1000
+            return True
+        except Exception as e:
+            print(f"Error saving pricing checkpoint to {self.path}: {e}")
+            return False
+
+    def load(self) -> Optional[dict]:
+        """Đọc checkpoint, trả về None nếu không có hoặc không hợp lệ"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                payload = pickle.load(f)
+            if payload.get('format_version') != CHECKPOINT_FORMAT_VERSION:
+                print(f"Ignore pricing checkpoint with format {payload.get('format_version')}")
+                return None
+            return payload
+        except Exception as e:
+            print(f"Error loading pricing checkpoint from {self.path}: {e}")
+            return None
+
+    def restore(self, calculator: PricingCalculator) -> Optional[Offsets]:
+        """Nạp checkpoint vào calculator, trả về offsets để consumer seek tới"""
+        started = time.perf_counter()
+        payload = self.load()
+        if payload is None:
+            return None
+
+        rates = [
+            RateRecord(material_type(material), rate, rate_version, timestamp, currency)
+            for material, rate, currency, rate_version, timestamp in payload['rates']
+        ]
+        weights = [
+            WeightsRecord(sku, material_type(material), weight_gram, weights_version,
+                          stone_weight or 0, labor_cost, markup_percent, formula, timestamp)
+            for (sku, material, weight_gram, stone_weight, labor_cost,
+                 markup_percent, formula, weights_version, timestamp) in payload['weights']
+        ]
+        calculator.load_state(rates, weights)
+
+        age = time.time() - payload['created_at']
+        print(f"Restored pricing checkpoint ({len(weights)} products, {age:.0f}s old) "
+              f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return payload['offsets']
+
+    def get_stats(self) -> dict:
+        """Thống kê checkpoint"""
+        return {
+            'path': self.path,
+            'last_saved_at': datetime.utcfromtimestamp(self.last_saved_at).isoformat() if self.last_saved_at else None,
+            'last_save_ms': self.last_save_ms,
+        }
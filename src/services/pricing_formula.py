@@ -0,0 +1,232 @@
+"""
+Pricing Formula - Biên dịch công thức tính giá của sản phẩm
+Công thức (vd: "rate * weight_gram + labor_cost") được parse một lần thành AST
+đã kiểm tra an toàn, compile thành hàm và cache theo nội dung công thức.
+Hàm nhận scalar hoặc mảng NumPy nên dùng được trực tiếp trên bảng giá dạng cột.
+"""
+import ast
+import threading
+from typing import Dict
+
+import numpy as np
+
+# Biến được phép dùng trong công thức (tương ứng các field của ProductWeights + tỷ giá)
+FORMULA_VARIABLES = ('rate', 'weight_gram', 'stone_weight', 'labor_cost', 'markup_percent')
+
+# Hàm được phép gọi -> hàm NumPy tương ứng (chạy theo từng phần tử)
+FORMULA_FUNCTIONS = {
+    'min': np.minimum,
+    'max': np.maximum,
+    'abs': np.abs,
+    'round': np.round,
+    'floor': np.floor,
+    'ceil': np.ceil,
+}
+
+_ALLOWED_BINOPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_ALLOWED_UNARYOPS = (ast.UAdd, ast.USub)
+_ALLOWED_CMPOPS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+class FormulaError(ValueError):
+    """Công thức không hợp lệ hoặc chứa cú pháp không được phép"""
+
+
+class _FormulaTransformer(ast.NodeTransformer):
+    """Kiểm tra whitelist và chuyển công thức sang dạng vector hóa được
+
+    - `a if cond else b` -> where(cond, a, b)
+    - `and` / `or` / `not` -> logical_and / logical_or / logical_not
+    - so sánh chuỗi `a < b < c` -> logical_and(a < b, b < c)
+    """
+
+    def __init__(self, formula: str):
+        self.formula = formula
+        # Hằng số được đưa vào namespace dưới dạng np.float64 (tên _c0, _c1...) để mọi
+        # phép tính theo quy tắc NumPy (chia 0 -> inf thay vì ZeroDivisionError)
+        self.constants: Dict[str, np.float64] = {}
+
+    def _error(self, node, message: str):
+        raise FormulaError(f"{message} trong công thức '{self.formula}' (cột {getattr(node, 'col_offset', 0)})")
+
+    def _call(self, name: str, *args):
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+    def generic_visit(self, node):
+        self._error(node, f"Không hỗ trợ '{type(node).__name__}'")
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            self._error(node, f"Hằng số không hợp lệ {node.value!r}")
+        # Dùng float để tránh tính số nguyên cực lớn (vd: 9 ** 9 ** 9)
+        value = np.float64(node.value)
+        name = next((k for k, v in self.constants.items() if v == value), None)
+        if name is None:
+            name = f'_c{len(self.constants)}'
+            self.constants[name] = value
+        return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+
+    def visit_Name(self, node):
+        if node.id not in FORMULA_VARIABLES:
+            self._error(node, f"Biến không hợp lệ '{node.id}'")
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _ALLOWED_BINOPS):
+            self._error(node, f"Toán tử không hợp lệ '{type(node.op).__name__}'")
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if isinstance(node.op, ast.Not):
+            return self._call('_not', self.visit(node.operand))
+        if not isinstance(node.op, _ALLOWED_UNARYOPS):
+            self._error(node, f"Toán tử không hợp lệ '{type(node.op).__name__}'")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_BoolOp(self, node):
+        func = '_and' if isinstance(node.op, ast.And) else '_or'
+        values = [self.visit(v) for v in node.values]
+        result = values[0]
+        for value in values[1:]:
+            result = self._call(func, result, value)
+        return result
+
+    def visit_Compare(self, node):
+        left = self.visit(node.left)
+        parts = []
+        for op, comparator in zip(node.ops, node.comparators):
+            if not isinstance(op, _ALLOWED_CMPOPS):
+                self._error(node, f"Phép so sánh không hợp lệ '{type(op).__name__}'")
+            right = self.visit(comparator)
+            parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        result = parts[0]
+        for part in parts[1:]:
+            result = self._call('_and', result, part)
+        return result
+
+    def visit_IfExp(self, node):
+        return self._call('_where', self.visit(node.test), self.visit(node.body), self.visit(node.orelse))
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FORMULA_FUNCTIONS:
+            self._error(node, "Chỉ được gọi các hàm " + ", ".join(FORMULA_FUNCTIONS))
+        if node.keywords or not node.args:
+            self._error(node, f"Tham số không hợp lệ cho '{node.func.id}'")
+        if node.func.id == 'round':
+            return self._visit_round(node)
+        if node.func.id in ('abs', 'floor', 'ceil') and len(node.args) != 1:
+            self._error(node, f"'{node.func.id}' nhận đúng một tham số")
+        args = [self.visit(a) for a in node.args]
+        if node.func.id in ('min', 'max') and len(args) > 2:
+            # min(a, b, c) -> minimum(minimum(a, b), c)
+            result = args[0]
+            for arg in args[1:]:
+                result = self._call(node.func.id, result, arg)
+            return result
+        if node.func.id in ('min', 'max') and len(args) < 2:
+            self._error(node, f"'{node.func.id}' cần ít nhất hai tham số")
+        node.args = args
+        return node
+
+    def _visit_round(self, node):
+        """round(x) hoặc round(x, n): n phải là hằng số nguyên, giữ kiểu int cho np.round"""
+        if len(node.args) > 2:
+            self._error(node, "'round' nhận tối đa hai tham số")
+        args = [self.visit(node.args[0])]
+        if len(node.args) == 2:
+            decimals = node.args[1]
+            if (not isinstance(decimals, ast.Constant) or isinstance(decimals.value, bool)
+                    or not isinstance(decimals.value, int) or not -15 <= decimals.value <= 15):
+                self._error(node, "Số chữ số của 'round' phải là số nguyên từ -15 đến 15")
+            args.append(decimals)
+        node.args = args
+        return node
+
+
+# Namespace duy nhất mà công thức đã compile được nhìn thấy
+_FORMULA_GLOBALS = {
+    '__builtins__': {},
+    '_where': np.where,
+    '_and': np.logical_and,
+    '_or': np.logical_or,
+    '_not': np.logical_not,
+    **FORMULA_FUNCTIONS,
+}
+
+
+class CompiledFormula:
+    """Công thức đã compile, gọi với các biến dạng scalar hoặc mảng NumPy"""
+
+    __slots__ = ('text', 'variables', '_code', '_globals')
+
+    def __init__(self, text: str):
+        self.text = text
+        try:
+            tree = ast.parse(text.strip(), mode='eval')
+        except SyntaxError as e:
+            raise FormulaError(f"Công thức '{text}' sai cú pháp: {e.msg}")
+        transformer = _FormulaTransformer(text)
+        tree = ast.fix_missing_locations(transformer.visit(tree))
+        self.variables = frozenset(
+            n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and n.id in FORMULA_VARIABLES
+        )
+        self._code = compile(tree, f'<formula {text!r}>', 'eval')
+        self._globals = {**_FORMULA_GLOBALS, **transformer.constants}
+        self._check()
+
+    def _check(self):
+        """Chạy thử như khi reprice (rate scalar, các cột là mảng) để loại công thức lỗi kiểu dữ liệu"""
+        sample = {name: np.ones(2) for name in FORMULA_VARIABLES}
+        sample['rate'] = np.float64(1)
+        try:
+            with np.errstate(all='ignore'):
+                result = np.asarray(self(**sample), dtype=np.float64)
+            np.broadcast_to(result, (2,))
+        except Exception as e:
+            raise FormulaError(f"Công thức '{self.text}' không tính được: {e}")
+
+    def __call__(self, **variables):
+        namespace = {name: variables[name] for name in self.variables}
+        return eval(self._code, self._globals, namespace)
+
+    def __repr__(self):
+        return f"CompiledFormula({self.text!r})"
+
+
+_formula_cache: Dict[str, CompiledFormula] = {}
+_formula_lock = threading.Lock()
+
+
+def compile_formula(text: str) -> CompiledFormula:
+    """Lấy công thức đã compile từ cache (compile nếu chưa có)
+
+    Raises:
+        FormulaError: nếu công thức không hợp lệ
+    """
+    if not isinstance(text, str):
+        raise FormulaError(f"Công thức phải là chuỗi, nhận {type(text).__name__}")
+    formula = _formula_cache.get(text)
+    if formula is None:
+        try:
+            formula = CompiledFormula(text)
+        except FormulaError:
+            raise
+        except (TypeError, AttributeError, ValueError, RecursionError) as e:
+            # Lỗi ngoài dự kiến của parser/compiler cũng là công thức không hợp lệ
+            raise FormulaError(f"Công thức '{text}' không hợp lệ: {e}")
+        with _formula_lock:
+            formula = _formula_cache.setdefault(text, formula)
+    return formula
+
+
+def get_formula_cache_size() -> int:
+    """Số công thức khác nhau đang được cache"""
+    return len(_formula_cache)
@@ -1,125 +1,456 @@
 """
 Pricing Calculator - Tính giá sản phẩm từ rates + weights
+Giá của mỗi material được lưu dạng cột (NumPy) để một lần đổi tỷ giá
+tính lại toàn bộ SKU bằng một phép toán vector, snapshot chỉ tạo khi được đọc.
+Giá cơ bản tính theo ProductWeights.formula (xem pricing_formula)
 """
+import functools
 import json
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
 from ..models.pricing import Rate, ProductWeights, PricingSnapshot, MaterialType
+from .pricing_formula import CompiledFormula, FormulaError, compile_formula
+
+# Thời gian sống mặc định của snapshot (giây)
+SNAPSHOT_TTL_SEC = 300
+
+
+def _synchronized(method):
+    """Chạy method dưới lock của calculator (Kafka thread ghi, thread khác đọc)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class MaterialPriceBook:
+    """Bảng giá dạng cột cho các SKU cùng một material"""
+
+    def __init__(self, material: str, capacity: int = 1024):
+        self.material = material
+        self.skus: List[str] = []
+        self.index: Dict[str, int] = {}  # sku -> row
+        self.size = 0
+        # Công thức dùng trong book, mỗi row trỏ tới một công thức qua cột formula_id
+        self.formulas: List[CompiledFormula] = []
+        self._formula_ids: Dict[str, int] = {}  # formula text -> formula_id
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        """Cấp phát (hoặc mở rộng) các mảng dữ liệu"""
+        old_size = self.size
+        columns = {
+            'weight_gram': np.float64,
+            'stone_weight': np.float64,
+            'labor_cost': np.float64,
+            'markup_percent': np.float64,
+            'base_price': np.float64,
+            'final_price': np.float64,
+            'rate_used': np.float64,
+            'as_of': np.float64,  # epoch seconds
+            'snapshot_version': np.int64,
+            'formula_id': np.int32,
+            'priced': np.bool_,
+        }
+        for name, dtype in columns.items():
+            new_array = np.zeros(capacity, dtype=dtype)
+            if old_size:
+                new_array[:old_size] = getattr(self, name)[:old_size]
+            setattr(self, name, new_array)
+        self.capacity = capacity
+
+    def _formula_id(self, formula: CompiledFormula) -> int:
+        formula_id = self._formula_ids.get(formula.text)
+        if formula_id is None:
+            formula_id = self._formula_ids[formula.text] = len(self.formulas)
+            self.formulas.append(formula)
+        return formula_id
+
+    def upsert(self, weights: ProductWeights, formula: CompiledFormula) -> int:
+        """Thêm hoặc cập nhật trọng số của một SKU, trả về row index"""
+        row = self.index.get(weights.sku)
+        if row is None:
+            if self.size == self.capacity:
+                self._allocate(self.capacity * 2)
+            row = self.size
+            self.size += 1
+            self.index[weights.sku] = row
+            self.skus.append(weights.sku)
+
+        self.weight_gram[row] = weights.weight_gram
+        self.stone_weight[row] = weights.stone_weight or 0
+        self.labor_cost[row] = weights.labor_cost
+        self.markup_percent[row] = weights.markup_percent
+        self.formula_id[row] = self._formula_id(formula)
+        self.priced[row] = False
+        return row
+
+    def remove(self, sku: str):
+        """Gỡ một SKU (đổi chỗ với row cuối để giữ mảng liên tục)"""
+        row = self.index.pop(sku, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            last_sku = self.skus[last]
+            for name in ('weight_gram', 'stone_weight', 'labor_cost', 'markup_percent', 'base_price',
+                         'final_price', 'rate_used', 'as_of', 'snapshot_version', 'formula_id', 'priced'):
+                column = getattr(self, name)
+                column[row] = column[last]
+            self.skus[row] = last_sku
+            self.index[last_sku] = row
+        self.skus.pop()
+        self.size = last
+
+    def reprice(self, rate: float, version: int, as_of: float, rows=None):
+        """Tính lại base/final price cho toàn bộ (hoặc một phần) SKU bằng phép toán vector"""
+        if rows is None:
+            rows = slice(0, self.size)
+
+        if len(self.formulas) == 1:
+            self.base_price[rows] = self._evaluate(self.formulas[0], rate, rows)
+        else:
+            # Mỗi nhóm SKU cùng công thức được tính bằng một lần gọi vector
+            formula_ids = self.formula_id[rows]
+            row_ids = np.arange(self.size)[rows]
+            for formula_id in np.unique(formula_ids):
+                group = row_ids[formula_ids == formula_id]
+                self.base_price[group] = self._evaluate(self.formulas[formula_id], rate, group)
+
+        base = self.base_price[rows]
+        self.final_price[rows] = base * (1 + self.markup_percent[rows] / 100)
+        self.rate_used[rows] = rate
+        self.as_of[rows] = as_of
+        self.snapshot_version[rows] = version
+        self.priced[rows] = True
+
+    def _evaluate(self, formula: CompiledFormula, rate: float, rows) -> np.ndarray:
+        """Tính giá cơ bản theo công thức, giá lỗi (chia 0, NaN...) hoặc âm được đưa về 0
+
+        Công thức lỗi khi tính chỉ làm giá của nhóm row dùng công thức đó bằng 0.
+        """
+        shape = self.weight_gram[rows].shape
+        try:
+            with np.errstate(all='ignore'):
+                base = formula(
+                    rate=np.float64(rate),  # tính theo quy tắc NumPy, không raise khi chia 0 / tràn số
+                    weight_gram=self.weight_gram[rows],
+                    stone_weight=self.stone_weight[rows],
+                    labor_cost=self.labor_cost[rows],
+                    markup_percent=self.markup_percent[rows],
+                )
+                base = np.broadcast_to(np.asarray(base, dtype=np.float64), shape)
+                return np.where(np.isfinite(base), np.maximum(base, 0), 0)
+        except Exception as e:
+            print(f"Error evaluating formula {formula.text!r} for {self.material}: {e}")
+            return np.zeros(shape)
+
 
 class PricingCalculator:
     """Calculator để tính giá sản phẩm"""
-    
+
     def __init__(self):
         self.rates: Dict[str, Rate] = {}  # material -> Rate
         self.weights: Dict[str, ProductWeights] = {}  # sku -> ProductWeights
-        self.pricing_cache: Dict[str, PricingSnapshot] = {}  # sku -> PricingSnapshot
-        
+        self.books: Dict[str, MaterialPriceBook] = {}  # material -> bảng giá dạng cột
+        # Snapshot đã materialize hoặc nhận từ aggregator khác (sku -> PricingSnapshot)
+        self.pricing_cache: Dict[str, PricingSnapshot] = {}
+        self.last_affected_skus: Set[str] = set()  # SKUs được tính lại ở lần update_rate gần nhất
+        self._last_version = 0
+        # Material đã ghi rate/trọng số mới nhưng chưa reprice xong (xem apply_updates)
+        self._pending_reprice: Set[str] = set()
+        # Kafka consumer thread ghi state, request handler / executor đọc snapshot
+        self.lock = threading.RLock()
+
+    def _next_version(self) -> int:
+        """Snapshot version tăng dần (millisecond timestamp, không trùng)"""
+        self._last_version = max(int(time.time() * 1000), self._last_version + 1)
+        return self._last_version
+
+    def _get_book(self, material: str) -> MaterialPriceBook:
+        book = self.books.get(material)
+        if book is None:
+            book = self.books[material] = MaterialPriceBook(material)
+        return book
+
+    @_synchronized
     def update_rate(self, rate: Rate) -> bool:
         """Update tỷ giá và tính lại giá các sản phẩm liên quan"""
         material = rate.material.value
-        
+
         # Kiểm tra version để tránh out-of-order
         if material in self.rates:
             if rate.rate_version <= self.rates[material].rate_version:
                 print(f"Ignore old rate version {rate.rate_version} for {material}")
                 return False
-                
+
         self.rates[material] = rate
-        
-        # Tính lại giá cho tất cả sản phẩm dùng material này
-        affected_skus = [
-            sku for sku, weights in self.weights.items() 
-            if weights.material.value == material
-        ]
-        
-        for sku in affected_skus:
-            self._recalculate_pricing(sku)
-            
-        print(f"Updated rate for {material}: {rate.rate:,.0f} VND/gram, affected {len(affected_skus)} products")
+
+        # Tính lại toàn bộ SKU của material trong một phép toán vector
+        book = self.books.get(material)
+        if book is not None and book.size:
+            book.reprice(rate.rate, self._next_version(), time.time())
+        self.last_affected_skus = self.get_skus_for_material(material)
+
+        print(f"Updated rate for {material}: {rate.rate:,.0f} VND/gram, affected {len(self.last_affected_skus)} products")
         return True
-        
+
+    @_synchronized
     def update_weights(self, weights: ProductWeights) -> bool:
         """Update trọng số sản phẩm và tính lại giá"""
         sku = weights.sku
-        
+
         # Kiểm tra version để tránh out-of-order
         if sku in self.weights:
             if weights.weights_version <= self.weights[sku].weights_version:
                 print(f"Ignore old weights version {weights.weights_version} for {sku}")
                 return False
-                
-        self.weights[sku] = weights
-        
+
+        if not self._apply_weights(weights):
+            return False
+
         # Tính lại giá cho sản phẩm này
         self._recalculate_pricing(sku)
-        
+
         print(f"Updated weights for {sku}: {weights.weight_gram}g {weights.material.value}")
         return True
-        
+
+    def _prepare_weights(self, weights: ProductWeights) -> Optional[CompiledFormula]:
+        """Kiểm tra trọng số (version, công thức) mà chưa ghi gì, None nếu bị bỏ qua"""
+        current = self.weights.get(weights.sku)
+        if current is not None and weights.weights_version <= current.weights_version:
+            return None
+        try:
+            return compile_formula(weights.formula)
+        except FormulaError as e:
+            print(f"Reject weights for {weights.sku}: {e}")
+            return None
+
+    def _store_weights(self, weights: ProductWeights, formula: CompiledFormula):
+        """Ghi trọng số đã kiểm tra vào bảng giá (chưa tính giá)"""
+        sku = weights.sku
+        current = self.weights.get(sku)
+        # SKU đổi material: gỡ khỏi bảng giá của material cũ
+        if current is not None and current.material != weights.material:
+            self.books[current.material.value].remove(sku)
+
+        self.weights[sku] = weights
+        self._get_book(weights.material.value).upsert(weights, formula)
+
+    def _apply_weights(self, weights: ProductWeights) -> bool:
+        """Ghi trọng số vào bảng giá (chưa tính giá), False nếu version cũ hoặc công thức lỗi"""
+        formula = self._prepare_weights(weights)
+        if formula is None:
+            return False
+        self._store_weights(weights, formula)
+        return True
+
+    def apply_updates(self, rates: List[Rate], weights: List[ProductWeights]) -> Set[str]:
+        """Áp dụng một loạt update rồi tính lại giá một lần, trả về các SKU có giá mới"""
+        affected: Set[str] = set()
+        for skus in self.apply_updates_by_material(rates, weights).values():
+            affected.update(skus)
+        return affected
+
+    @_synchronized
+    def apply_updates_by_material(self, rates: List[Rate], weights: List[ProductWeights]) -> Dict[str, List[str]]:
+        """Như apply_updates nhưng trả về material -> các SKU có giá mới
+
+        Material đổi tỷ giá được reprice toàn bộ, material chỉ đổi trọng số thì
+        chỉ reprice các row vừa cập nhật. Mọi kiểm tra có thể lỗi chạy trước khi
+        ghi state; material đã ghi nhưng chưa reprice xong (lỗi giữa chừng) được
+        giữ trong _pending_reprice và reprice toàn bộ ở lần gọi sau.
+        """
+        new_rates: Dict[str, Rate] = {}
+        for rate in rates:
+            material = rate.material.value
+            current = new_rates.get(material) or self.rates.get(material)
+            if current is not None and rate.rate_version <= current.rate_version:
+                continue
+            new_rates[material] = rate
+
+        new_weights: Dict[str, Tuple[ProductWeights, CompiledFormula]] = {}
+        for item in weights:
+            staged = new_weights.get(item.sku)
+            if staged is not None and item.weights_version <= staged[0].weights_version:
+                continue
+            formula = self._prepare_weights(item)
+            if formula is not None:
+                new_weights[item.sku] = (item, formula)
+
+        changed_skus: Dict[str, Set[str]] = {}  # material -> SKUs đổi trọng số
+        for item, _ in new_weights.values():
+            changed_skus.setdefault(item.material.value, set()).add(item.sku)
+        # Material còn sót từ lần lỗi trước phải reprice toàn bộ
+        full_reprice = set(self._pending_reprice) | set(new_rates)
+        self._pending_reprice.update(new_rates)
+        self._pending_reprice.update(changed_skus)
+
+        self.rates.update(new_rates)
+        for item, formula in new_weights.values():
+            self._store_weights(item, formula)
+
+        affected: Dict[str, List[str]] = {}
+        now = time.time()
+        for material in list(self._pending_reprice):
+            book = self.books.get(material)
+            rate = self.rates.get(material)
+            if book is not None and rate is not None and book.size:
+                if material not in full_reprice:
+                    skus = changed_skus[material]
+                    rows = np.fromiter((book.index[sku] for sku in skus), dtype=np.int64, count=len(skus))
+                    book.reprice(rate.rate, self._next_version(), now, rows=rows)
+                    affected[material] = list(skus)
+                else:
+                    book.reprice(rate.rate, self._next_version(), now)
+                    affected[material] = book.skus[:book.size]
+            self._pending_reprice.discard(material)
+        return affected
+
+    @_synchronized
+    def load_state(self, rates: List[Rate], weights: List[ProductWeights]) -> int:
+        """Nạp state hàng loạt (warm start): không tính giá từng SKU, mỗi material reprice một lần
+
+        Vẫn kiểm tra version như update_rate/update_weights, trả về số SKU đã nạp.
+        """
+        for rate in rates:
+            material = rate.material.value
+            if material not in self.rates or rate.rate_version > self.rates[material].rate_version:
+                self.rates[material] = rate
+
+        loaded = sum(1 for item in weights if self._apply_weights(item))
+
+        now = time.time()
+        for material, book in self.books.items():
+            if material in self.rates and book.size:
+                book.reprice(self.rates[material].rate, self._next_version(), now)
+
+        print(f"Loaded pricing state: {len(self.rates)} rates, {loaded} products")
+        return loaded
+
+    @_synchronized
+    def export_state(self) -> dict:
+        """Xuất rates và weights dạng tuple thuần (dùng cho checkpoint)"""
+        return {
+            'rates': [
+                (r.material.value, r.rate, r.currency, r.rate_version, r.timestamp)
+                for r in self.rates.values()
+            ],
+            'weights': [
+                (w.sku, w.material.value, w.weight_gram, w.stone_weight, w.labor_cost,
+                 w.markup_percent, w.formula, w.weights_version, w.timestamp)
+                for w in self.weights.values()
+            ],
+        }
+
+    def get_skus_for_material(self, material: str) -> Set[str]:
+        """Lấy các SKU đang dùng material"""
+        book = self.books.get(material)
+        return set(book.index) if book else set()
+
     def _recalculate_pricing(self, sku: str) -> Optional[PricingSnapshot]:
         """Tính lại giá cho một sản phẩm"""
         if sku not in self.weights:
             return None
-            
+
         weights = self.weights[sku]
         material = weights.material.value
-        
+
         if material not in self.rates:
             print(f"No rate available for material {material}, cannot price {sku}")
             return None
-            
-        rate = self.rates[material]
-        
-        # Tính giá theo công thức
-        base_price = self._calculate_base_price(rate, weights)
-        final_price = base_price * (1 + weights.markup_percent / 100)
-        
-        # Tạo snapshot mới
-        snapshot = PricingSnapshot(
+
+        book = self.books[material]
+        row = book.index[sku]
+        book.reprice(self.rates[material].rate, self._next_version(), time.time(), rows=slice(row, row + 1))
+
+        return self.get_pricing(sku)
+
+    def _materialize_snapshot(self, sku: str, book: MaterialPriceBook, row: int) -> PricingSnapshot:
+        """Tạo PricingSnapshot từ một row của bảng giá"""
+        weights = self.weights[sku]
+        return PricingSnapshot(
             sku=sku,
-            base_price=base_price,
-            final_price=final_price,
-            rate_used=rate.rate,
+            base_price=float(book.base_price[row]),
+            final_price=float(book.final_price[row]),
+            rate_used=float(book.rate_used[row]),
             weight_gram=weights.weight_gram,
             stone_weight=weights.stone_weight,
             labor_cost=weights.labor_cost,
             markup_percent=weights.markup_percent,
             material=weights.material,
-            snapshot_version=int(time.time() * 1000),  # millisecond timestamp as version
-            ttl_sec=300,  # 5 minutes TTL
-            as_of=datetime.utcnow()
+            snapshot_version=int(book.snapshot_version[row]),
+            ttl_sec=SNAPSHOT_TTL_SEC,
+            as_of=datetime.utcfromtimestamp(float(book.as_of[row]))
         )
-        
-        self.pricing_cache[sku] = snapshot
-        print(f"Calculated pricing for {sku}: {final_price:,.0f} VND")
-        
-        return snapshot
-        
-    def _calculate_base_price(self, rate: Rate, weights: ProductWeights) -> float:
-        """Tính giá cơ bản theo công thức"""
-        try:
-            # Đơn giản hóa: rate * weight_gram + labor_cost
-            # Có thể mở rộng để support công thức phức tạp hơn
-            base_price = rate.rate * weights.weight_gram + weights.labor_cost
-            return max(0, base_price)  # Đảm bảo không âm
-        except Exception as e:
-            print(f"Error calculating price for {weights.sku}: {e}")
-            return 0
-            
+
+    @_synchronized
     def get_pricing(self, sku: str) -> Optional[PricingSnapshot]:
-        """Lấy giá hiện tại của sản phẩm"""
-        return self.pricing_cache.get(sku)
-        
+        """Lấy giá hiện tại của sản phẩm (materialize snapshot nếu bảng giá mới hơn)"""
+        snapshot = self.pricing_cache.get(sku)
+
+        weights = self.weights.get(sku)
+        if weights is None:
+            return snapshot
+        book = self.books.get(weights.material.value)
+        row = book.index.get(sku) if book else None
+        if row is None or not book.priced[row]:
+            return snapshot
+
+        if snapshot is None or snapshot.snapshot_version < book.snapshot_version[row]:
+            snapshot = self._materialize_snapshot(sku, book, row)
+            self.pricing_cache[sku] = snapshot
+        return snapshot
+
+    @_synchronized
     def get_all_pricing(self) -> Dict[str, PricingSnapshot]:
         """Lấy tất cả giá hiện tại"""
-        return self.pricing_cache.copy()
-        
+        skus = set(self.pricing_cache)
+        for book in self.books.values():
+            skus.update(book.skus[row] for row in np.flatnonzero(book.priced[:book.size]))
+
+        return self.get_pricing_many(skus)
+
+    @_synchronized
+    def get_pricing_many(self, skus: Iterable[str]) -> Dict[str, PricingSnapshot]:
+        """Lấy giá hiện tại của nhiều SKU trong một lần lock (bỏ SKU chưa có giá)"""
+        pricing = {}
+        for sku in skus:
+            snapshot = self.get_pricing(sku)
+            if snapshot:
+                pricing[sku] = snapshot
+        return pricing
+
     def is_pricing_valid(self, sku: str) -> bool:
         """Kiểm tra giá có còn valid không"""
         snapshot = self.get_pricing(sku)
         return snapshot is not None and not snapshot.is_expired
-        
+
+    def _count_pricing(self) -> Tuple[int, int]:
+        """Đếm số SKU có giá và số giá còn hạn, không cần materialize snapshot"""
+        now = time.time()
+        priced_count = 0
+        valid_count = 0
+        for book in self.books.values():
+            priced = book.priced[:book.size]
+            priced_count += int(priced.sum())
+            valid_count += int((priced & (now - book.as_of[:book.size] <= SNAPSHOT_TTL_SEC)).sum())
+
+        # Snapshot nhận từ aggregator khác cho SKU không có trọng số
+        for sku, snapshot in self.pricing_cache.items():
+            if sku not in self.weights:
+                priced_count += 1
+                if not snapshot.is_expired:
+                    valid_count += 1
+        return priced_count, valid_count
+
+    @_synchronized
     def get_stats(self) -> dict:
         """Thống kê hệ thống"""
         try:
@@ -129,12 +460,13 @@ class PricingCalculator:
                 if timestamps:
                     # Chỉ lấy timestamp mới nhất mà không so sánh với datetime.min
                     last_update = max(timestamps).isoformat()
-            
+
+            priced_count, valid_count = self._count_pricing()
             return {
                 "rates_count": len(self.rates),
                 "weights_count": len(self.weights),
-                "pricing_cache_count": len(self.pricing_cache),
-                "valid_pricing_count": sum(1 for sku in self.pricing_cache if self.is_pricing_valid(sku)),
+                "pricing_cache_count": priced_count,
+                "valid_pricing_count": valid_count,
                 "materials": list(self.rates.keys()),
                 "last_update": last_update
             }
@@ -148,7 +480,7 @@ class PricingCalculator:
                 "last_update": None,
                 "error": str(e)
             }
-    
+
     def get_current_rates(self) -> dict:
         """Lấy tỷ giá hiện tại"""
         current_rates = {}
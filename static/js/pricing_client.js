@@ -8,6 +8,10 @@ class PricingClient {
             reconnectInterval: 5000, // 5 seconds
             maxReconnectAttempts: 10,
             cacheExpiryMs: 300000, // 5 minutes
+            // Bộ lọc subscription (để trống = nhận tất cả SKU)
+            skus: [],
+            prefixes: [],
+            materials: [],
             ...options
         };
         
@@ -16,6 +20,7 @@ class PricingClient {
         this.eventSource = null;
         this.reconnectAttempts = 0;
         this.isConnected = false;
+        this.lastEventId = null; // Id event cuối đã nhận, gửi lại khi reconnect để chỉ nhận phần đã lỡ
         
         // Event callbacks
         this.onPricingUpdate = null;
@@ -36,7 +41,7 @@ class PricingClient {
         
         console.log('Connecting to pricing stream...');
         
-        this.eventSource = new EventSource(`${this.baseUrl}/events/pricing`);
+        this.eventSource = new EventSource(this.buildStreamUrl());
         
         this.eventSource.onopen = () => {
             console.log('Connected to pricing stream');
@@ -51,6 +56,7 @@ class PricingClient {
         this.eventSource.addEventListener('initial', (event) => {
             try {
                 const data = JSON.parse(event.data);
+                this.trackEventId(event);
                 console.log('Received initial pricing data:', Object.keys(data.pricing).length, 'products');
                 
                 // Load initial data vào cache
@@ -69,6 +75,7 @@ class PricingClient {
         this.eventSource.addEventListener('pricing_update', (event) => {
             try {
                 const data = JSON.parse(event.data);
+                this.trackEventId(event);
                 console.log('Pricing update for:', data.sku);
                 
                 this.updatePricingCache(data.sku, data.pricing);
@@ -103,6 +110,33 @@ class PricingClient {
         };
     }
     
+    /**
+     * Tạo URL stream kèm bộ lọc SKU / tiền tố / material
+     */
+    buildStreamUrl() {
+        const params = new URLSearchParams();
+        for (const name of ['skus', 'prefixes', 'materials']) {
+            const values = this.options[name] || [];
+            if (values.length > 0) {
+                params.set(name, values.join(','));
+            }
+        }
+        if (this.lastEventId) {
+            params.set('last_event_id', this.lastEventId);
+        }
+        const query = params.toString();
+        return `${this.baseUrl}/events/pricing${query ? '?' + query : ''}`;
+    }
+    
+    /**
+     * Ghi nhận id event cuối cùng đã nhận
+     */
+    trackEventId(event) {
+        if (event.lastEventId) {
+            this.lastEventId = event.lastEventId;
+        }
+    }
+    
     /**
      * Ngắt kết nối SSE
      */
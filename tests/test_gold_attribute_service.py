@@ -0,0 +1,70 @@
+"""
+Test xóa giá trị gold attribute khi cache metadata đã cũ (Odoo client giả)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.gold_attribute_service import GoldAttributeMetadataCache, OdooGoldAttributeService
+
+
+class FakeOdoo:
+    """Odoo giả chỉ có những gì service dùng để xóa attribute line"""
+
+    def __init__(self):
+        self.gold_attrs = [{'id': 1, 'name': 'purity', 'display_name': 'Purity', 'short_name': '',
+                            'field_type': 'char', 'unit': '', 'category': ''}]
+        self.product_attrs = {}  # name -> id
+        self.lines = {}  # line id -> (product_tmpl_id, attribute_id)
+        self.unlinked = []
+
+    def search_read(self, model, domain, fields):
+        if model == 'gold.attribute.line':
+            return list(self.gold_attrs)
+        names = domain[0][2]
+        return [{'id': attr_id, 'name': name} for name, attr_id in self.product_attrs.items() if name in names]
+
+    def read(self, model, ids, fields):
+        return [attr for attr in self.gold_attrs if attr['id'] in ids]
+
+    def search(self, model, domain):
+        if model == 'product.attribute':
+            attr_id = self.product_attrs.get(domain[0][2])
+            return [attr_id] if attr_id else []
+        tmpl_id, attr_id = domain[0][2], domain[1][2]
+        return [line_id for line_id, line in self.lines.items() if line == (tmpl_id, attr_id)]
+
+    def unlink(self, model, ids):
+        self.unlinked.extend(ids)
+        return True
+
+
+def _service(odoo):
+    service = OdooGoldAttributeService()
+    service.odoo = odoo
+    service._gold_attr_cache = GoldAttributeMetadataCache(ttl_sec=300)
+    return service
+
+
+def test_delete_rechecks_odoo_when_cached_mapping_is_stale():
+    odoo = FakeOdoo()
+    service = _service(odoo)
+    service.get_product_attribute_ids()  # Cache nạp khi chưa có product.attribute nào
+
+    # Process khác tạo product.attribute và gán cho sản phẩm sau khi cache đã nạp
+    odoo.product_attrs['gold_purity'] = 7
+    odoo.lines[100] = (42, 7)
+
+    assert service.delete_product_gold_attribute_value(42, 1)
+    assert odoo.unlinked == [100]
+    # Cache cũ đã bị bỏ, lần đọc sau thấy mapping mới
+    assert service.get_product_attribute_ids() == {1: 7}
+
+
+def test_delete_without_product_attribute_is_noop():
+    odoo = FakeOdoo()
+    service = _service(odoo)
+    assert service.delete_product_gold_attribute_value(42, 1)
+    assert odoo.unlinked == []
+    assert not service.delete_product_gold_attribute_value(42, 999)
@@ -0,0 +1,137 @@
+"""
+Test KafkaPricingConsumer với consumer giả: commit sau khi xử lý, batch lỗi, dead-letter
+"""
+import json
+import os
+import sys
+from collections import namedtuple
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kafka import TopicPartition
+
+from src.services import kafka_service
+from src.services.kafka_service import KafkaPricingConsumer
+
+Message = namedtuple('Message', 'topic partition offset key value headers')
+
+
+def _rate_message(offset, rate, version):
+    value = {'rate': rate, 'rate_version': version, 'timestamp': '2026-01-01T00:00:00Z'}
+    return Message('rates', 0, offset, 'gold', json.dumps(value).encode(), [])
+
+
+def _weights_message(offset, sku, version=1, **extra):
+    value = {'material': 'gold', 'weight_gram': 2, 'labor_cost': 0, 'weights_version': version, **extra}
+    return Message('weights', 0, offset, sku, json.dumps(value).encode(), [])
+
+
+class FakeKafkaConsumer:
+    """Trả về các batch đã chuẩn bị, dừng pricing consumer khi hết"""
+
+    def __init__(self, owner, batches):
+        self.owner = owner
+        self.batches = list(batches)
+        self.commits = []
+        self.seeks = []
+
+    def subscribe(self, topics, listener=None):
+        pass
+
+    def poll(self, timeout_ms=0):
+        if not self.batches:
+            self.owner.running = False
+            return {}
+        batch = self.batches.pop(0)
+        return {TopicPartition(batch[0].topic, batch[0].partition): batch}
+
+    def assignment(self):
+        return {TopicPartition(t, 0) for t in kafka_service.PRICING_TOPICS}
+
+    def commit(self, offsets):
+        self.commits.append({(tp.topic, tp.partition): meta.offset for tp, meta in offsets.items()})
+
+    def commit_async(self, offsets, callback=None):
+        self.commit(offsets)
+        if callback:
+            callback(offsets, None)
+
+    def seek(self, tp, offset):
+        self.seeks.append((tp.topic, tp.partition, offset))
+
+    def close(self):
+        pass
+
+
+def _run(batches, monkeypatch, **kwargs):
+    consumer = KafkaPricingConsumer(commit_every_messages=1, **kwargs)
+    fake = FakeKafkaConsumer(consumer, batches)
+    monkeypatch.setattr(kafka_service, 'KafkaConsumer', lambda **_: fake)
+    monkeypatch.setattr(kafka_service.time, 'sleep', lambda _: None)
+    consumer.running = True
+    consumer._consume_loop()
+    return consumer, fake
+
+
+def test_commits_offsets_after_batch_is_applied(monkeypatch):
+    consumer, fake = _run([[_rate_message(0, 100, 1), _weights_message(1, 'A')]], monkeypatch)
+    assert consumer.calculator.get_pricing('A').base_price == 200
+    assert fake.commits[0] == {('rates', 0): 1, ('weights', 0): 2}
+    assert consumer.get_commit_stats()['commit_lag'] == 0
+
+
+def test_failed_batch_is_not_committed(monkeypatch):
+    consumer = KafkaPricingConsumer(commit_every_messages=1)
+    fake = FakeKafkaConsumer(consumer, [])
+    consumer.consumer = fake
+    monkeypatch.setattr(consumer.calculator, 'apply_updates_by_material',
+                        lambda *a: (_ for _ in ()).throw(RuntimeError('x')))
+    with pytest.raises(RuntimeError):
+        consumer._process_batch([_rate_message(0, 100, 1)])
+    consumer._commit_offsets()
+    assert fake.commits == []
+    assert consumer.offsets == {}
+
+
+def test_poison_message_is_dead_lettered_and_committed_past(monkeypatch):
+    original = kafka_service.PricingCalculator.apply_updates_by_material
+
+    def apply_updates(self, rates, weights):
+        if any(item.sku == 'POISON' for item in weights):
+            raise AttributeError("'int' object has no attribute 'strip'")
+        return original(self, rates, weights)
+
+    monkeypatch.setattr(kafka_service.PricingCalculator, 'apply_updates_by_material', apply_updates)
+    batch = [_rate_message(0, 100, 1), _weights_message(1, 'POISON'), _weights_message(2, 'A')]
+    consumer, fake = _run([batch, [_rate_message(3, 300, 2)]], monkeypatch, max_message_retries=2)
+
+    # Message hỏng bị bỏ qua, các message khác (kể cả sau nó) vẫn được áp dụng
+    assert consumer.calculator.get_pricing('A').base_price == 600
+    assert consumer.get_commit_stats()['dead_lettered'] == 1
+    assert consumer.dead_letters[0][:4] == ('weights', 0, 1, 'POISON')
+    assert consumer.committed_offsets == {('rates', 0): 4, ('weights', 0): 3}
+    assert fake.seeks == []
+
+
+def test_invalid_formula_type_is_skipped_without_retry(monkeypatch):
+    batch = [_rate_message(0, 100, 1), _weights_message(1, 'BAD', formula=123), _weights_message(2, 'A')]
+    consumer, fake = _run([batch], monkeypatch)
+    assert consumer.calculator.get_pricing('A').base_price == 200
+    assert consumer.calculator.get_pricing('BAD') is None
+    assert consumer.get_commit_stats()['dead_lettered'] == 0
+    assert consumer.committed_offsets == {('rates', 0): 1, ('weights', 0): 3}
+
+
+def test_pricing_changed_callback_receives_sku_ids_without_materializing(monkeypatch):
+    received = []
+
+    def get_pricing(self, sku):
+        raise AssertionError('snapshot không được materialize trên Kafka thread')
+
+    monkeypatch.setattr(kafka_service.PricingCalculator, 'get_pricing', get_pricing)
+    consumer = KafkaPricingConsumer()
+    consumer.on_pricing_changed = received.extend
+    consumer._process_batch([_rate_message(0, 100, 1), _weights_message(1, 'A'), _weights_message(2, 'B')])
+    assert sorted(received) == [('A', 'gold', None), ('B', 'gold', None)]
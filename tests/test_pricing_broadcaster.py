@@ -0,0 +1,158 @@
+"""
+Test PricingBroadcaster: chỉ materialize snapshot cho SKU có subscriber quan tâm
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.pricing import MaterialType, PricingSnapshot
+from src.services.pricing_broadcaster import OVERFLOW_DROP_OLDEST, ConflatingBuffer, PricingBroadcaster
+
+
+def _snapshot(sku, price=100.0):
+    return PricingSnapshot(sku=sku, base_price=price, final_price=price, rate_used=price, weight_gram=1,
+                           material=MaterialType.GOLD, snapshot_version=1, as_of=datetime.utcnow())
+
+
+class RecordingProvider:
+    """pricing_provider giả, ghi lại các SKU được yêu cầu materialize"""
+
+    def __init__(self):
+        self.requested = []
+
+    def __call__(self, skus):
+        self.requested.extend(skus)
+        return {sku: _snapshot(sku) for sku in skus}
+
+
+def _changes(*skus):
+    return [(sku, 'gold', None) for sku in skus]
+
+
+async def _dispatch(broadcaster, updates):
+    """Ghi batch vào replay buffer rồi phát như dispatcher"""
+    await broadcaster._broadcast(updates, broadcaster._record(updates))
+
+
+def test_changes_without_subscribers_are_not_materialized():
+    provider = RecordingProvider()
+    broadcaster = PricingBroadcaster(pricing_provider=provider)
+    asyncio.run(_dispatch(broadcaster, _changes('A', 'B', 'C')))
+    assert provider.requested == []
+    assert broadcaster.get_stats()['replay_buffered'] == 3
+
+
+def test_only_routed_skus_are_materialized():
+    async def scenario():
+        provider = RecordingProvider()
+        broadcaster = PricingBroadcaster(pricing_provider=provider)
+        buffer = broadcaster.subscribe(skus=['B'])
+        await _dispatch(broadcaster, _changes('A', 'B', 'C'))
+        return provider, buffer
+
+    provider, buffer = asyncio.run(scenario())
+    assert provider.requested == ['B']
+    assert list(buffer.pending) == ['B']
+
+
+def test_routes_unfiltered_and_filtered_subscribers_once():
+    async def scenario():
+        broadcaster = PricingBroadcaster(pricing_provider=RecordingProvider())
+        everything = broadcaster.subscribe()
+        by_prefix = broadcaster.subscribe(prefixes=['RING-'], skus=['RING-1'])
+        by_material = broadcaster.subscribe(materials=['silver'])
+        await _dispatch(broadcaster, [('RING-1', 'gold', None), ('BAR-1', 'gold', None), ('BAR-2', 'silver', None)])
+        return everything, by_prefix, by_material
+
+    everything, by_prefix, by_material = asyncio.run(scenario())
+    assert list(everything.pending) == ['RING-1', 'BAR-1', 'BAR-2']
+    # Khớp cả SKU lẫn tiền tố nhưng chỉ nhận một frame
+    assert list(by_prefix.pending) == ['RING-1'] and by_prefix.conflated == 0
+    assert list(by_material.pending) == ['BAR-2']
+
+
+def _replay(broadcaster, last_event_id):
+    async def scenario():
+        buffer = broadcaster.subscribe()
+        await broadcaster._replay_since(buffer, last_event_id)
+        return buffer
+    return asyncio.run(scenario())
+
+
+def _frame_ids(buffer):
+    return [int(frame.split(b'\r\n')[0][len(b'id: '):]) for frame in buffer.pending.values()]
+
+
+def test_replay_starts_right_after_last_event_id():
+    broadcaster = PricingBroadcaster(pricing_provider=RecordingProvider())
+    first_id = broadcaster._record(_changes('A', 'B', 'C'))
+    broadcaster._record(_changes('D', 'A'))
+
+    buffer = _replay(broadcaster, first_id + 1)
+    # Bỏ A (id đầu), B (= Last-Event-ID); A ở batch sau là bản mới nhất
+    assert list(buffer.pending) == ['C', 'D', 'A']
+    assert _frame_ids(buffer) == [first_id + 2, first_id + 3, first_id + 4]
+    assert not buffer.resync_required
+
+    # Client đã nhận đủ: không replay gì
+    assert not _replay(broadcaster, broadcaster._event_seq).pending
+
+
+def test_replay_too_old_or_unknown_id_requires_resync():
+    broadcaster = PricingBroadcaster(pricing_provider=RecordingProvider(), replay_buffer_size=3)
+    first_id = broadcaster._record(_changes('A', 'B'))
+    broadcaster._record(_changes('C', 'D'))
+
+    # Batch đầu đã bị đẩy khỏi ring buffer
+    assert _replay(broadcaster, first_id).resync_required
+    # Id cuối của batch bị đẩy ra vẫn replay được phần còn lại
+    assert list(_replay(broadcaster, first_id + 1).pending) == ['C', 'D']
+    # Id từ tương lai (lần chạy trước)
+    assert _replay(broadcaster, broadcaster._event_seq + 10).resync_required
+
+
+def test_full_catalog_tick_larger_than_ring_is_kept():
+    broadcaster = PricingBroadcaster(pricing_provider=RecordingProvider(), replay_buffer_size=10)
+    broadcaster._record(_changes(*(f'S{i}' for i in range(5))))
+    first_id = broadcaster._record(_changes(*(f'S{i}' for i in range(50))))
+
+    assert broadcaster.get_stats()['replay_batches'] == 1
+    buffer = _replay(broadcaster, first_id - 1)
+    assert len(buffer.pending) == 50 and not buffer.resync_required
+
+
+def test_conflation_overwrites_pending_frame_in_place():
+    buffer = ConflatingBuffer()
+    buffer.put('A', b'a1')
+    buffer.put('B', b'b1')
+    buffer.put('A', b'a2')
+
+    assert buffer.conflated == 1
+    resync, frames = buffer.drain()
+    # A giữ vị trí cũ nhưng mang frame mới nhất
+    assert not resync and frames == [b'a2', b'b1']
+    assert buffer.drain() == (False, [])
+
+
+def test_full_buffer_drops_oldest_sku():
+    buffer = ConflatingBuffer(max_size=2, overflow_policy=OVERFLOW_DROP_OLDEST)
+    buffer.put('A', b'a1')
+    buffer.put('B', b'b1')
+    buffer.put('B', b'b2')  # SKU đã có trong buffer: không tính là tràn
+    buffer.put('C', b'c1')
+
+    assert buffer.dropped == 1 and buffer.conflated == 1
+    assert buffer.drain() == (False, [b'b2', b'c1'])
+
+
+def test_full_buffer_resync_policy_discards_deltas():
+    buffer = ConflatingBuffer(max_size=1)
+    buffer.put('A', b'a1')
+    buffer.put('B', b'b1')
+    buffer.put('C', b'c1')  # Đang chờ resync: delta bị bỏ qua
+
+    assert buffer.resyncs == 1 and buffer.dropped == 1
+    assert buffer.drain() == (True, [])
@@ -0,0 +1,63 @@
+"""
+Test PricingCalculator.apply_updates: batch lỗi giữa chừng không làm mất lần reprice
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.pricing import MaterialType, ProductWeights, Rate
+from src.services.pricing_service import PricingCalculator
+
+
+def _rate(rate, version):
+    return Rate(material=MaterialType.GOLD, rate=rate, rate_version=version, timestamp=datetime.utcnow())
+
+
+def _weights(sku, version=1, weight_gram=2.0):
+    return ProductWeights(sku=sku, material=MaterialType.GOLD, weight_gram=weight_gram,
+                          labor_cost=0, formula="rate * weight_gram", weights_version=version)
+
+
+def test_failed_batch_reprices_on_retry(monkeypatch):
+    calculator = PricingCalculator()
+    calculator.apply_updates([_rate(100, 1)], [_weights('A')])
+    assert calculator.get_pricing('A').base_price == 200
+
+    batch = ([_rate(200, 2)], [_weights('B')])
+    store = calculator._store_weights
+
+    def failing_store(weights, formula):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(calculator, '_store_weights', failing_store)
+    with pytest.raises(RuntimeError):
+        calculator.apply_updates(*batch)
+    monkeypatch.setattr(calculator, '_store_weights', store)
+
+    # Batch được xử lý lại: rate 2 đã bị bỏ qua vì version, nhưng book vẫn phải reprice
+    affected = calculator.apply_updates(*batch)
+    assert affected == {'A', 'B'}
+    assert calculator.get_pricing('A').base_price == 400
+    assert calculator.get_pricing('B').base_price == 400
+
+
+def test_invalid_weights_do_not_block_rates():
+    calculator = PricingCalculator()
+    calculator.apply_updates([_rate(100, 1)], [_weights('A')])
+    bad = ProductWeights(sku='BAD', material=MaterialType.GOLD, weight_gram=1, labor_cost=0,
+                         formula="price * 2", weights_version=1)
+    assert calculator.apply_updates([_rate(300, 2)], [bad]) == {'A'}
+    assert calculator.get_pricing('A').base_price == 600
+    assert calculator.get_pricing('BAD') is None
+
+
+def test_weights_only_batch_reprices_changed_rows():
+    calculator = PricingCalculator()
+    calculator.apply_updates([_rate(100, 1)], [_weights('A'), _weights('B')])
+    affected = calculator.apply_updates([], [_weights('B', version=2, weight_gram=3.0), _weights('B', version=1)])
+    assert affected == {'B'}
+    assert calculator.get_pricing('B').base_price == 300
@@ -0,0 +1,53 @@
+"""
+Test PricingCheckpoint: lưu rồi nạp lại state của calculator cùng Kafka offset
+"""
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.pricing import RateRecord, WeightsRecord
+from src.services.pricing_checkpoint import PricingCheckpoint
+from src.services.pricing_service import PricingCalculator
+
+
+def _calculator():
+    calculator = PricingCalculator()
+    rate = RateRecord.from_message('gold', {'rate': 100, 'rate_version': 3, 'timestamp': '2026-01-01T00:00:00Z'})
+    weights = [
+        WeightsRecord.from_message('A', {'material': 'gold', 'weight_gram': 2, 'labor_cost': 10,
+                                         'weights_version': 5}),
+        WeightsRecord.from_message('B', {'material': 'gold', 'weight_gram': 1, 'stone_weight': 0.5,
+                                         'markup_percent': 10, 'formula': 'rate * (weight_gram - stone_weight)',
+                                         'weights_version': 7}),
+    ]
+    calculator.apply_updates([rate], weights)
+    return calculator
+
+
+def test_save_and_restore_round_trip(tmp_path):
+    checkpoint = PricingCheckpoint(str(tmp_path / 'pricing.ckpt'))
+    original = _calculator()
+    offsets = {('rates', 0): 12, ('weights', 0): 40, ('weights', 1): 7}
+    assert checkpoint.save(original, offsets)
+    assert not os.path.exists(checkpoint.path + '.tmp')
+
+    restored = PricingCalculator()
+    assert checkpoint.restore(restored) == offsets
+    assert restored.export_state() == original.export_state()
+    for sku in ('A', 'B'):
+        before, after = original.get_pricing(sku), restored.get_pricing(sku)
+        assert (after.base_price, after.final_price) == (before.base_price, before.final_price)
+    assert restored.weights['B'].formula == 'rate * (weight_gram - stone_weight)'
+
+
+def test_missing_or_incompatible_checkpoint_is_ignored(tmp_path):
+    checkpoint = PricingCheckpoint(str(tmp_path / 'pricing.ckpt'))
+    assert checkpoint.restore(PricingCalculator()) is None
+
+    with open(checkpoint.path, 'wb') as f:
+        pickle.dump({'format_version': -1}, f)
+    calculator = PricingCalculator()
+    assert checkpoint.restore(calculator) is None
+    assert calculator.weights == {}
@@ -0,0 +1,120 @@
+"""
+Test công thức tính giá: whitelist của compiler và sandbox khi tính trên bảng giá
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.pricing import DEFAULT_PRICING_FORMULA, MaterialType, ProductWeights, Rate, WeightsRecord
+from src.services.pricing_formula import FormulaError, compile_formula
+from src.services.pricing_service import PricingCalculator
+
+
+def _rate(rate, version=1):
+    return Rate(material=MaterialType.GOLD, rate=rate, rate_version=version, timestamp=datetime.utcnow())
+
+
+def _weights(sku, formula, version=1, weight_gram=2.0):
+    return ProductWeights(sku=sku, material=MaterialType.GOLD, weight_gram=weight_gram,
+                          labor_cost=100, formula=formula, weights_version=version)
+
+
+# ================================
+# COMPILER
+# ================================
+
+@pytest.mark.parametrize('formula', [
+    "__import__('os').system('id')",
+    "rate.__class__",
+    "(lambda: 1)()",
+    "open('/etc/passwd')",
+    "price * 2",
+    "'abc' * rate",
+    "[rate][0]",
+    "rate if True else 0",
+    "round(rate, weight_gram)",
+    "round(rate, 2.5)",
+    "round(rate, 2, 3)",
+    "abs(rate, 1)",
+    "max(rate)",
+    "rate +",
+])
+def test_rejects_unsafe_or_invalid_formulas(formula):
+    with pytest.raises(FormulaError):
+        compile_formula(formula)
+
+
+def test_evaluates_vectorized_with_scalar_rate():
+    formula = compile_formula("max(rate * weight_gram, 10) + (labor_cost if weight_gram > 1 else 0)")
+    result = formula(rate=np.float64(5), weight_gram=np.array([1.0, 3.0]),
+                     stone_weight=np.zeros(2), labor_cost=np.array([7.0, 7.0]), markup_percent=np.zeros(2))
+    assert result.tolist() == [10.0, 22.0]
+
+
+def test_round_keeps_integer_decimals():
+    formula = compile_formula("round(rate * weight_gram / 3, 2)")
+    result = formula(rate=np.float64(1), weight_gram=np.array([1.0, 2.0]))
+    assert result.tolist() == [0.33, 0.67]
+
+
+def test_constant_arithmetic_follows_numpy_rules():
+    formula = compile_formula("weight_gram * (1 / 0) + 9 ** 9 ** 9")
+    with np.errstate(all='ignore'):
+        result = formula(weight_gram=np.array([1.0]))
+    assert np.isinf(result).all()
+
+
+# ================================
+# SANDBOX TRÊN BẢNG GIÁ
+# ================================
+
+@pytest.mark.parametrize('formula', [
+    "weight_gram * (rate / 0)",
+    "rate ** 200 + weight_gram",
+    "rate // 0",
+    "rate % 0",
+])
+def test_bad_formula_prices_zero_without_breaking_material(formula):
+    calculator = PricingCalculator()
+    calculator.update_rate(_rate(1e6))
+    assert calculator.update_weights(_weights('GOOD', "rate * weight_gram + labor_cost"))
+    assert calculator.update_weights(_weights('BAD', formula))
+
+    assert calculator.get_pricing('BAD').base_price == 0
+    assert calculator.get_pricing('GOOD').base_price == 2e6 + 100
+
+    # Các lần đổi tỷ giá sau vẫn tính được giá cho các SKU khác
+    assert calculator.update_rate(_rate(2e6, version=2))
+    assert calculator.get_pricing('GOOD').base_price == 4e6 + 100
+    assert calculator.get_pricing('BAD').base_price == 0
+
+
+def test_apply_updates_with_mixed_formulas():
+    calculator = PricingCalculator()
+    affected = calculator.apply_updates(
+        [_rate(100)],
+        [_weights('A', "rate * weight_gram"), _weights('B', "round(rate * weight_gram / 3, 1)"),
+         _weights('C', "rate / 0")],
+    )
+    assert affected == {'A', 'B', 'C'}
+    assert calculator.get_pricing('A').base_price == 200
+    assert calculator.get_pricing('B').base_price == 66.7
+    assert calculator.get_pricing('C').base_price == 0
+
+
+@pytest.mark.parametrize('formula', [123, ['rate'], None, "rate\x00"])
+def test_rejects_non_text_formulas(formula):
+    with pytest.raises(FormulaError):
+        compile_formula(formula)
+
+
+def test_weights_record_rejects_non_str_formula():
+    data = {'material': 'gold', 'weight_gram': 2, 'weights_version': 1}
+    assert WeightsRecord.from_message('A', data).formula == DEFAULT_PRICING_FORMULA
+    with pytest.raises(ValueError):
+        WeightsRecord.from_message('A', {**data, 'formula': 123})
@@ -0,0 +1,110 @@
+"""
+Test SingleFlight / AsyncSingleFlight: caller trùng key dùng chung một lời gọi,
+mỗi caller nhận bản sao riêng, lỗi được trả về cho mọi caller
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.single_flight import AsyncSingleFlight, SingleFlight, make_key
+
+CALLERS = 4
+
+
+def _run_threads(flight, func):
+    """Chạy CALLERS thread cùng key, leader chỉ trả về khi mọi caller đã chờ"""
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(flight.do('key', func))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results, errors
+
+
+def _blocking(flight, result=None, error=None):
+    calls = []
+
+    def func():
+        calls.append(1)
+        deadline = time.monotonic() + 5
+        while flight.shared < CALLERS - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        if error is not None:
+            raise error
+        return result
+
+    return func, calls
+
+
+def test_concurrent_callers_share_one_call_and_get_own_copy():
+    flight = SingleFlight()
+    func, calls = _blocking(flight, result=[{'id': 1, 'name': 'A'}])
+    results, errors = _run_threads(flight, func)
+
+    assert errors == [] and len(calls) == 1
+    assert flight.get_stats() == {'calls': 1, 'shared': CALLERS - 1, 'in_flight': 0}
+    assert all(result == [{'id': 1, 'name': 'A'}] for result in results)
+    assert len({id(result) for result in results}) == CALLERS
+    assert len({id(result[0]) for result in results}) == CALLERS
+
+
+def test_error_is_raised_for_every_caller():
+    flight = SingleFlight()
+    func, calls = _blocking(flight, error=RuntimeError('rpc failed'))
+    results, errors = _run_threads(flight, func)
+
+    assert results == [] and len(calls) == 1
+    assert len(errors) == CALLERS and all(str(e) == 'rpc failed' for e in errors)
+    # Lời gọi sau không dính kết quả lỗi cũ
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+
+def test_async_callers_share_one_call_and_get_own_copy():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def func():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'ids': [1, 2]}
+
+        results = await asyncio.gather(*(flight.do('key', func) for _ in range(CALLERS)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1 and flight.shared == CALLERS - 1
+    assert all(result == {'ids': [1, 2]} for result in results)
+    assert len({id(result['ids']) for result in results}) == CALLERS
+
+
+def test_async_error_is_raised_for_every_caller():
+    async def scenario():
+        flight = AsyncSingleFlight()
+
+        async def func():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('rpc failed')
+
+        return await asyncio.gather(*(flight.do('key', func) for _ in range(CALLERS)), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert len(errors) == CALLERS and all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_make_key_ignores_kwargs_order():
+    assert make_key('res.partner', 'read', [[1]], {'fields': ['name'], 'context': {}}) == \
+        make_key('res.partner', 'read', [[1]], {'context': {}, 'fields': ['name']})
+    assert make_key('res.partner', 'read', [[1]]) != make_key('res.partner', 'read', [[2]])
@@ -0,0 +1,64 @@
+"""
+Test thống kê kết nối của transport: chỉ tính reuse khi request đi trên socket keep-alive còn mở
+"""
+import json
+import os
+import sys
+import threading
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.transport import JsonRpcProxyPool, ServerProxyPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.path == '/jsonrpc':
+            payload = json.dumps({'jsonrpc': '2.0', 'id': json.loads(body)['id'], 'result': 42}).encode()
+        else:
+            payload = xmlrpc.client.dumps((42,), methodresponse=True).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(payload)))
+        if self.server.close_connections:
+            # Server không giữ keep-alive: http.client phải mở socket mới cho mỗi request
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(params=[False, True], ids=['keep-alive', 'close'])
+def server(request):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.close_connections = request.param
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize('pool_class, path', [(ServerProxyPool, '/xmlrpc/2/object'),
+                                              (JsonRpcProxyPool, '/jsonrpc')])
+def test_reuse_counts_only_live_keepalive_sockets(server, pool_class, path):
+    pool = pool_class(f'http://127.0.0.1:{server.server_address[1]}{path}', size=1)
+    for _ in range(3):
+        assert pool.execute_kw('db', 1, 'pw', 'res.partner', 'search_count', [[]]) == 42
+    stats = pool.get_stats()
+    pool.close()
+
+    if server.close_connections:
+        assert (stats['connections_opened'], stats['connections_reused']) == (3, 0)
+        assert stats['reuse_ratio'] == 0.0
+    else:
+        assert (stats['connections_opened'], stats['connections_reused']) == (1, 2)